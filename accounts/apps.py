@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AuthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "accounts"
+
+    def ready(self):
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
+        from . import authentication  # pylint: disable=import-outside-toplevel
+
+        authentication.check_backend()
@@ -0,0 +1,100 @@
+"""
+Аутентификация по токену с кэшированием
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from geo import metrics
+from geo.caching import is_process_local
+
+CACHE_ALIAS: str = "auth"
+
+
+def is_enabled() -> bool:
+    """
+    Включено ли кэширование токенов в настройках
+    """
+    return getattr(settings, "ACCOUNTS_TOKEN_CACHE_ENABLED", False)
+
+
+def check_backend() -> None:
+    """
+    Запрещает кэширование токенов в памяти процесса: удаление из такого кэша
+    при выходе или деактивации видно только одному воркеру, и на остальных
+    отозванный токен работал бы до истечения TIMEOUT
+
+    Raises:
+        ImproperlyConfigured: Кэш включён, а кэш "auth" локален для процесса
+    """
+
+    if is_enabled() and is_process_local(CACHE_ALIAS):
+        raise ImproperlyConfigured(
+            f"ACCOUNTS_TOKEN_CACHE requires a shared {CACHE_ALIAS!r} cache "
+            "(set CACHE_REDIS_URL): with a process-local cache revoked tokens "
+            "keep working on other workers"
+        )
+
+
+def token_cache_key(key: str) -> str:
+    """
+    Возвращает ключ кэша для токена (сам токен в ключ не попадает)
+    """
+    return "token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def evict_tokens(keys) -> None:
+    """
+    Удаляет токены из кэша
+
+    Args:
+        keys: Ключи токенов
+    """
+
+    cache_keys = [token_cache_key(key) for key in keys]
+    if cache_keys:
+        caches[CACHE_ALIAS].delete_many(cache_keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Замена TokenAuthentication, которая хранит токен вместе с пользователем
+    в кэше с ограниченным временем жизни, чтобы не обращаться к базе
+    на каждом запросе. Записи удаляются из кэша при удалении токена,
+    изменении пароля или деактивации пользователя.
+    """
+
+    def authenticate(self, request):
+        try:
+            result = super().authenticate(request)
+        except AuthenticationFailed:
+            metrics.auth_outcomes.inc("token", "failure")
+            raise
+        metrics.auth_outcomes.inc("token", "anonymous" if result is None else "success")
+        return result
+
+    def authenticate_credentials(self, key):
+        if not is_enabled():
+            return super().authenticate_credentials(key)
+
+        cache = caches[CACHE_ALIAS]
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        metrics.cache_events.inc("token", "misses" if token is None else "hits")
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related("user").get(key=key)
+            except model.DoesNotExist as exc:
+                raise AuthenticationFailed(_("Invalid token.")) from exc
+            cache.set(cache_key, token)
+
+        if not token.user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
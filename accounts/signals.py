@@ -0,0 +1,41 @@
+"""
+Обработчики сигналов пользователей и токенов
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import evict_tokens
+
+
+User = get_user_model()
+
+
+def evict_now_and_on_commit(keys: list[str]) -> None:
+    """
+    Удаляет токены из кэша сразу и повторно после фиксации транзакции,
+    чтобы параллельный запрос не успел вернуть в кэш старые данные
+    """
+
+    evict_tokens(keys)
+    transaction.on_commit(lambda: evict_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance: Token, **kwargs) -> None:
+    """Удаляет из кэша отозванный токен"""
+
+    evict_now_and_on_commit([instance.key])
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created: bool, **kwargs) -> None:
+    """Удаляет из кэша токены пользователя при изменении пароля, активности и т.п."""
+
+    if not created:
+        evict_now_and_on_commit(
+            list(Token.objects.filter(user=instance).values_list("key", flat=True))
+        )
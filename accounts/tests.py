@@ -0,0 +1,86 @@
+"""
+Тесты аутентификации
+"""
+
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .authentication import check_backend, token_cache_key
+
+User = get_user_model()
+
+
+# файловый кэш общий для процессов одной машины, как Redis для воркеров
+SHARED_CACHES = {
+    **settings.CACHES,
+    "auth": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "accounts-tests-tokens"),
+    },
+}
+
+
+@override_settings(ACCOUNTS_TOKEN_CACHE_ENABLED=True, CACHES=SHARED_CACHES)
+class CachedTokenAuthenticationTests(TestCase):
+    """Кэш токенов убирает запросы к базе, но отозванный токен перестаёт работать сразу"""
+
+    def setUp(self):
+        caches["auth"].clear()
+        User.objects.create_user(username="alice", password="secret12")
+        self.client = APIClient()
+        response = self.client.post(
+            "/auth/login/", {"username": "alice", "password": "secret12"}
+        )
+        self.client.logout()  # проверяем только токен, без сессии
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+
+    def test_cached_lookup_skips_database(self):
+        self.client.get("/points/search/cache/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/points/search/cache/")
+        self.assertEqual(response.status_code, 403)  # аутентифицирован, но не админ
+
+    def test_logout_revokes_token_immediately(self):
+        self.assertEqual(self.client.get("/points/").status_code, 200)
+        cache_key = token_cache_key(User.objects.get(username="alice").auth_token.key)
+        # кэш другого воркера: отдельный экземпляр бэкенда с тем же хранилищем
+        other_worker = FileBasedCache(SHARED_CACHES["auth"]["LOCATION"], {})
+        self.assertIsNotNone(other_worker.get(cache_key))
+
+        self.assertEqual(self.client.post("/auth/logout/").status_code, 200)
+        self.assertIsNone(other_worker.get(cache_key))
+        self.assertEqual(self.client.get("/points/").status_code, 401)
+
+    def test_process_local_cache_is_refused(self):
+        local = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(CACHES={**SHARED_CACHES, "auth": local}):
+            with self.assertRaises(ImproperlyConfigured):
+                check_backend()
+        check_backend()
+
+    def test_deactivation_revokes_token_immediately(self):
+        self.assertEqual(self.client.get("/points/").status_code, 200)
+        user = User.objects.get(username="alice")
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get("/points/").status_code, 401)
+
+    def test_password_change_evicts_cached_user(self):
+        self.assertEqual(self.client.get("/points/").status_code, 200)
+        user = User.objects.get(username="alice")
+        cache_key = token_cache_key(user.auth_token.key)
+        self.assertIsNotNone(caches["auth"].get(cache_key))
+
+        user.set_password("another12")
+        user.save()
+        self.assertIsNone(caches["auth"].get(cache_key))
+        self.assertEqual(self.client.get("/points/").status_code, 200)
+        self.assertEqual(caches["auth"].get(cache_key).user.password, user.password)
@@ -12,6 +12,8 @@ from rest_framework.request import Request
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 
+from geo import metrics
+
 from .serializers import RegisterSerializer, LoginSerializer, EmptySerializer
 
 
@@ -61,9 +63,11 @@ class LoginView(GenericAPIView):
         password = serializer.validated_data["password"]
         user = authenticate(username=username, password=password)
         if not user:
+            metrics.auth_outcomes.inc("login", "failure")
             return Response(
                 {"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
             )
+        metrics.auth_outcomes.inc("login", "success")
         token, _ = Token.objects.get_or_create(
             user=user
         )  # создаём токен для API запросов
@@ -0,0 +1,21 @@
+"""
+Свойства настроенных кэшей Django
+"""
+
+from django.conf import settings
+
+# бэкенды, данные которых видны только процессу, который их записал
+PROCESS_LOCAL_BACKENDS: tuple[str, ...] = (
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+
+def is_process_local(alias: str) -> bool:
+    """
+    Хранит ли кэш данные в памяти процесса: при нескольких воркерах каждый
+    видит только свои записи и удаления
+
+    Args:
+        alias: Алиас кэша из CACHES
+    """
+    return settings.CACHES[alias]["BACKEND"] in PROCESS_LOCAL_BACKENDS
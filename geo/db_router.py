@@ -0,0 +1,191 @@
+"""
+Маршрутизация запросов к базе между основным сервером и репликами.
+
+Чтения отправляются на реплику только при обработке безопасных запросов
+(GET, HEAD, OPTIONS) к представлениям из GEO_REPLICA_VIEW_MODULES. Записи,
+чтения внутри транзакций и команды управления работают с основной базой.
+После запроса на изменение клиент на GEO_REPLICA_PIN_SECONDS секунд
+закрепляется за основной базой (read-your-writes), чтобы не получить данные
+из отстающей реплики сразу после своей записи. Закрепления хранятся в кэше,
+общем для воркеров: следующий запрос клиента может попасть в другой воркер.
+Модели аутентификации (токены, пользователи, сессии) всегда читаются с основной
+базы: вход выдаёт токен без закрепления, и следующий запрос клиента с этим
+токеном не должен получить 401 из-за отставания реплики.
+"""
+
+import hashlib
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+from django.urls import Resolver404, resolve
+
+from .caching import is_process_local
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@dataclass
+class RoutingState:
+    """
+    Маршрутизация текущего запроса
+
+    Attributes:
+        replica: Алиас реплики для чтений или None, если читать с основной базы
+        wrote: Была ли запись в основную базу во время запроса
+    """
+
+    replica: str | None = None
+    wrote: bool = False
+
+
+_state: ContextVar[RoutingState | None] = ContextVar("geo_db_routing", default=None)
+
+
+def replicas() -> list[str]:
+    """
+    Алиасы реплик из DATABASE_REPLICAS
+    """
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def current_state() -> RoutingState | None:
+    """
+    Возвращает маршрутизацию текущего запроса (None вне запроса)
+    """
+    return _state.get()
+
+
+def activate(state: RoutingState | None):
+    """
+    Устанавливает маршрутизацию для текущего контекста
+
+    Returns:
+        Токен для deactivate
+    """
+    return _state.set(state)
+
+
+def deactivate(token) -> None:
+    """
+    Восстанавливает предыдущую маршрутизацию
+    """
+    _state.reset(token)
+
+
+def pin_key(request: HttpRequest) -> str | None:
+    """
+    Ключ клиента для закрепления за основной базой: токен из Authorization,
+    иначе сессия. Анонимные клиенты без сессии не закрепляются.
+    """
+
+    identity = request.headers.get("Authorization") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not identity:
+        return None
+    return "db-pin:" + hashlib.sha256(identity.encode()).hexdigest()
+
+
+def pin_cache():
+    """
+    Кэш закреплений за основной базой
+    """
+    return caches[getattr(settings, "GEO_REPLICA_PIN_CACHE", "default")]
+
+
+def check_pin_cache() -> None:
+    """
+    Проверяет, что при наличии реплик закрепления хранятся в общем кэше
+
+    Raises:
+        ImproperlyConfigured: Реплики настроены, а кэш закреплений локален
+            для процесса (закрепление видел бы только воркер, выполнивший запись)
+    """
+
+    alias = getattr(settings, "GEO_REPLICA_PIN_CACHE", "default")
+    if replicas() and is_process_local(alias):
+        raise ImproperlyConfigured(
+            f"DATABASE_REPLICAS require a shared {alias!r} cache (set "
+            "CACHE_REDIS_URL): with a process-local cache other workers read "
+            "from a lagging replica right after a write"
+        )
+
+
+def pin_timeout() -> int:
+    """
+    Сколько секунд клиент читает с основной базы после записи
+    """
+    return getattr(settings, "GEO_REPLICA_PIN_SECONDS", 5)
+
+
+def primary_only(model) -> bool:
+    """
+    Читается ли модель всегда с основной базы (приложения GEO_REPLICA_PRIMARY_APPS
+    и модель пользователя)
+    """
+
+    apps = getattr(
+        settings, "GEO_REPLICA_PRIMARY_APPS", ("auth", "authtoken", "sessions")
+    )
+    return (
+        model._meta.app_label in apps or model._meta.label == settings.AUTH_USER_MODEL
+    )
+
+
+def replica_allowed(request: HttpRequest) -> bool:
+    """
+    Можно ли читать с реплики для этого запроса (без учёта закрепления)
+    """
+
+    if request.method not in SAFE_METHODS or not replicas():
+        return False
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    modules = getattr(settings, "GEO_REPLICA_VIEW_MODULES", ("points.",))
+    return match.func.__module__.startswith(tuple(modules))
+
+
+class ReplicaRouter:
+    """
+    Роутер Django: чтения в безопасных запросах к представлениям точек уходят
+    на реплику, выбранную для запроса, остальное - на основную базу
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if primary_only(model):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # чтения внутри транзакции должны видеть её изменения
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def choose_replica() -> str:
+    """
+    Выбирает реплику для запроса
+    """
+    return random.choice(replicas())
@@ -0,0 +1,411 @@
+"""
+Метрики приложения в формате Prometheus.
+
+Счётчики и гистограммы хранятся в памяти процесса: запись занимает одну
+короткую блокировку семейства метрики. Режим задаётся GEO_METRICS_MODE:
+
+- "process": /metrics отдаёт значения только того процесса, который обработал
+  запрос (один воркер или воркеры, которые опрашиваются по отдельности);
+- "shared": каждый воркер не чаще раза в GEO_METRICS_FLUSH_SECONDS секунд
+  записывает свои значения в файл в каталоге GEO_METRICS_DIR, а /metrics
+  суммирует файлы всех воркеров (несколько воркеров gunicorn за одним портом).
+"""
+
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    """
+    Счётчик с метками
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        """
+        Увеличивает счётчик для значений меток (в порядке self.labels)
+        """
+
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> list:
+        """
+        Возвращает значения в виде [[метки, значение], ...]
+        """
+
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram:
+    """
+    Гистограмма с метками и фиксированными границами корзин
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # метки -> [количество в каждой корзине (последняя - +Inf), сумма]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        """
+        Добавляет наблюдение для значений меток
+        """
+
+        key = tuple(str(label) for label in labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self) -> list:
+        """
+        Возвращает значения в виде [[метки, корзины, сумма], ...]
+        """
+
+        with self._lock:
+            return [
+                [list(key), list(counts), total]
+                for key, (counts, total) in self._values.items()
+            ]
+
+
+class Registry:
+    """
+    Набор метрик процесса с записью в общий каталог для режима "shared"
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._file: str | None = None
+        self._file_pid: int | None = None
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        """
+        Регистрирует счётчик
+        """
+        return self._register(Counter(name, documentation, tuple(labels)))
+
+    def histogram(
+        self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        """
+        Регистрирует гистограмму
+        """
+        return self._register(Histogram(name, documentation, tuple(labels), buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """
+        Возвращает значения всех метрик процесса
+        """
+
+        return {
+            name: {
+                "type": metric.kind,
+                "help": metric.documentation,
+                "labels": list(metric.labels),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "values": metric.snapshot(),
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def worker_file(self) -> str:
+        """
+        Возвращает путь к файлу значений текущего процесса. Имя уникально
+        для каждого запуска процесса, поэтому значения завершившихся воркеров
+        остаются в сумме, а счётчики не уменьшаются.
+        """
+
+        pid = os.getpid()
+        if self._file is None or self._file_pid != pid:
+            self._file_pid = pid
+            self._file = os.path.join(
+                metrics_dir(), f"{pid}-{uuid.uuid4().hex[:8]}.json"
+            )
+        return self._file
+
+    def flush(self) -> None:
+        """
+        Записывает значения процесса в его файл (атомарно, через переименование)
+        """
+
+        with self._flush_lock:
+            path = self.worker_file()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f"{path}.tmp"
+            with open(temp, "w", encoding="utf-8") as file:
+                json.dump(self.snapshot(), file)
+            os.replace(temp, path)
+            self._flushed_at = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        """
+        В режиме "shared" записывает значения, если с прошлой записи прошло
+        больше GEO_METRICS_FLUSH_SECONDS секунд
+        """
+
+        if mode() != "shared":
+            return
+        interval = getattr(settings, "GEO_METRICS_FLUSH_SECONDS", 5)
+        if time.monotonic() - self._flushed_at >= interval:
+            self.flush()
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        """
+        Возвращает значения для выдачи: текущего процесса или сумму по файлам
+        всех воркеров
+        """
+
+        if mode() != "shared":
+            return self.snapshot()
+        self.flush()
+        merged: dict[str, dict[str, Any]] = {}
+        directory = metrics_dir()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as file:
+                    merge(merged, json.load(file))
+            except (OSError, ValueError):
+                # файл удалён или записан другой версией приложения
+                continue
+        return merged
+
+
+def merge(target: dict[str, dict[str, Any]], source: dict[str, dict[str, Any]]):
+    """
+    Прибавляет значения одного снимка к другому (по совпадающим меткам)
+    """
+
+    for name, family in source.items():
+        existing = target.setdefault(name, {**family, "values": []})
+        if (
+            existing["type"] != family["type"]
+            or existing["buckets"] != family["buckets"]
+        ):
+            continue
+        values = {tuple(item[0]): item for item in existing["values"]}
+        for item in family["values"]:
+            current = values.get(tuple(item[0]))
+            if current is None:
+                values[tuple(item[0])] = copy.deepcopy(item)
+            elif family["type"] == "counter":
+                current[1] += item[1]
+            else:
+                current[1] = [a + b for a, b in zip(current[1], item[1])]
+                current[2] += item[2]
+        existing["values"] = list(values.values())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def exposition(families: dict[str, dict[str, Any]]) -> str:
+    """
+    Форматирует метрики в текстовом формате Prometheus
+
+    Args:
+        families: Значения метрик (Registry.collect)
+
+    Returns:
+        Текст для /metrics
+    """
+
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labels = family["labels"]
+        for item in sorted(family["values"], key=lambda item: item[0]):
+            if family["type"] == "counter":
+                lines.append(f"{name}{_labels(labels, item[0])} {_number(item[1])}")
+                continue
+            cumulative = 0
+            bounds = [_number(bound) for bound in family["buckets"]] + ["+Inf"]
+            for bound, count in zip(bounds, item[1]):
+                cumulative += count
+                bucket = _labels(labels, item[0], f'le="{bound}"')
+                lines.append(f"{name}_bucket{bucket} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels, item[0])} {_number(item[2])}")
+            lines.append(f"{name}_count{_labels(labels, item[0])} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def mode() -> str:
+    """
+    Режим работы метрик: "process" или "shared"
+    """
+    return getattr(settings, "GEO_METRICS_MODE", "process")
+
+
+def metrics_dir() -> str:
+    """
+    Каталог файлов воркеров для режима "shared"
+    """
+
+    return getattr(settings, "GEO_METRICS_DIR", "") or os.path.join(
+        tempfile.gettempdir(), "geo-metrics"
+    )
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "geo_http_requests_total",
+    "HTTP requests by URL pattern, method and status",
+    ("route", "method", "status"),
+)
+http_latency = registry.histogram(
+    "geo_http_request_duration_seconds",
+    "HTTP request latency by URL pattern",
+    ("route", "method"),
+)
+db_queries = registry.histogram(
+    "geo_http_request_db_queries",
+    "SQL queries per HTTP request by URL pattern",
+    ("route",),
+    QUERY_BUCKETS,
+)
+db_duration = registry.counter(
+    "geo_db_duration_seconds_total",
+    "Time spent in SQL queries by URL pattern",
+    ("route",),
+)
+search_candidates = registry.histogram(
+    "geo_search_candidates",
+    "Points loaded from the database by a search before exact filtering",
+    ("search",),
+    SIZE_BUCKETS,
+)
+search_results = registry.histogram(
+    "geo_search_results",
+    "Points returned by a search",
+    ("search",),
+    SIZE_BUCKETS,
+)
+auth_outcomes = registry.counter(
+    "geo_auth_total",
+    "Authentication attempts by method and outcome",
+    ("method", "outcome"),
+)
+cache_events = registry.counter(
+    "geo_cache_events_total",
+    "Cache lookups and invalidations by cache and event",
+    ("cache", "event"),
+)
+
+
+def route(request: HttpRequest) -> str:
+    """
+    Возвращает URL-шаблон запроса (например, points/<int:id>/),
+    чтобы метки не зависели от идентификаторов в пути
+    """
+
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return "unmatched"
+    return match.route
+
+
+def observe_request(
+    request: HttpRequest, status: int, seconds: float, queries: int, db_seconds: float
+) -> None:
+    """
+    Записывает метрики обработанного HTTP-запроса
+    """
+
+    name = route(request)
+    http_requests.inc(name, request.method, status)
+    http_latency.observe(seconds, name, request.method)
+    db_queries.observe(queries, name)
+    db_duration.inc(name, amount=db_seconds)
+    registry.maybe_flush()
+
+
+def observe_search(search: str, candidates: int, results: int) -> None:
+    """
+    Записывает количество кандидатов и результатов поиска
+    """
+
+    search_candidates.observe(candidates, search)
+    search_results.observe(results, search)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Выдача метрик для Prometheus. Если задан GEO_METRICS_TOKEN, требуется
+    заголовок Authorization: Bearer <токен>.
+    """
+
+    token = getattr(settings, "GEO_METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(exposition(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,297 @@
+"""
+Middleware проекта.
+
+RequestTimingMiddleware измеряет каждый запрос: количество SQL-запросов и время
+в базе, время представления и время сериализации ответа (рендеринга в JSON).
+Результат отдаётся в заголовке Server-Timing, пишется строкой JSON в лог
+geo.requests и попадает в метрики geo.metrics. Если представление на GET-
+или HEAD-запросе выполнило больше запросов, чем задано для него
+в GEO_QUERY_BUDGETS, в лог пишется предупреждение.
+
+ReadYourWritesMiddleware включает чтение с реплик (geo.db_router) и закрепляет
+клиента за основной базой после записи.
+"""
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+
+from . import db_router
+from .metrics import observe_request
+
+logger = logging.getLogger("geo.requests")
+
+_current: ContextVar["RequestMetrics | None"] = ContextVar(
+    "geo_request_metrics", default=None
+)
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Показатели одного запроса
+
+    Attributes:
+        started: Время начала запроса (perf_counter)
+        queries: Количество SQL-запросов
+        db: Суммарное время SQL-запросов в секундах
+        view: Время представления в секундах
+        serialize: Время рендеринга ответа в секундах
+        view_name: Путь к классу (или функции) представления
+        marks: Отметки времени начала этапов
+    """
+
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    view: float = 0.0
+    serialize: float = 0.0
+    view_name: str = ""
+    marks: dict[str, float] = field(default_factory=dict)
+
+
+def current_metrics() -> RequestMetrics | None:
+    """
+    Возвращает показатели текущего запроса (None вне запроса)
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обёртка выполнения SQL: считает запросы и их время для текущего запроса.
+    Показатели хранятся в contextvar, поэтому запросы из sync_to_async
+    в асинхронных представлениях попадают в тот же запрос.
+    """
+
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db += time.perf_counter() - started
+
+
+def instrument(connection) -> None:
+    """
+    Подключает record_query к соединению с базой
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    instrument(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+def view_name(view_func) -> str:
+    """
+    Возвращает путь к классу представления (или к функции) для бюджетов запросов
+    """
+
+    view = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+    view = view or view_func
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    """
+    Формирует значение заголовка Server-Timing (длительности в миллисекундах)
+    """
+
+    return ", ".join(
+        [
+            f'db;dur={metrics.db * 1000:.2f};desc="{metrics.queries} queries"',
+            f"view;dur={metrics.view * 1000:.2f}",
+            f"serialize;dur={metrics.serialize * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ]
+    )
+
+
+class RequestTimingMiddleware:
+    """
+    Middleware измерения запросов. Должен стоять первым в MIDDLEWARE, чтобы
+    его process_template_response вызывался непосредственно перед рендерингом
+    ответа. Работает как под WSGI, так и под ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request: HttpRequest):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return None
+        # соединения, открытые до подключения обработчика connection_created
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        metrics.view_name = view_name(view_func)
+        metrics.marks["view"] = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        metrics = _current.get()
+        if metrics is None or "view" not in metrics.marks:
+            return response
+        rendering = metrics.marks["render"] = time.perf_counter()
+        metrics.view = rendering - metrics.marks["view"]
+
+        def rendered(_response):
+            metrics.serialize = time.perf_counter() - rendering
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def finish(
+        self, request: HttpRequest, response: HttpResponse, metrics: RequestMetrics
+    ) -> HttpResponse:
+        """
+        Добавляет заголовок Server-Timing, пишет строку лога
+        и проверяет бюджет запросов представления
+        """
+
+        finished = time.perf_counter()
+        total = finished - metrics.started
+        if "view" in metrics.marks and "render" not in metrics.marks:
+            # ответ без рендеринга (HttpResponse, стриминг)
+            metrics.view = finished - metrics.marks["view"]
+        response["Server-Timing"] = server_timing(metrics, total)
+        observe_request(
+            request, response.status_code, total, metrics.queries, metrics.db
+        )
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "view": metrics.view_name,
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db * 1000, 2),
+            "view_ms": round(metrics.view * 1000, 2),
+            "serialize_ms": round(metrics.serialize * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }
+        logger.info(json.dumps(record))
+
+        budgets = getattr(settings, "GEO_QUERY_BUDGETS", {})
+        budget = budgets.get(metrics.view_name)
+        # изменения выполняют дополнительные запросы (счётчики, сетка плотности),
+        # поэтому бюджеты проверяются только для чтения
+        if (
+            budget is not None
+            and request.method in ("GET", "HEAD")
+            and metrics.queries > budget
+        ):
+            logger.warning(
+                json.dumps(
+                    {**record, "event": "query_budget_exceeded", "budget": budget}
+                )
+            )
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """
+    Включает чтение с реплик для безопасных запросов к представлениям точек
+    (см. geo.db_router) и после запроса с записью закрепляет клиента
+    за основной базой на GEO_REPLICA_PIN_SECONDS секунд. С репликами требует
+    общего кэша закреплений (см. geo.db_router.check_pin_cache).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        db_router.check_pin_cache()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if self.async_mode:
+            return self.__acall__(request)
+        key = db_router.pin_key(request)
+        pinned = key is not None and db_router.pin_cache().get(key) is not None
+        state = self.routing(request, pinned)
+        token = db_router.activate(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.deactivate(token)
+        if key is not None and self.wrote(request, state):
+            db_router.pin_cache().set(key, 1, db_router.pin_timeout())
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        key = db_router.pin_key(request)
+        pinned = key is not None and await db_router.pin_cache().aget(key) is not None
+        state = self.routing(request, pinned)
+        token = db_router.activate(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.deactivate(token)
+        if key is not None and self.wrote(request, state):
+            await db_router.pin_cache().aset(key, 1, db_router.pin_timeout())
+        return response
+
+    @staticmethod
+    def routing(request: HttpRequest, pinned: bool) -> db_router.RoutingState:
+        """
+        Выбирает реплику для чтений запроса, если это разрешено
+        """
+
+        state = db_router.RoutingState()
+        if not pinned and db_router.replica_allowed(request):
+            state.replica = db_router.choose_replica()
+        return state
+
+    @staticmethod
+    def wrote(request: HttpRequest, state: db_router.RoutingState) -> bool:
+        """
+        Изменил ли запрос данные: небезопасный метод или запись в базу
+        """
+        return request.method not in db_router.SAFE_METHODS or state.wrote
@@ -48,15 +48,121 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
         # "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson, если установлен; вывод совпадает со стандартным JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "points.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Общий для воркеров кэш (Redis) для результатов поиска, токенов и закреплений
+# за основной базой. Без CACHE_REDIS_URL эти кэши хранятся в памяти процесса
+# и подходят только для одного воркера
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "")
+
+# Кэширование токенов аутентификации (без него каждый запрос читает токен из базы).
+# Требует общего кэша (CACHE_REDIS_URL), чтобы отзыв токена сразу видели все воркеры
+ACCOUNTS_TOKEN_CACHE_ENABLED = os.environ.get("ACCOUNTS_TOKEN_CACHE", "0") == "1"
+
+# Пространственный индекс точек в памяти процесса для поиска в радиусе
+POINTS_SPATIAL_INDEX_ENABLED = os.environ.get("POINTS_SPATIAL_INDEX", "0") == "1"
+POINTS_SPATIAL_INDEX_RESYNC_SECONDS = int(
+    os.environ.get("POINTS_SPATIAL_INDEX_RESYNC_SECONDS", 300)
+)
+POINTS_SPATIAL_INDEX_CELL_DEGREES = 0.1
+# если индекс нашёл больше точек, кандидаты отбираются в базе по прямоугольнику
+POINTS_SPATIAL_INDEX_MAX_IDS = 1000
+
+# Кэш результатов поиска в радиусе. Без CACHE_REDIS_URL хранится в памяти процесса,
+# и при нескольких воркерах инвалидации не доходят до других воркеров
+POINTS_SEARCH_CACHE_ENABLED = os.environ.get("POINTS_SEARCH_CACHE", "1") == "1"
+# центр поиска привязывается к сетке, радиус округляется вверх до шага,
+# чтобы близкие запросы (шум GPS) попадали в одну запись кэша
+POINTS_SEARCH_CACHE_SNAP_DEGREES = 0.001
+POINTS_SEARCH_CACHE_RADIUS_STEP_KM = 0.1
+POINTS_SEARCH_CACHE_CELL_DEGREES = 1.0  # размер ячейки инвалидации
+POINTS_SEARCH_CACHE_MAX_CELLS = 64  # запросы на большей площади не кэшируются
+
+# Сериализация списков, сообщений и поиска из строк .values() в обход ModelSerializer
+POINTS_FAST_SERIALIZATION = os.environ.get("POINTS_FAST_SERIALIZATION", "1") == "1"
+
+# Уровни сетки плотности: размер ячейки 10^-level градусов
+POINTS_DENSITY_LEVELS = (0, 1, 2)
+
+# Синхронизация изменений: изменения моложе POINTS_SYNC_SETTLE_SECONDS не отдаются,
+# чтобы не пропустить строки из ещё не зафиксированных транзакций. Значение должно
+# быть больше самой долгой транзакции, меняющей точки и сообщения (запросы API и
+# пакеты импорта - доли секунды), иначе клиенты пропускают её строки
+# (такие транзакции пишутся в лог points.sync);
+# записи об удалениях хранятся POINTS_TOMBSTONE_RETENTION_DAYS дней
+POINTS_SYNC_SETTLE_SECONDS = int(os.environ.get("POINTS_SYNC_SETTLE_SECONDS", 30))
+POINTS_TOMBSTONE_RETENTION_DAYS = int(
+    os.environ.get("POINTS_TOMBSTONE_RETENTION_DAYS", 30)
+)
+
+# События о сообщениях точек (server-sent events): брокер публикации,
+# интервал комментариев-пингов и размер очереди одного подписчика
+POINTS_EVENTS_BROKER = os.environ.get(
+    "POINTS_EVENTS_BROKER", "points.pubsub.InProcessBroker"
+)
+POINTS_EVENTS_HEARTBEAT_SECONDS = 15
+POINTS_EVENTS_QUEUE_SIZE = 100
+
+# Бюджеты SQL-запросов представлений на чтение (путь к классу -> максимум запросов
+# на GET-запрос, включая проверку токена). При превышении RequestTimingMiddleware пишет
+# предупреждение в лог geo.requests
+GEO_QUERY_BUDGETS = {
+    "points.views.PointListCreateView": 4,
+    "points.views.PointRetrieveUpdateDestroyView": 4,
+    "points.views.MessageListCreateView": 3,
+    "points.views.PointSearchView": 4,
+    "points.views.PointBatchSearchView": 2,
+    "points.views.PointCorridorView": 2,
+    "points.views.PointChangesView": 4,
+    "points.views.PointViewportView": 2,
+    "points.views.PointHeatmapView": 2,
+    "points.async_views.AsyncPointListView": 3,
+    "points.async_views.AsyncPointDetailView": 3,
+    "points.async_views.AsyncMessageListView": 3,
+    "points.async_views.AsyncPointSearchView": 3,
+}
+
+# Метрики Prometheus (/metrics): "process" - значения текущего процесса,
+# "shared" - сумма по файлам всех воркеров в GEO_METRICS_DIR (несколько воркеров
+# gunicorn за одним портом; каталог очищается при развёртывании).
+# Если задан GEO_METRICS_TOKEN, /metrics требует Authorization: Bearer <токен>
+GEO_METRICS_MODE = os.environ.get("GEO_METRICS_MODE", "process")
+GEO_METRICS_DIR = os.environ.get("GEO_METRICS_DIR", "")
+GEO_METRICS_FLUSH_SECONDS = 5
+GEO_METRICS_TOKEN = os.environ.get("GEO_METRICS_TOKEN", "")
+
+# Строки лога geo.requests с показателями каждого запроса пишутся на уровне INFO,
+# превышения бюджетов запросов - на уровне WARNING. По умолчанию выводятся только
+# превышения, строки всех запросов включаются GEO_REQUEST_LOG_LEVEL=INFO
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "geo.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get("GEO_REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
 }
 
 MIDDLEWARE = [
+    "geo.middleware.RequestTimingMiddleware",
+    "geo.middleware.ReadYourWritesMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -89,15 +195,110 @@ WSGI_APPLICATION = "geo.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# Соединения: при DB_POOL=1 используется пул psycopg 3 (нужен пакет psycopg[pool]),
+# иначе соединения переиспользуются DB_CONN_MAX_AGE секунд с проверкой перед
+# каждым запросом. Под ASGI постоянные соединения не рекомендуются - используйте пул
+DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+
+
+def database(host: str, port) -> dict:
+    """
+    Настройки соединения с сервером PostgreSQL
+    """
+
+    config = {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
-        "HOST": os.environ.get("DB_HOST", "localhost"),
-        "PORT": os.environ.get("DB_PORT", 5432),
+        "HOST": host,
+        "PORT": port,
+    }
+    if DB_POOL:
+        config["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+                "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            }
+        }
+    else:
+        config["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        config["CONN_HEALTH_CHECKS"] = True
+    return config
+
+
+DATABASES = {
+    "default": database(
+        os.environ.get("DB_HOST", "localhost"), os.environ.get("DB_PORT", 5432)
+    ),
+}
+
+# Реплики только для чтения: DB_REPLICA_HOSTS="host1:5432,host2:5432".
+# В тестах реплики используют тестовую базу основного сервера
+for index, replica in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f"replica{index}"] = {
+        **database(replica_host, replica_port or 5432),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["geo.db_router.ReplicaRouter"]
+
+# Чтения с реплик разрешены в безопасных запросах к представлениям этих модулей;
+# после записи клиент (по Authorization или сессии) читает с основной базы
+# GEO_REPLICA_PIN_SECONDS секунд - дольше обычного отставания реплик.
+# Закрепления хранятся в общем кэше: реплики требуют CACHE_REDIS_URL
+GEO_REPLICA_VIEW_MODULES = ("points.",)
+# модели этих приложений и пользователь всегда читаются с основной базы:
+# токен, выданный при входе, должен сразу работать и при отстающей реплике
+GEO_REPLICA_PRIMARY_APPS = ("auth", "authtoken", "sessions")
+GEO_REPLICA_PIN_SECONDS = int(os.environ.get("GEO_REPLICA_PIN_SECONDS", 5))
+GEO_REPLICA_PIN_CACHE = "replica-pins"
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+
+def shared_cache(name: str, timeout: int | None, max_entries: int) -> dict:
+    """
+    Настройки кэша, общего для воркеров: Redis из CACHE_REDIS_URL
+    (ключи разделяются префиксом name) или память процесса
+    """
+
+    if CACHE_REDIS_URL:
+        return {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "KEY_PREFIX": name,
+            "TIMEOUT": timeout,
+        }
+    return {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": name,
+        "TIMEOUT": timeout,
+        "OPTIONS": {"MAX_ENTRIES": max_entries},
     }
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "search": shared_cache(
+        "points-search", int(os.environ.get("POINTS_SEARCH_CACHE_TIMEOUT", 60)), 5000
+    ),
+    "auth": shared_cache(
+        "accounts-tokens",
+        int(os.environ.get("ACCOUNTS_TOKEN_CACHE_TIMEOUT", 300)),
+        10000,
+    ),
+    # закрепления клиентов за основной базой; с репликами требуется CACHE_REDIS_URL,
+    # иначе закрепление видно только воркеру, выполнившему запись
+    "replica-pins": shared_cache("replica-pins", 300, 100000),
 }
 
 
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PointsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "points"
+
+    def ready(self):
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
+        from . import search_cache  # pylint: disable=import-outside-toplevel
+
+        search_cache.check_backend()
@@ -0,0 +1,354 @@
+"""
+Асинхронные представления для ASGI: горячие пути чтения (список точек, детали,
+сообщения точки, поиск) и поток событий точки.
+
+DRF не поддерживает асинхронные представления, поэтому здесь используются
+представления Django с асинхронным ORM (aget, aiterator). Ответы рендерятся
+тем же JSONRenderer и сериализаторами, что и синхронные представления,
+поэтому формат точек и сообщений совпадает.
+"""
+
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, QuerySet
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from accounts.authentication import CachedTokenAuthentication
+from geo import metrics
+
+from .conditional import queryset_state
+from .models import Message, Point
+from .pagination import decode_keyset_cursor, encode_keyset_cursor
+from .pubsub import get_broker, point_channel
+from .search import filter_within_radius, radius_prefilter
+from .serializers import MessageSerializer, PointListSerializer, PointSerializer
+from . import search_cache, spatial_index
+
+
+class AsyncAPIView(View):
+    """
+    Базовое асинхронное представление: аутентификация по токену
+    (как у синхронного API) и JSON-ответы в формате DRF
+    """
+
+    max_messages_limit: int = 20
+    page_size: int = 50
+    max_page_size: int = 500
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        """
+        Проверяет токен и передаёт запрос обработчику метода
+        """
+
+        try:
+            user_auth = await sync_to_async(CachedTokenAuthentication().authenticate)(
+                request
+            )
+        except AuthenticationFailed as error:
+            return self.respond({"detail": str(error.detail)}, 401)
+        if user_auth is None:
+            return self.respond(
+                {"detail": "Authentication credentials were not provided."}, 401
+            )
+        request.user = user_auth[0]
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return self.respond({"detail": f'Method "{request.method}" not allowed.'}, 405)
+
+    @staticmethod
+    def respond(data: Any, status: int = 200) -> HttpResponse:
+        """
+        Рендерит ответ так же, как JSONRenderer синхронного API
+        """
+
+        return HttpResponse(
+            JSONRenderer().render(data), status=status, content_type="application/json"
+        )
+
+    def get_messages_limit(self) -> int:
+        """
+        Возвращает количество последних сообщений на точку из query-параметра messages
+        """
+
+        try:
+            limit = int(self.request.GET.get("messages", 0))
+        except ValueError:
+            return 0
+        return max(0, min(limit, self.max_messages_limit))
+
+    def get_page_size(self) -> int:
+        """
+        Возвращает размер страницы из query-параметра page_size
+        """
+
+        try:
+            size = int(self.request.GET.get("page_size", self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    async def paginate(self, queryset: QuerySet) -> tuple[list, str | None]:
+        """
+        Возвращает страницу выборки по ключу (created_at, id) и ссылку на следующую.
+        Курсор указывает на последнюю строку страницы, поэтому страница выбирается
+        условием по индексу без OFFSET.
+
+        Raises:
+            ValueError: Если курсор повреждён
+        """
+
+        cursor = self.request.GET.get("cursor")
+        if cursor:
+            queryset = queryset.filter(decode_keyset_cursor(cursor))
+        size = self.get_page_size()
+        rows = [
+            row
+            async for row in queryset.order_by("created_at", "id")[
+                : size + 1
+            ].aiterator(chunk_size=size + 1)
+        ]
+        if len(rows) <= size:
+            return rows, None
+        rows = rows[:size]
+        params = self.request.GET.copy()
+        params["cursor"] = encode_keyset_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, self.request.build_absolute_uri(
+            f"{self.request.path}?{params.urlencode()}"
+        )
+
+    def get_serializer_context(self) -> dict[str, Any]:
+        return {"request": self.request, "messages_limit": self.get_messages_limit()}
+
+
+class AsyncPointListView(AsyncAPIView):
+    """
+    Асинхронный список гео-точек (облегчённое представление)
+    """
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        """
+        Возвращает страницу точек в порядке создания
+
+        Query-параметры:
+            cursor: Курсор следующей страницы
+            page_size: Размер страницы (по умолчанию 50, не больше 500)
+            active_since: Только точки с сообщениями не раньше заданной даты
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+
+        queryset = Point.objects.lean(self.get_messages_limit())
+        active_since = request.GET.get("active_since")
+        if active_since:
+            try:
+                since = parse_datetime(active_since)
+            except ValueError:
+                since = None
+            if since is None:
+                return self.respond({"active_since": ["Invalid datetime"]}, 400)
+            queryset = queryset.filter(last_message_at__gte=since)
+
+        try:
+            points, next_url = await self.paginate(queryset)
+        except ValueError:
+            return self.respond({"detail": "Invalid cursor"}, 404)
+        serializer = PointListSerializer(
+            points, many=True, context=self.get_serializer_context()
+        )
+        return self.respond(
+            {"next": next_url, "previous": None, "results": serializer.data}
+        )
+
+
+class AsyncPointDetailView(AsyncAPIView):
+    """
+    Асинхронные детали гео-точки вместе с сообщениями
+    """
+
+    async def get(self, request: HttpRequest, id: int, *args: Any, **kwargs: Any):
+        """
+        Возвращает точку со всеми сообщениями
+        """
+
+        queryset = Point.objects.select_related("creator").prefetch_related(
+            Prefetch("message_set", queryset=Message.objects.select_related("author"))
+        )
+        try:
+            point = await queryset.aget(id=id)
+        except Point.DoesNotExist:
+            return self.respond({"detail": "No Point matches the given query."}, 404)
+        return self.respond(
+            PointSerializer(point, context=self.get_serializer_context()).data
+        )
+
+
+class AsyncMessageListView(AsyncAPIView):
+    """
+    Асинхронный список сообщений гео-точки
+    """
+
+    async def get(self, request: HttpRequest, point_id: int, *args: Any, **kwargs: Any):
+        """
+        Возвращает страницу сообщений точки в порядке создания
+
+        Query-параметры:
+            cursor: Курсор следующей страницы
+            page_size: Размер страницы (по умолчанию 50, не больше 500)
+        """
+
+        queryset = Message.objects.filter(point_id=point_id).select_related("author")
+        try:
+            messages, next_url = await self.paginate(queryset)
+        except ValueError:
+            return self.respond({"detail": "Invalid cursor"}, 404)
+        serializer = MessageSerializer(
+            messages, many=True, context=self.get_serializer_context()
+        )
+        return self.respond(
+            {"next": next_url, "previous": None, "results": serializer.data}
+        )
+
+
+class AsyncPointSearchView(AsyncAPIView):
+    """
+    Асинхронный поиск гео-точек в радиусе
+    """
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        """
+        Возвращает гео-точки в пределах радиуса (параметры как у /points/search/)
+
+        Query-параметры:
+            latitude: Широта точки поиска
+            longitude: Долгота точки поиска
+            radius: Радиус поиска в километрах
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+
+        try:
+            lat = float(request.GET["latitude"])
+            lon = float(request.GET["longitude"])
+            radius_km = float(request.GET["radius"])
+        except (KeyError, ValueError):
+            return self.respond(
+                {"detail": "latitude, longitude and radius are required"}, 400
+            )
+
+        messages_limit = self.get_messages_limit()
+        circle = (lat, lon, radius_km)
+        cache_key = entry = None
+        if search_cache.is_enabled():
+            circle = search_cache.query_circle(lat, lon, radius_km)
+            cache_key = await sync_to_async(search_cache.result_key)(
+                *circle, variant=f"m{messages_limit}"
+            )
+            entry = await sync_to_async(search_cache.get)(cache_key)
+
+        if entry is not None:
+            # запись общая с /points/search/: состояние выборки для ETag и представления
+            _, data = entry
+        elif cache_key is not None:
+            # состояние вычисляется до выборки: оно не может оказаться новее данных
+            state = await sync_to_async(queryset_state)(
+                radius_prefilter(Point.objects.all(), *circle),
+                with_messages=bool(messages_limit),
+            )
+            data = await self.search(*circle, messages_limit)
+            await sync_to_async(search_cache.put)(cache_key, (state, data))
+        else:
+            data = await self.search(*circle, messages_limit)
+        if circle != (lat, lon, radius_km):
+            data = filter_within_radius(data, lat, lon, radius_km)
+        return self.respond(data)
+
+    async def search(
+        self, lat: float, lon: float, radius_km: float, messages_limit: int
+    ) -> list[dict]:
+        """
+        Находит гео-точки в пределах радиуса и возвращает их представления
+        """
+
+        queryset = Point.objects.lean(messages_limit)
+        point_ids = await sync_to_async(spatial_index.candidate_ids)(
+            [(lat, lon, radius_km)]
+        )
+        if point_ids is not None:
+            candidates = queryset.filter(id__in=point_ids)
+        else:
+            candidates = radius_prefilter(queryset, lat, lon, radius_km)
+        candidates = [point async for point in candidates.aiterator(chunk_size=2000)]
+        points = filter_within_radius(candidates, lat, lon, radius_km)
+        metrics.observe_search("radius", len(candidates), len(points))
+        return PointListSerializer(
+            points, many=True, context=self.get_serializer_context()
+        ).data
+
+
+class PointEventsView(AsyncAPIView):
+    """
+    Поток событий о сообщениях точки (server-sent events).
+    Под ASGI-сервером простаивающий подписчик не занимает поток,
+    поэтому вместо опроса списка сообщений клиент держит одно соединение.
+    Под WSGI (и runserver) Django читает асинхронный поток целиком до отправки
+    ответа, поэтому бесконечный поток занял бы поток воркера навсегда,
+    ничего не отдав клиенту: такие запросы получают 501.
+    """
+
+    async def get(
+        self, request: HttpRequest, point_id: int, *args: Any, **kwargs: Any
+    ) -> StreamingHttpResponse | HttpResponse:
+        """
+        Отдаёт события message.created, message.updated и message.deleted
+        точки по мере их появления. Раз в POINTS_EVENTS_HEARTBEAT_SECONDS секунд
+        отправляется комментарий, чтобы прокси не закрывали соединение.
+        Если клиент не успевал читать и события были потеряны, отправляется
+        событие reset: клиенту нужно перечитать сообщения точки.
+
+        Заголовки:
+            Authorization: Token <ключ>
+        """
+
+        if not isinstance(request, ASGIRequest):
+            return self.respond(
+                {"detail": "Event streams are only served by the ASGI application."},
+                501,
+            )
+        if not await Point.objects.filter(id=point_id).aexists():
+            return self.respond({"detail": "No Point matches the given query."}, 404)
+
+        response = StreamingHttpResponse(
+            self.stream(point_channel(point_id)), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    async def stream(channel: str):
+        """
+        Генерирует события канала в формате text/event-stream
+        """
+
+        heartbeat = getattr(settings, "POINTS_EVENTS_HEARTBEAT_SECONDS", 15)
+        broker = get_broker()
+        subscription = broker.subscribe(channel)
+        try:
+            yield ": connected\n\n"
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield "event: reset\ndata: {}\n\n"
+                if event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: {event['event']}\ndata: {event['data']}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
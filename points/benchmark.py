@@ -0,0 +1,170 @@
+"""
+Измерение пропускной способности и задержек эндпоинтов.
+Запросы отправляются прямо в ASGI-приложение проекта (geo.asgi), без сети,
+поэтому сравнение синхронных и асинхронных представлений показывает
+разницу в обработке одновременных запросов самим Django.
+"""
+
+import asyncio
+import time
+from math import ceil
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Возвращает q-й процентиль (0-100) методом ближайшего ранга
+
+    Args:
+        values: Значения
+        q: Процентиль
+
+    Returns:
+        Значение процентиля, 0.0 для пустого списка
+    """
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Результат прогона: количество запросов, ошибок, время и задержки
+
+    Attributes:
+        name: Название прогона
+        concurrency: Количество одновременных запросов
+        latencies: Задержки успешных запросов в секундах
+        errors: Количество ответов с кодом не 2xx/3xx и исключений
+        elapsed: Общее время прогона в секундах
+    """
+
+    name: str
+    concurrency: int
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        Возвращает сводку прогона (задержки в миллисекундах)
+        """
+
+        requests = len(self.latencies) + self.errors
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "elapsed_s": round(self.elapsed, 3),
+            "rps": round(requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+        }
+
+
+async def asgi_request(
+    application, method: str, url: str, headers: dict[str, str] | None = None
+) -> tuple[int, bytes]:
+    """
+    Выполняет HTTP-запрос к ASGI-приложению в текущем процессе
+
+    Args:
+        application: ASGI-приложение
+        method: HTTP-метод
+        url: Путь с query-строкой
+        headers: Заголовки запроса
+
+    Returns:
+        Код ответа и тело
+    """
+
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in {"host": "localhost", **(headers or {})}.items()
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = 0
+    body = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # тело уже передано: ждём, пока приложение закончит ответ
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await application(scope, receive, send)
+    return status, b"".join(body)
+
+
+async def run_asgi(
+    application,
+    name: str,
+    urls: list[str],
+    concurrency: int,
+    headers: dict[str, str] | None = None,
+) -> BenchmarkResult:
+    """
+    Отправляет запросы GET по списку адресов, держа concurrency запросов одновременно
+
+    Args:
+        application: ASGI-приложение
+        name: Название прогона
+        urls: Адреса запросов
+        concurrency: Количество одновременных запросов
+        headers: Заголовки запросов
+
+    Returns:
+        Результат прогона
+    """
+
+    result = BenchmarkResult(name, concurrency)
+    queue = iter(urls)
+
+    async def worker() -> None:
+        for url in queue:
+            started = time.perf_counter()
+            try:
+                status, _ = await asgi_request(application, "GET", url, headers)
+            except Exception:  # pylint: disable=broad-except
+                status = 0
+            if 200 <= status < 400:
+                result.latencies.append(time.perf_counter() - started)
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
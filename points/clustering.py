@@ -0,0 +1,130 @@
+"""
+Кластеризация гео-точек в видимой области карты
+"""
+
+from typing import Any
+
+from django.db.models import Avg, Count, F, Q, Window
+from django.db.models.functions import Floor, RowNumber
+
+from .geo import Box
+from .models import Point
+
+CELLS_PER_TILE: int = 4  # ячеек сетки на сторону тайла карты (256 px)
+MAX_ZOOM: int = 22
+
+
+def cell_size(zoom: int) -> float:
+    """
+    Возвращает размер ячейки сетки кластеризации в градусах для уровня масштаба
+    """
+    return 360.0 / (2**zoom * CELLS_PER_TILE)
+
+
+def viewport_boxes(
+    min_lon: float, min_lat: float, max_lon: float, max_lat: float
+) -> list[Box]:
+    """
+    Переводит видимую область в прямоугольники (min_lat, max_lat, min_lon, max_lon).
+    Если min_lon > max_lon, область пересекает антимеридиан и делится на две.
+    """
+
+    if min_lon <= max_lon:
+        return [(min_lat, max_lat, min_lon, max_lon)]
+    return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+
+
+def viewport_cells(boxes: list[Box], zoom: int) -> int:
+    """
+    Возвращает примерное количество ячеек сетки в видимой области
+    """
+
+    size = cell_size(zoom)
+    return sum(
+        (int((max_lat - min_lat) / size) + 1) * (int((max_lon - min_lon) / size) + 1)
+        for min_lat, max_lat, min_lon, max_lon in boxes
+    )
+
+
+def cluster_viewport(
+    boxes: list[Box], zoom: int, threshold: int = 5, samples: int = 3
+) -> dict[str, Any]:
+    """
+    Группирует точки видимой области по ячейкам сетки одним запросом к базе.
+    Ячейки, в которых не меньше threshold точек, возвращаются кластером
+    (центр, количество, несколько id), остальные - отдельными точками.
+    Размер ответа ограничен количеством ячеек на экране, а не количеством точек.
+
+    Args:
+        boxes: Прямоугольники видимой области
+        zoom: Уровень масштаба карты
+        threshold: Минимальное количество точек в кластере
+        samples: Количество id точек, возвращаемых для кластера
+
+    Returns:
+        Словарь с размером ячейки, кластерами и отдельными точками
+    """
+
+    size = cell_size(zoom)
+    area = Q()
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        area |= Q(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        )
+    cell = [F("cell_y"), F("cell_x")]
+
+    rows = (
+        Point.objects.filter(area)
+        .annotate(
+            cell_x=Floor((F("longitude") + 180) / size),
+            cell_y=Floor((F("latitude") + 90) / size),
+        )
+        .annotate(
+            cell_count=Window(Count("id"), partition_by=cell),
+            cell_latitude=Window(Avg("latitude"), partition_by=cell),
+            cell_longitude=Window(Avg("longitude"), partition_by=cell),
+            cell_rank=Window(RowNumber(), partition_by=cell, order_by=F("id").asc()),
+        )
+        # из каждой ячейки нужны только первые строки: образцы кластера
+        # или все точки ячейки, если их меньше порога
+        .filter(cell_rank__lte=max(threshold - 1, samples))
+        .order_by("cell_y", "cell_x", "id")
+        .values(
+            "id",
+            "name",
+            "latitude",
+            "longitude",
+            "cell_x",
+            "cell_y",
+            "cell_count",
+            "cell_latitude",
+            "cell_longitude",
+            "cell_rank",
+        )
+    )
+
+    clusters: dict[tuple[int, int], dict[str, Any]] = {}
+    points = []
+    for row in rows:
+        if row["cell_count"] < threshold:
+            points.append(
+                {key: row[key] for key in ("id", "name", "latitude", "longitude")}
+            )
+            continue
+        key = (row["cell_y"], row["cell_x"])
+        if key not in clusters:
+            clusters[key] = {
+                "latitude": row["cell_latitude"],
+                "longitude": row["cell_longitude"],
+                "count": row["cell_count"],
+                "sample_ids": [],
+            }
+        if row["cell_rank"] <= samples:
+            clusters[key]["sample_ids"].append(row["id"])
+
+    return {
+        "zoom": zoom,
+        "cell_size": size,
+        "clusters": list(clusters.values()),
+        "points": points,
+    }
@@ -0,0 +1,155 @@
+"""
+Условные GET-запросы (ETag / Last-Modified).
+
+Валидаторы вычисляются одним агрегирующим запросом по updated_at до выборки
+и сериализации данных, поэтому на неизменившиеся данные отвечается 304 без
+загрузки строк: для точки - по точке и её сообщениям, для списков и поиска -
+по максимуму updated_at и количеству точек отфильтрованной выборки.
+ETag зависит от параметров запроса, заголовка Accept и пользователя, а ответы
+содержат Vary: Accept, Authorization, поэтому сохранённое тело одного
+представления не подтверждается для другого.
+"""
+
+import hashlib
+from calendar import timegm
+from datetime import datetime
+
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Point
+
+
+def request_variant(request: HttpRequest) -> str:
+    """
+    Параметры запроса, от которых зависит представление ответа:
+    query-параметры, заголовок Accept и пользователь
+    """
+
+    user = getattr(request, "user", None)
+    return (
+        f"{request.GET.urlencode()}:{request.headers.get('Accept', '')}:"
+        f"{getattr(user, 'pk', None)}"
+    )
+
+
+def _etag(state: str) -> str:
+    return f'"{hashlib.sha1(state.encode()).hexdigest()}"'
+
+
+def queryset_state(
+    queryset: QuerySet, with_messages: bool = False
+) -> tuple[str, datetime | None]:
+    """
+    Вычисляет состояние выборки точек одним агрегирующим запросом: максимум
+    updated_at и количество точек. Создание и изменение точки (в том числе её
+    счётчиков сообщений) меняют максимум, удаление - количество.
+
+    Args:
+        queryset: Отфильтрованная выборка точек
+        with_messages: Учитывать изменения сообщений (ответ содержит последние
+            сообщения точек, а правка сообщения не меняет updated_at точки)
+
+    Returns:
+        (состояние для ETag, дата последнего изменения или None для пустой выборки)
+    """
+
+    aggregates = {
+        "updated_at": Max("updated_at"),
+        "count": Count("id", distinct=with_messages),
+    }
+    if with_messages:
+        aggregates["messages_updated_at"] = Max("message__updated_at")
+    row = queryset.order_by().aggregate(**aggregates)
+    stamps = [row["updated_at"], row.get("messages_updated_at")]
+    last_modified = max((stamp for stamp in stamps if stamp is not None), default=None)
+    state = ":".join(
+        [str(row["count"])] + [stamp.isoformat() if stamp else "" for stamp in stamps]
+    )
+    return state, last_modified
+
+
+def content_validators(
+    state: tuple[str, datetime | None], request: HttpRequest
+) -> tuple[str, datetime | None]:
+    """
+    Строит валидаторы ответа по состоянию выборки (queryset_state) и запросу
+
+    Returns:
+        (ETag, Last-Modified)
+    """
+    return _etag(f"{state[0]}:{request_variant(request)}"), state[1]
+
+
+def point_validators(point_id: int, variant: str = "") -> tuple[str, datetime] | None:
+    """
+    Вычисляет валидаторы точки вместе с её сообщениями одним запросом.
+    Изменение и удаление сообщения меняют максимум updated_at или их количество
+    (а также updated_at точки через счётчики), поэтому ETag меняется при любом
+    изменении, видимом в ответе.
+
+    Args:
+        point_id: ID точки
+        variant: Параметры запроса, влияющие на ответ (например, страница)
+
+    Returns:
+        (ETag, Last-Modified) или None, если точки нет
+    """
+
+    row = Point.objects.filter(id=point_id).aggregate(
+        updated_at=Max("updated_at"),
+        messages_updated_at=Max("message__updated_at"),
+        messages=Count("message"),
+    )
+    if row["updated_at"] is None:
+        return None
+    last_modified = max(
+        row["updated_at"], row["messages_updated_at"] or row["updated_at"]
+    )
+    state = (
+        f"{point_id}:{row['updated_at'].isoformat()}:{last_modified.isoformat()}:"
+        f"{row['messages']}:{variant}"
+    )
+    return _etag(state), last_modified
+
+
+def not_modified(
+    request: HttpRequest, etag: str, last_modified: datetime | None
+) -> HttpResponse | None:
+    """
+    Возвращает ответ 304 (или 412 для If-Match), если данные клиента актуальны
+
+    Args:
+        request: Запрос
+        etag: Текущий ETag
+        last_modified: Текущая дата изменения (None, если неизвестна)
+
+    Returns:
+        Готовый ответ или None, если запрос нужно выполнить
+    """
+
+    if request.method not in ("GET", "HEAD"):
+        return None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timegm(last_modified.utctimetuple()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(
+    response: HttpResponse, etag: str, last_modified: datetime | None
+) -> None:
+    """
+    Добавляет в ответ заголовки ETag, Last-Modified и Vary
+    """
+
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(timegm(last_modified.utctimetuple()))
+    patch_vary_headers(response, ("Accept", "Authorization"))
@@ -0,0 +1,365 @@
+"""
+Поиск гео-точек вдоль маршрута: в коридоре заданной ширины вокруг ломаной
+"""
+
+from collections import defaultdict
+from itertools import product
+from math import asin, cos, degrees, floor, pi, radians, sin, sqrt
+from typing import Iterable
+
+from django.db.models import Q, QuerySet
+
+from .geo import AVERAGE_EARTH_RADIUS, BOX_MARGIN, Box, haversine, normalize_longitude
+from .models import Point
+
+LatLon = tuple[float, float]
+Vector = tuple[float, float, float]
+
+# если прямоугольников больше, в префильтре объединяются соседние отрезки
+MAX_PREFILTER_BOXES: int = 64
+# отрезок, прямоугольники которого покрывают больше ячеек сетки отрезков,
+# проверяется для всех точек
+MAX_SEGMENT_CELLS: int = 256
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> list[LatLon]:
+    """
+    Декодирует ломаную в формате Encoded Polyline Algorithm (Google)
+
+    Args:
+        encoded: Закодированная строка
+        precision: Количество знаков после запятой в координатах (5 или 6)
+
+    Returns:
+        Список вершин (широта, долгота)
+
+    Raises:
+        ValueError: Если строка повреждена или координаты вне допустимого диапазона
+    """
+
+    factor = 10**precision
+    values: list[int] = []
+    result, shift = 0, 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        if not 0 <= chunk < 64:
+            raise ValueError(f"invalid polyline character: {char!r}")
+        result |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            result, shift = 0, 0
+    if shift or len(values) % 2:
+        raise ValueError("polyline is truncated")
+
+    path = []
+    lat, lon = 0, 0
+    for i in range(0, len(values), 2):
+        lat += values[i]
+        lon += values[i + 1]
+        if not (
+            -90 * factor <= lat <= 90 * factor and -180 * factor <= lon <= 180 * factor
+        ):
+            raise ValueError("polyline coordinates are out of range")
+        path.append((lat / factor, lon / factor))
+    return path
+
+
+def _vector(lat: float, lon: float) -> Vector:
+    lat, lon = radians(lat), radians(lon)
+    return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
+
+
+def _dot(u: Vector, v: Vector) -> float:
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def _cross(u: Vector, v: Vector) -> Vector:
+    return (
+        u[1] * v[2] - u[2] * v[1],
+        u[2] * v[0] - u[0] * v[2],
+        u[0] * v[1] - u[1] * v[0],
+    )
+
+
+def _unit(u: Vector) -> Vector | None:
+    norm = sqrt(_dot(u, u))
+    if norm < 1e-12:
+        return None
+    return u[0] / norm, u[1] / norm, u[2] / norm
+
+
+def _normal(a: Vector, b: Vector) -> Vector | None:
+    """
+    Единичная нормаль к плоскости большого круга отрезка, None для вырожденного отрезка
+    """
+    return _unit(_cross(a, b))
+
+
+def _on_arc(a: Vector, b: Vector, normal: Vector, c: Vector) -> bool:
+    """
+    Лежит ли точка c большого круга на дуге от a до b
+    """
+    return _dot(_cross(a, c), normal) >= 0 and _dot(_cross(c, b), normal) >= 0
+
+
+def segment_distance(lat: float, lon: float, start: LatLon, end: LatLon) -> float:
+    """
+    Вычисляет расстояние от гео-точки до отрезка большого круга
+
+    Args:
+        lat: Широта точки
+        lon: Долгота точки
+        start: Начало отрезка (широта, долгота)
+        end: Конец отрезка (широта, долгота)
+
+    Returns:
+        Расстояние в километрах
+    """
+
+    a, b, p = _vector(*start), _vector(*end), _vector(lat, lon)
+    normal = _normal(a, b)
+    if normal is not None:
+        # проекция точки на большой круг отрезка
+        foot = _unit(tuple(p[i] - _dot(p, normal) * normal[i] for i in range(3)))
+        if foot is not None and _on_arc(a, b, normal, foot):
+            return AVERAGE_EARTH_RADIUS * asin(min(1.0, abs(_dot(p, normal))))
+    return min(haversine(lat, lon, *start), haversine(lat, lon, *end))
+
+
+def segment_boxes(start: LatLon, end: LatLon, buffer_km: float) -> list[Box]:
+    """
+    Строит прямоугольники (min_lat, max_lat, min_lon, max_lon), покрывающие
+    коридор шириной buffer_km вокруг отрезка большого круга. Учитывает выгиб дуги
+    к полюсу и пересечение антимеридиана.
+
+    Args:
+        start: Начало отрезка (широта, долгота)
+        end: Конец отрезка (широта, долгота)
+        buffer_km: Ширина коридора в километрах
+
+    Returns:
+        Список прямоугольников
+    """
+
+    min_lat, max_lat = sorted((start[0], end[0]))
+    a, b = _vector(*start), _vector(*end)
+    normal = _normal(a, b)
+    if normal is not None:
+        # самые северная и южная точки большого круга
+        top = _unit(
+            (-normal[2] * normal[0], -normal[2] * normal[1], 1 - normal[2] ** 2)
+        )
+        if top is not None:
+            for vertex in (top, (-top[0], -top[1], -top[2])):
+                if _on_arc(a, b, normal, vertex):
+                    vertex_lat = degrees(asin(max(-1.0, min(1.0, vertex[2]))))
+                    min_lat, max_lat = min(min_lat, vertex_lat), max(
+                        max_lat, vertex_lat
+                    )
+
+    angular = buffer_km / AVERAGE_EARTH_RADIUS
+    if angular >= pi / 2:
+        return [(-90.0, 90.0, -180.0, 180.0)]
+    widest = max(abs(min_lat), abs(max_lat))
+    min_lat -= degrees(angular) + BOX_MARGIN
+    max_lat += degrees(angular) + BOX_MARGIN
+    if min_lat <= -90 or max_lat >= 90:
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+    ratio = sin(angular) / cos(radians(widest))
+    if ratio >= 1:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    # по долготе дуга короче 180° идёт монотонно между концами
+    delta_lon = degrees(asin(ratio)) + BOX_MARGIN
+    start_lon = normalize_longitude(start[1])
+    end_lon = start_lon + normalize_longitude(end[1] - start[1])
+    min_lon = min(start_lon, end_lon) - delta_lon
+    max_lon = max(start_lon, end_lon) + delta_lon
+    if max_lon - min_lon >= 360:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    if min_lon < -180:
+        return [
+            (min_lat, max_lat, min_lon + 360, 180.0),
+            (min_lat, max_lat, -180.0, max_lon),
+        ]
+    if max_lon > 180:
+        return [
+            (min_lat, max_lat, min_lon, 180.0),
+            (min_lat, max_lat, -180.0, max_lon - 360),
+        ]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def _segments(path: list[LatLon]) -> list[tuple[LatLon, LatLon]]:
+    if len(path) == 1:
+        return [(path[0], path[0])]
+    return list(zip(path, path[1:]))
+
+
+def _envelope(boxes: list[Box]) -> Box:
+    return (
+        min(box[0] for box in boxes),
+        max(box[1] for box in boxes),
+        min(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    )
+
+
+def _area(box: Box) -> float:
+    return (box[1] - box[0]) * (box[3] - box[2])
+
+
+def merge_boxes(boxes: list[Box]) -> list[Box]:
+    """
+    Объединяет подряд идущие прямоугольники соседних отрезков, если их общий
+    прямоугольник не больше суммы их площадей (объединение почти ничего не добавляет)
+
+    Args:
+        boxes: Прямоугольники в порядке отрезков маршрута
+
+    Returns:
+        Список прямоугольников, покрывающих все исходные
+    """
+
+    merged: list[Box] = []
+    for box in boxes:
+        if merged:
+            envelope = _envelope([merged[-1], box])
+            if _area(envelope) <= _area(merged[-1]) + _area(box):
+                merged[-1] = envelope
+                continue
+        merged.append(box)
+    return merged
+
+
+def corridor_prefilter(
+    queryset: QuerySet[Point], path: list[LatLon], buffer_km: float
+) -> QuerySet[Point]:
+    """
+    Сужает выборку до кандидатов, которые могут оказаться в коридоре:
+    фильтр по ограничивающим прямоугольникам отрезков (индекс по широте и долготе).
+    Прямоугольники соседних отрезков объединяются (merge_boxes), а если их всё
+    ещё больше MAX_PREFILTER_BOXES, соседние прямоугольники объединяются группами,
+    чтобы условие запроса оставалось небольшим.
+
+    Args:
+        queryset: Исходная выборка точек
+        path: Вершины ломаной (широта, долгота)
+        buffer_km: Ширина коридора в километрах
+
+    Returns:
+        QuerySet точек-кандидатов
+    """
+
+    if not path or buffer_km != buffer_km or buffer_km < 0:
+        return queryset.none()
+
+    boxes = merge_boxes(
+        [
+            box
+            for start, end in _segments(path)
+            for box in segment_boxes(start, end, buffer_km)
+        ]
+    )
+    if len(boxes) > MAX_PREFILTER_BOXES:
+        group = -(-len(boxes) // MAX_PREFILTER_BOXES)
+        boxes = [_envelope(boxes[i : i + group]) for i in range(0, len(boxes), group)]
+
+    area = Q()
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        area |= Q(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        )
+    return queryset.filter(area)
+
+
+def _in_box(lat: float, lon: float, box: Box) -> bool:
+    return box[0] <= lat <= box[1] and box[2] <= lon <= box[3]
+
+
+class SegmentGrid:
+    """
+    Сетка отрезков маршрута: каждый отрезок записан в ячейки, которые покрывают
+    его прямоугольники, поэтому для точки проверяются только отрезки её ячейки
+    """
+
+    def __init__(self, boxes: list[list[Box]], cell_degrees: float) -> None:
+        """
+        Args:
+            boxes: Прямоугольники каждого отрезка (segment_boxes)
+            cell_degrees: Размер ячейки сетки в градусах
+        """
+
+        self.cell_degrees = cell_degrees
+        self.cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        self.everywhere: list[int] = []
+        for index, segment in enumerate(boxes):
+            keys: set[tuple[int, int]] = set()
+            for min_lat, max_lat, min_lon, max_lon in segment:
+                rows = range(self._cell(min_lat), self._cell(max_lat) + 1)
+                columns = range(self._cell(min_lon), self._cell(max_lon) + 1)
+                keys.update(product(rows, columns))
+                if len(keys) > MAX_SEGMENT_CELLS:
+                    break
+            if len(keys) > MAX_SEGMENT_CELLS:
+                self.everywhere.append(index)
+            else:
+                for key in keys:
+                    self.cells[key].append(index)
+
+    def _cell(self, degrees_value: float) -> int:
+        return floor(degrees_value / self.cell_degrees)
+
+    def near(self, lat: float, lon: float) -> list[int]:
+        """
+        Возвращает индексы отрезков, прямоугольники которых могут содержать точку
+        """
+        return self.cells.get((self._cell(lat), self._cell(lon)), []) + self.everywhere
+
+
+def points_along(
+    points: Iterable[Point], path: list[LatLon], buffer_km: float
+) -> list[tuple[Point, float, int]]:
+    """
+    Оставляет точки, находящиеся не дальше buffer_km от ломаной, и для каждой
+    находит ближайший отрезок. Точное расстояние считается только до отрезков
+    из ячейки точки в сетке отрезков (SegmentGrid), в прямоугольники которых
+    попадает точка.
+
+    Args:
+        points: Точки-кандидаты
+        path: Вершины ломаной (широта, долгота)
+        buffer_km: Ширина коридора в километрах
+
+    Returns:
+        Список (точка, расстояние в километрах, индекс ближайшего отрезка),
+        упорядоченный по отрезкам маршрута и расстоянию
+    """
+
+    if not path:
+        return []
+    segments = _segments(path)
+    boxes = [segment_boxes(a, b, buffer_km) for a, b in segments]
+    # ячейка порядка ширины коридора: отрезок попадает в несколько ячеек
+    grid = SegmentGrid(boxes, max(2 * degrees(buffer_km / AVERAGE_EARTH_RADIUS), 0.01))
+
+    found = []
+    for point in points:
+        best: tuple[float, int] | None = None
+        for index in grid.near(point.latitude, point.longitude):
+            if not any(
+                _in_box(point.latitude, point.longitude, box) for box in boxes[index]
+            ):
+                continue
+            start, end = segments[index]
+            candidate = (
+                segment_distance(point.latitude, point.longitude, start, end),
+                index,
+            )
+            if candidate[0] <= buffer_km and (best is None or candidate < best):
+                best = candidate
+        if best is not None:
+            found.append((point, best[0], best[1]))
+    found.sort(key=lambda item: (item[2], item[1], item[0].id))
+    return found
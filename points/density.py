@@ -0,0 +1,190 @@
+"""
+Предварительно агрегированная сетка плотности точек и сообщений
+"""
+
+from collections import defaultdict
+from math import floor
+from typing import Any
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField
+from django.db.models.functions import Cast, Floor
+
+from .geo import Box
+from .models import DensityCell, Message, Point
+
+Key = tuple[int, int, int]  # уровень, ячейка по широте, ячейка по долготе
+
+
+def levels() -> tuple[int, ...]:
+    """
+    Уровни сетки: на уровне level размер ячейки 10^-level градусов
+    """
+    return tuple(getattr(settings, "POINTS_DENSITY_LEVELS", (0, 1, 2)))
+
+
+def cell_key(lat: float, lon: float, level: int) -> Key:
+    """
+    Возвращает ячейку сетки заданного уровня, в которую попадают координаты
+    """
+
+    scale = 10**level
+    return level, floor(lat * scale), floor(lon * scale)
+
+
+def point_deltas(
+    lat: float, lon: float, points: int, messages: int
+) -> dict[Key, list[int]]:
+    """
+    Изменения счётчиков во всех уровнях сетки для одной точки
+
+    Args:
+        lat: Широта точки
+        lon: Долгота точки
+        points: Изменение количества точек
+        messages: Изменение количества сообщений
+
+    Returns:
+        Словарь ячейка -> [изменение точек, изменение сообщений]
+    """
+    return {cell_key(lat, lon, level): [points, messages] for level in levels()}
+
+
+def merge_deltas(*parts: dict[Key, list[int]]) -> dict[Key, list[int]]:
+    """
+    Складывает изменения счётчиков по ячейкам
+    """
+
+    merged: dict[Key, list[int]] = defaultdict(lambda: [0, 0])
+    for part in parts:
+        for key, (points, messages) in part.items():
+            merged[key][0] += points
+            merged[key][1] += messages
+    return merged
+
+
+def apply_deltas(deltas: dict[Key, list[int]]) -> None:
+    """
+    Атомарно применяет изменения счётчиков: существующие ячейки обновляются
+    F-выражениями, отсутствующие создаются
+
+    Args:
+        deltas: Словарь ячейка -> [изменение точек, изменение сообщений]
+    """
+
+    for (level, cell_y, cell_x), (points, messages) in deltas.items():
+        if not points and not messages:
+            continue
+        cell = DensityCell.objects.filter(level=level, cell_y=cell_y, cell_x=cell_x)
+        changes = {
+            "points_count": F("points_count") + points,
+            "messages_count": F("messages_count") + messages,
+        }
+        if cell.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DensityCell.objects.create(
+                    level=level,
+                    cell_y=cell_y,
+                    cell_x=cell_x,
+                    points_count=points,
+                    messages_count=messages,
+                )
+        except IntegrityError:
+            # ячейку успел создать параллельный запрос
+            cell.update(**changes)
+
+
+def rebuild() -> int:
+    """
+    Пересчитывает сетку плотности с нуля агрегирующими запросами к базе
+
+    Returns:
+        Количество непустых ячеек
+    """
+
+    cells: dict[Key, list[int]] = defaultdict(lambda: [0, 0])
+    for level in levels():
+        scale = 10**level
+        for prefix, model, counter in (
+            ("", Point, 0),
+            ("point__", Message, 1),
+        ):
+            rows = (
+                model.objects.annotate(
+                    cell_y=Cast(Floor(F(f"{prefix}latitude") * scale), IntegerField()),
+                    cell_x=Cast(Floor(F(f"{prefix}longitude") * scale), IntegerField()),
+                )
+                .values("cell_y", "cell_x")
+                .annotate(total=Count("id"))
+                .order_by()
+            )
+            for row in rows:
+                cells[level, row["cell_y"], row["cell_x"]][counter] += row["total"]
+
+    with transaction.atomic():
+        DensityCell.objects.all().delete()
+        DensityCell.objects.bulk_create(
+            (
+                DensityCell(
+                    level=level,
+                    cell_y=cell_y,
+                    cell_x=cell_x,
+                    points_count=points,
+                    messages_count=messages,
+                )
+                for (level, cell_y, cell_x), (points, messages) in cells.items()
+            ),
+            batch_size=5000,
+        )
+    return len(cells)
+
+
+def heatmap(level: int, boxes: list[Box]) -> list[dict[str, Any]]:
+    """
+    Возвращает непустые ячейки сетки в прямоугольниках, не обращаясь к таблице точек
+
+    Args:
+        level: Уровень сетки
+        boxes: Прямоугольники (min_lat, max_lat, min_lon, max_lon)
+
+    Returns:
+        Список ячеек с центром и счётчиками
+    """
+
+    size = 10.0**-level
+    result = []
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        _, y_from, x_from = cell_key(min_lat, min_lon, level)
+        _, y_to, x_to = cell_key(max_lat, max_lon, level)
+        cells = DensityCell.objects.filter(
+            level=level,
+            cell_y__range=(y_from, y_to),
+            cell_x__range=(x_from, x_to),
+            points_count__gt=0,
+        ).order_by("cell_y", "cell_x")
+        result += [
+            {
+                "latitude": (cell.cell_y + 0.5) * size,
+                "longitude": (cell.cell_x + 0.5) * size,
+                "points": cell.points_count,
+                "messages": cell.messages_count,
+            }
+            for cell in cells
+        ]
+    return result
+
+
+def count_cells(level: int, boxes: list[Box]) -> int:
+    """
+    Возвращает количество ячеек сетки в прямоугольниках
+    """
+
+    total = 0
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        _, y_from, x_from = cell_key(min_lat, min_lon, level)
+        _, y_to, x_to = cell_key(max_lat, max_lon, level)
+        total += (y_to - y_from + 1) * (x_to - x_from + 1)
+    return total
@@ -0,0 +1,102 @@
+"""
+Пакетное вычисление расстояний по формуле гаверсинусов.
+Если установлен NumPy, расстояния считаются сразу по массивам координат,
+иначе используется скалярная формула из geo.haversine.
+"""
+
+from typing import Sequence
+
+from .geo import AVERAGE_EARTH_RADIUS, haversine
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy необязателен
+    np = None
+
+
+# для коротких списков накладные расходы NumPy больше выигрыша
+VECTORIZE_MIN_SIZE: int = 16
+
+
+def has_numpy() -> bool:
+    """
+    Доступен ли векторизованный расчёт
+    """
+    return np is not None
+
+
+def as_array(values: Sequence[float]) -> Sequence[float]:
+    """
+    Преобразует координаты в массив NumPy, если он доступен, чтобы при нескольких
+    расчётах по одним и тем же точкам массив строился один раз
+    """
+
+    if np is None:
+        return list(values)
+    return np.asarray(values, dtype=np.float64)
+
+
+def haversine_many(
+    lat: float,
+    lon: float,
+    lats: Sequence[float],
+    lons: Sequence[float],
+    vectorize: bool | None = None,
+) -> Sequence[float]:
+    """
+    Вычисляет расстояния от одной гео-точки до набора гео-точек
+
+    Args:
+        lat: Широта исходной точки
+        lon: Долгота исходной точки
+        lats: Широты точек
+        lons: Долготы точек
+        vectorize: Использовать NumPy (по умолчанию - если он установлен
+            и точек не меньше VECTORIZE_MIN_SIZE)
+
+    Returns:
+        Расстояния в километрах в том же порядке, что и точки
+        (numpy.ndarray или list)
+    """
+
+    if vectorize is None:
+        vectorize = np is not None and len(lats) >= VECTORIZE_MIN_SIZE
+    if not vectorize or np is None:
+        return [haversine(lat, lon, p_lat, p_lon) for p_lat, p_lon in zip(lats, lons)]
+
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return AVERAGE_EARTH_RADIUS * (2 * np.arcsin(np.sqrt(a)))
+
+
+def within_radius(
+    lat: float,
+    lon: float,
+    lats: Sequence[float],
+    lons: Sequence[float],
+    radius_km: float,
+) -> list[bool]:
+    """
+    Для каждой точки определяет, находится ли она в пределах радиуса
+
+    Args:
+        lat: Широта центра
+        lon: Долгота центра
+        lats: Широты точек
+        lons: Долготы точек
+        radius_km: Радиус в километрах
+
+    Returns:
+        Список флагов в том же порядке, что и точки
+    """
+
+    distances = haversine_many(lat, lon, lats, lons)
+    if np is not None and isinstance(distances, np.ndarray):
+        return (distances <= radius_km).tolist()
+    return [distance <= radius_km for distance in distances]
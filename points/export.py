@@ -0,0 +1,102 @@
+"""
+Потоковая выгрузка гео-точек и сообщений в NDJSON и GeoJSON
+"""
+
+import json
+from typing import Any, Iterator
+
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Point, Message
+from .serializers import PointSerializer, PointListSerializer
+
+EXPORT_FORMATS: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+}
+
+
+def export_rows(with_messages: bool = False, chunk_size: int = 2000) -> Iterator[dict]:
+    """
+    Отдаёт сериализованные точки по одной, читая таблицу пачками,
+    поэтому расход памяти не зависит от размера таблицы
+
+    Args:
+        with_messages: Добавлять ли сообщения точек
+        chunk_size: Количество точек, загружаемых за один запрос
+
+    Yields:
+        Словари с данными точек
+    """
+
+    queryset = Point.objects.select_related("creator").order_by("id")
+    serializer_class = PointListSerializer
+    if with_messages:
+        queryset = queryset.prefetch_related(
+            Prefetch("message_set", queryset=Message.objects.select_related("author"))
+        )
+        serializer_class = PointSerializer
+    for point in queryset.iterator(chunk_size=chunk_size):
+        yield serializer_class(point).data
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+
+
+def ndjson_stream(rows: Iterator[dict]) -> Iterator[str]:
+    """
+    Выгрузка в формате NDJSON: одна точка на строку
+    """
+
+    for row in rows:
+        yield _dumps(row) + "\n"
+
+
+def geojson_stream(rows: Iterator[dict]) -> Iterator[str]:
+    """
+    Выгрузка в формате GeoJSON FeatureCollection
+    """
+
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for row in rows:
+        properties = dict(row)
+        point_id = properties.pop("id")
+        feature = {
+            "type": "Feature",
+            "id": point_id,
+            "geometry": {
+                "type": "Point",
+                "coordinates": [
+                    properties.pop("longitude"),
+                    properties.pop("latitude"),
+                ],
+            },
+            "properties": properties,
+        }
+        yield separator + _dumps(feature)
+        separator = ",\n"
+    yield "]}\n"
+
+
+def export_stream(
+    output: str, with_messages: bool = False, chunk_size: int = 2000
+) -> Iterator[str]:
+    """
+    Возвращает потоковую выгрузку в заданном формате
+
+    Args:
+        output: Формат выгрузки (ndjson или geojson)
+        with_messages: Добавлять ли сообщения точек
+        chunk_size: Количество точек, загружаемых за один запрос
+
+    Returns:
+        Итератор строк выгрузки
+    """
+
+    rows = export_rows(with_messages, chunk_size)
+    if output == "geojson":
+        return geojson_stream(rows)
+    return ndjson_stream(rows)
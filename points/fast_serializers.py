@@ -0,0 +1,109 @@
+"""
+Быстрая сериализация для ответов только на чтение.
+
+Вместо ModelSerializer словари строятся прямо из строк .values(): без создания
+моделей и без обхода полей сериализатора на каждую строку. Значения приводятся
+теми же полями DRF, поэтому результат совпадает с PointListSerializer
+и MessageSerializer.
+"""
+
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+# поля ответа -> поля .values()
+POINT_FIELDS: dict[str, str] = {
+    "id": "id",
+    "name": "name",
+    "description": "description",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "creator": "creator__username",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "messages_count": "messages_count",
+    "last_message_at": "last_message_at",
+}
+MESSAGE_FIELDS: dict[str, str] = {
+    "id": "id",
+    "text": "text",
+    "author": "author__username",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+def is_enabled() -> bool:
+    """
+    Включена ли быстрая сериализация в настройках
+    """
+    return getattr(settings, "POINTS_FAST_SERIALIZATION", False)
+
+
+def point_values(queryset: QuerySet) -> QuerySet:
+    """
+    Возвращает выборку строк точек с полями облегчённого представления
+    """
+    return queryset.values(*POINT_FIELDS.values())
+
+
+def message_values(queryset: QuerySet) -> QuerySet:
+    """
+    Возвращает выборку строк сообщений с полями MessageSerializer
+    """
+    return queryset.values(*MESSAGE_FIELDS.values())
+
+
+def points(rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Строит представления точек (как PointListSerializer без latest_messages)
+
+    Args:
+        rows: Строки point_values()
+
+    Returns:
+        Список словарей
+    """
+
+    return [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "creator": row["creator__username"],
+            "created_at": _datetime(row["created_at"]),
+            "updated_at": _datetime(row["updated_at"]),
+            "messages_count": row["messages_count"],
+            "last_message_at": _datetime(row["last_message_at"]),
+        }
+        for row in rows
+    ]
+
+
+def messages(rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Строит представления сообщений (как MessageSerializer)
+
+    Args:
+        rows: Строки message_values()
+
+    Returns:
+        Список словарей
+    """
+
+    return [
+        {
+            "id": row["id"],
+            "text": row["text"],
+            "author": row["author__username"],
+            "created_at": _datetime(row["created_at"]),
+            "updated_at": _datetime(row["updated_at"]),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,19 @@
+"""
+Фильтры и сортировки списков
+"""
+
+from rest_framework.filters import OrderingFilter
+
+
+class TieBreakingOrderingFilter(OrderingFilter):
+    """
+    Сортировка по query-параметру ordering с добавлением id в конец ключа,
+    чтобы порядок записей с одинаковым значением поля был детерминированным
+    (это требуется курсорной пагинации)
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or ordering[-1].lstrip("-") in ("id", "pk"):
+            return ordering
+        return (*ordering, "-id" if ordering[0].startswith("-") else "id")
@@ -0,0 +1,179 @@
+"""
+Геометрия на сфере: расстояния, ограничивающие прямоугольники и geohash
+"""
+
+from math import radians, degrees, cos, sin, asin, sqrt, pi, floor, isfinite
+
+AVERAGE_EARTH_RADIUS: int = 6371  # средний радиус Земли в километрах
+
+GEOHASH_PRECISION: int = 12  # длина geohash, хранимого у точки
+GEOHASH_ALPHABET: str = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Запас в градусах, чтобы ошибки округления не отсекали точки ровно на границе радиуса
+BOX_MARGIN: float = 1e-6
+
+Box = tuple[float, float, float, float]
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Вычисляет расстояние между двумя гео-точками по формуле гаверсинусов
+
+    Args:
+        lat1: Широта первой точки
+        lon1: Долгота первой точки
+        lat2: Широта второй точки
+        lon2: Долгота второй точки
+
+    Returns:
+        Расстояние между точками в километрах
+    """
+
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    return AVERAGE_EARTH_RADIUS * (2 * asin(sqrt(a)))
+
+
+def normalize_longitude(lon: float) -> float:
+    """
+    Приводит долготу к диапазону [-180, 180)
+    """
+    return (lon + 180) % 360 - 180
+
+
+def bounding_boxes(lat: float, lon: float, radius_km: float) -> list[Box] | None:
+    """
+    Строит прямоугольники (min_lat, max_lat, min_lon, max_lon), которые гарантированно
+    покрывают круг заданного радиуса. Если круг пересекает антимеридиан,
+    возвращается два прямоугольника.
+
+    Args:
+        lat: Широта центра
+        lon: Долгота центра
+        radius_km: Радиус в километрах
+
+    Returns:
+        Список прямоугольников, пустой список если круг пуст,
+        None если ограничить область нельзя (круг покрывает всю сферу или центр некорректен)
+    """
+
+    if not (isfinite(lat) and isfinite(lon)) or not -90 <= lat <= 90:
+        return None
+    if radius_km != radius_km or radius_km < 0:  # NaN или отрицательный радиус
+        return []
+
+    angular = radius_km / AVERAGE_EARTH_RADIUS
+    if angular >= pi:
+        return None
+
+    min_lat = lat - degrees(angular) - BOX_MARGIN
+    max_lat = lat + degrees(angular) + BOX_MARGIN
+    if min_lat <= -90 or max_lat >= 90:
+        # круг накрывает полюс: подходят все долготы
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+
+    ratio = sin(angular) / cos(radians(lat))
+    if ratio >= 1:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    delta_lon = degrees(asin(ratio)) + BOX_MARGIN
+    lon = normalize_longitude(lon)
+    min_lon = lon - delta_lon
+    max_lon = lon + delta_lon
+    if min_lon < -180:
+        return [
+            (min_lat, max_lat, min_lon + 360, 180.0),
+            (min_lat, max_lat, -180.0, max_lon),
+        ]
+    if max_lon > 180:
+        return [
+            (min_lat, max_lat, min_lon, 180.0),
+            (min_lat, max_lat, -180.0, max_lon - 360),
+        ]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Кодирует координаты в geohash заданной длины
+
+    Args:
+        lat: Широта
+        lon: Долгота
+        precision: Количество символов geohash
+
+    Returns:
+        Строка geohash
+    """
+
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, char, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            char = (char << 1) | 1
+            rng[0] = mid
+        else:
+            char <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(GEOHASH_ALPHABET[char])
+            bit, char = 0, 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+    """
+    Возвращает размер ячейки geohash (высота по широте, ширина по долготе) в градусах
+    """
+
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def geohash_cover(boxes: list[Box], max_cells: int = 32) -> list[str]:
+    """
+    Подбирает наиболее точный набор префиксов geohash, покрывающий прямоугольники,
+    так чтобы количество ячеек не превышало max_cells
+
+    Args:
+        boxes: Прямоугольники (min_lat, max_lat, min_lon, max_lon)
+        max_cells: Максимальное количество ячеек в покрытии
+
+    Returns:
+        Список префиксов geohash, пустой если область слишком велика
+    """
+
+    best: list[str] = []
+    for precision in range(2, GEOHASH_PRECISION + 1):
+        cell_lat, cell_lon = geohash_cell_size(precision)
+        cells: set[str] = set()
+        for min_lat, max_lat, min_lon, max_lon in boxes:
+            lat_from = floor((min_lat + 90) / cell_lat)
+            lat_to = min(floor((max_lat + 90) / cell_lat), floor(180 / cell_lat) - 1)
+            lon_from = floor((min_lon + 180) / cell_lon)
+            lon_to = min(floor((max_lon + 180) / cell_lon), floor(360 / cell_lon) - 1)
+            if (lat_to - lat_from + 1) * (lon_to - lon_from + 1) > max_cells:
+                return best
+            for i in range(lat_from, lat_to + 1):
+                for j in range(lon_from, lon_to + 1):
+                    cells.add(
+                        encode_geohash(
+                            -90 + (i + 0.5) * cell_lat,
+                            -180 + (j + 0.5) * cell_lon,
+                            precision,
+                        )
+                    )
+        if len(cells) > max_cells:
+            return best
+        best = sorted(cells)
+    return best
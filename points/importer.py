@@ -0,0 +1,176 @@
+"""
+Массовый импорт гео-точек и сообщений из NDJSON и CSV
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+from django.db import DatabaseError, transaction
+
+from .geo import encode_geohash
+from .models import Point, Message
+from .serializers import PointSerializer, MessageSerializer
+from .signals import points_bulk_created
+
+IMPORT_FORMATS: tuple[str, ...] = ("ndjson", "csv")
+
+Row = tuple[int, dict[str, Any] | None, Any]
+
+
+@dataclass
+class ImportResult:
+    """
+    Итог импорта
+
+    Attributes:
+        created: Количество созданных точек
+        messages_created: Количество созданных сообщений
+        errors: Ошибки по строкам: номер строки и описание ошибок
+    """
+
+    created: int = 0
+    messages_created: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        Возвращает итог импорта для ответа API
+        """
+
+        return {
+            "created": self.created,
+            "messages_created": self.messages_created,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def _decode(lines: Iterable[bytes | str]) -> Iterator[str]:
+    for line in lines:
+        yield line.decode("utf-8-sig") if isinstance(line, bytes) else line
+
+
+def parse_ndjson(lines: Iterable[bytes | str]) -> Iterator[Row]:
+    """
+    Разбирает NDJSON построчно
+
+    Yields:
+        (номер строки, данные строки или None, ошибка разбора)
+    """
+
+    for number, line in enumerate(_decode(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, data, None
+
+
+def parse_csv(lines: Iterable[bytes | str]) -> Iterator[Row]:
+    """
+    Разбирает CSV с заголовком (name, description, latitude, longitude)
+
+    Yields:
+        (номер строки, данные строки, None)
+    """
+
+    reader = csv.DictReader(_decode(lines))
+    for data in reader:
+        yield reader.line_num, data, None
+
+
+def parse_rows(lines: Iterable[bytes | str], input_format: str) -> Iterator[Row]:
+    """
+    Разбирает входной поток в заданном формате
+    """
+
+    if input_format == "csv":
+        return parse_csv(lines)
+    return parse_ndjson(lines)
+
+
+def _build(data: dict[str, Any], creator) -> tuple[Point | None, list[Message], Any]:
+    serializer = PointSerializer(data=data)
+    if not serializer.is_valid():
+        return None, [], serializer.errors
+
+    point = Point(**serializer.validated_data, creator=creator)
+    point.geohash = encode_geohash(point.latitude, point.longitude)
+
+    messages = []
+    raw_messages = data.get("messages") or []
+    if not isinstance(raw_messages, list):
+        return None, [], {"messages": ["Expected a list."]}
+    for position, raw in enumerate(raw_messages):
+        message = MessageSerializer(
+            data=raw if isinstance(raw, dict) else {"text": raw}
+        )
+        if not message.is_valid():
+            return None, [], {"messages": {position: message.errors}}
+        messages.append(Message(**message.validated_data, author=creator))
+    point.messages_count = len(messages)
+    return point, messages, None
+
+
+def _flush(batch: list[tuple[int, Point, list[Message]]], result: ImportResult) -> None:
+    if not batch:
+        return
+    try:
+        with transaction.atomic():
+            points = Point.objects.bulk_create([point for _, point, _ in batch])
+            messages = []
+            for (_, _, point_messages), point in zip(batch, points):
+                for message in point_messages:
+                    message.point = point
+                    messages.append(message)
+            Message.objects.bulk_create(messages)
+            Point.objects.filter(
+                id__in=[point.id for point in points if point.messages_count]
+            ).recount_messages()
+            points_bulk_created(points)
+    except DatabaseError as exc:
+        result.errors += [{"row": number, "errors": str(exc)} for number, _, _ in batch]
+        return
+    result.created += len(points)
+    result.messages_created += len(messages)
+
+
+def import_points(rows: Iterable[Row], creator, batch_size: int = 1000) -> ImportResult:
+    """
+    Проверяет строки сериализатором точки и вставляет корректные пачками
+    через bulk_create, каждую пачку в отдельной транзакции.
+    Ошибочные строки пропускаются и попадают в отчёт, не прерывая импорт.
+
+    Args:
+        rows: Строки в виде (номер строки, данные, ошибка разбора)
+        creator: Пользователь, от имени которого создаются точки и сообщения
+        batch_size: Количество точек в одной вставке
+
+    Returns:
+        Итог импорта
+    """
+
+    result = ImportResult()
+    batch: list[tuple[int, Point, list[Message]]] = []
+    for number, data, parse_error in rows:
+        if parse_error is not None:
+            result.errors.append({"row": number, "errors": parse_error})
+            continue
+        point, messages, errors = _build(data, creator)
+        if errors is not None:
+            result.errors.append({"row": number, "errors": errors})
+            continue
+        batch.append((number, point, messages))
+        if len(batch) >= batch_size:
+            _flush(batch, result)
+            batch = []
+    _flush(batch, result)
+    return result
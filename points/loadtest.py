@@ -0,0 +1,346 @@
+"""
+Нагрузочное тестирование запущенного API.
+
+HTTP/1.1-клиент написан на asyncio-потоках без внешних зависимостей: каждый
+виртуальный пользователь держит своё keep-alive соединение. Токен получается
+один раз через /auth/login/ и переиспользуется во всех запросах, а запросы
+выбираются случайно по весам смеси (поиск, список, новое сообщение, вход).
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+from .benchmark import BenchmarkResult
+
+DEFAULT_MIX: dict[str, float] = {"search": 60, "list": 25, "message": 10, "login": 5}
+
+
+class HTTPError(Exception):
+    """
+    Ошибка соединения или разбора ответа
+    """
+
+
+@dataclass
+class HTTPResponse:
+    """
+    Ответ сервера
+    """
+
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        """
+        Разбирает тело ответа как JSON
+        """
+        return json.loads(self.body)
+
+
+class HTTPConnection:
+    """
+    Keep-alive соединение HTTP/1.1 к одному серверу. Если сервер закрыл
+    соединение, оно открывается заново при следующем запросе.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> HTTPResponse:
+        """
+        Выполняет запрос. Запрос на переиспользованном соединении,
+        закрытом сервером, повторяется один раз на новом соединении.
+        """
+
+        reused = self._writer is not None
+        try:
+            return await asyncio.wait_for(
+                self._request(method, path, headers or {}, body), self.timeout
+            )
+        except (ConnectionError, asyncio.IncompleteReadError, HTTPError):
+            await self.close()
+            if not reused:
+                raise
+        return await asyncio.wait_for(
+            self._request(method, path, headers or {}, body), self.timeout
+        )
+
+    async def _request(
+        self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> HTTPResponse:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self._writer.drain()
+
+        response = await self._read_response(method)
+        if response.headers.get("connection", "").lower() == "close":
+            await self.close()
+        return response
+
+    async def _read_response(self, method: str) -> HTTPResponse:
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise HTTPError("connection closed by server")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError) as exc:
+            raise HTTPError(f"bad status line {status_line!r}") from exc
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return HTTPResponse(status, headers, body)
+
+    async def _read_chunked(self) -> bytes:
+        reader = self._reader
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # трейлеры до пустой строки
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self) -> None:
+        """
+        Закрывает соединение
+        """
+
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    Разбирает смесь запросов вида "search=60,list=25,message=10,login=5"
+
+    Raises:
+        ValueError: Неизвестный тип запроса или неположительная сумма весов
+    """
+
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown request type {name!r}")
+        mix[name] = float(weight)
+        if mix[name] < 0:
+            raise ValueError(f"negative weight for {name!r}")
+    if sum(mix.values()) <= 0:
+        raise ValueError("the mix must have a positive weight")
+    return mix
+
+
+@dataclass
+class LoadTest:
+    """
+    Параметры прогона
+
+    Attributes:
+        url: Базовый адрес API (http://host:port)
+        username: Пользователь для входа
+        password: Пароль
+        mix: Веса типов запросов
+        concurrency: Количество виртуальных пользователей (соединений)
+        duration: Длительность в секундах
+        requests: Общее количество запросов (ограничивает прогон раньше duration)
+        radius: Радиус поиска в километрах
+        seed: Начальное значение генератора случайных чисел
+    """
+
+    url: str
+    username: str
+    password: str
+    mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    concurrency: int = 20
+    duration: float = 30.0
+    requests: int | None = None
+    radius: float = 25.0
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        parts = urlsplit(self.url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("only http://host[:port] URLs are supported")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.token = ""
+        self.points: list[dict[str, Any]] = []
+        self.results = {
+            name: BenchmarkResult(name, self.concurrency) for name in self.mix
+        }
+        self._sent = 0
+
+    async def login(self, connection: HTTPConnection) -> HTTPResponse:
+        """
+        Выполняет вход через LoginView
+        """
+
+        body = json.dumps({"username": self.username, "password": self.password})
+        return await connection.request(
+            "POST",
+            f"{self.prefix}/auth/login/",
+            {"Content-Type": "application/json"},
+            body.encode(),
+        )
+
+    async def prepare(self) -> None:
+        """
+        Получает токен и выборку точек для поиска и сообщений
+        """
+
+        connection = HTTPConnection(self.host, self.port)
+        try:
+            response = await self.login(connection)
+            if response.status != 200:
+                raise HTTPError(f"login failed with status {response.status}")
+            self.token = response.json()["token"]
+            response = await connection.request(
+                "GET", f"{self.prefix}/points/?page_size=500", self.headers()
+            )
+            if response.status != 200:
+                raise HTTPError(f"point list failed with status {response.status}")
+            self.points = response.json()["results"]
+        finally:
+            await connection.close()
+        if not self.points and {"search", "message"} & {
+            name for name, weight in self.mix.items() if weight > 0
+        }:
+            raise HTTPError("there are no points to search or post messages to")
+
+    def headers(self) -> dict[str, str]:
+        """
+        Заголовки запросов с токеном
+        """
+        return {"Authorization": f"Token {self.token}", "Accept": "application/json"}
+
+    async def send(
+        self, name: str, connection: HTTPConnection, rng: random.Random
+    ) -> HTTPResponse:
+        """
+        Отправляет запрос заданного типа
+        """
+
+        if name == "login":
+            return await self.login(connection)
+        if name == "list":
+            return await connection.request(
+                "GET", f"{self.prefix}/points/", self.headers()
+            )
+        point = rng.choice(self.points)
+        if name == "search":
+            query = urlencode(
+                {
+                    "latitude": point["latitude"],
+                    "longitude": point["longitude"],
+                    "radius": self.radius,
+                }
+            )
+            return await connection.request(
+                "GET", f"{self.prefix}/points/search/?{query}", self.headers()
+            )
+        body = json.dumps({"text": f"load test {rng.random():.6f}"}).encode()
+        return await connection.request(
+            "POST",
+            f"{self.prefix}/points/{point['id']}/messages/",
+            {**self.headers(), "Content-Type": "application/json"},
+            body,
+        )
+
+    async def worker(self, number: int, deadline: float) -> None:
+        """
+        Виртуальный пользователь: отправляет запросы до окончания прогона
+        """
+
+        rng = random.Random(f"{self.seed}:{number}")
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        connection = HTTPConnection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                if self.requests is not None:
+                    if self._sent >= self.requests:
+                        break
+                    self._sent += 1
+                name = rng.choices(names, weights)[0]
+                result = self.results[name]
+                started = time.perf_counter()
+                try:
+                    response = await self.send(name, connection, rng)
+                    ok = 200 <= response.status < 400
+                except (OSError, asyncio.TimeoutError, HTTPError, ValueError):
+                    ok = False
+                    await connection.close()
+                if ok:
+                    result.latencies.append(time.perf_counter() - started)
+                else:
+                    result.errors += 1
+        finally:
+            await connection.close()
+
+    async def run(self) -> list[dict[str, Any]]:
+        """
+        Выполняет прогон и возвращает сводки по типам запросов и общую
+        """
+
+        await self.prepare()
+        started = time.perf_counter()
+        deadline = started + self.duration
+        await asyncio.gather(
+            *(self.worker(number, deadline) for number in range(self.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+        total = BenchmarkResult("total", self.concurrency, elapsed=elapsed)
+        for result in self.results.values():
+            result.elapsed = elapsed
+            total.latencies += result.latencies
+            total.errors += result.errors
+        return [result.as_dict() for result in [*self.results.values(), total]]
@@ -0,0 +1,70 @@
+"""
+Сравнение синхронных и асинхронных представлений чтения под ASGI
+"""
+
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from points.benchmark import run_asgi
+from points.models import Point
+
+
+class Command(BaseCommand):
+    """
+    Отправляет одинаковые наборы запросов к синхронным (/points/...) и асинхронным
+    (/points/async/...) представлениям через ASGI-приложение проекта
+    и выводит пропускную способность и задержки для каждого эндпоинта
+    """
+
+    help = "Compare sync and async read endpoints under ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="username for the token")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--radius", type=float, default=50.0)
+        parser.add_argument("--host", default="localhost")
+
+    def handle(self, *args, **options):
+        # pylint: disable=import-outside-toplevel
+        from geo.asgi import application
+
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist as error:
+            raise CommandError(f"user {options['user']!r} does not exist") from error
+        point = Point.objects.order_by("id").first()
+        if point is None:
+            raise CommandError("there are no points to query")
+
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {"authorization": f"Token {token.key}", "host": options["host"]}
+        search = (
+            f"search/?latitude={point.latitude}&longitude={point.longitude}"
+            f"&radius={options['radius']}"
+        )
+        endpoints = {
+            "list": "",
+            "detail": f"{point.id}/",
+            "messages": f"{point.id}/messages/",
+            "search": search,
+        }
+
+        results = []
+        for name, path in endpoints.items():
+            for variant, prefix in (("sync", "/points/"), ("async", "/points/async/")):
+                result = asyncio.run(
+                    run_asgi(
+                        application,
+                        f"{name}:{variant}",
+                        [prefix + path] * options["requests"],
+                        options["concurrency"],
+                        headers,
+                    )
+                )
+                results.append(result.as_dict())
+                self.stdout.write(json.dumps(results[-1]))
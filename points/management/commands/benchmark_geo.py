@@ -0,0 +1,217 @@
+"""
+Воспроизводимый замер поиска, списков и входа на данных разного размера
+"""
+
+import json
+import logging
+import random
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from points.benchmark import BenchmarkResult
+from points.models import Point
+from points.seeding import DISTRIBUTIONS, seed, user_names
+
+
+class Rollback(Exception):
+    """
+    Откатывает транзакцию с тестовыми данными
+    """
+
+
+class Command(BaseCommand):
+    """
+    Для каждого размера данных создаёт во временной транзакции точки и сообщения
+    (points.seeding), последовательно выполняет запросы к поиску в радиусе,
+    списку точек, списку сообщений и входу через тестовый клиент Django и
+    записывает задержки в JSON вместе с коммитом, чтобы результаты можно было
+    сравнивать между версиями. Транзакция откатывается, база не меняется.
+    """
+
+    help = "Benchmark search, list and auth endpoints at several data sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="1000,10000", help="comma-separated point counts"
+        )
+        parser.add_argument("--messages-per-point", type=float, default=5.0)
+        parser.add_argument(
+            "--distribution", choices=DISTRIBUTIONS, default="clustered"
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--login-requests", type=int, default=20)
+        parser.add_argument("--radius", type=float, default=25.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--search-cache",
+            action="store_true",
+            help="keep the search cache enabled (disabled by default)",
+        )
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--output", help="write results to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError as exc:
+            raise CommandError("--sizes must be comma-separated integers") from exc
+
+        report = {
+            "commit": commit(),
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "options": {
+                name: options[name]
+                for name in (
+                    "messages_per_point",
+                    "distribution",
+                    "requests",
+                    "login_requests",
+                    "radius",
+                    "seed",
+                    "search_cache",
+                )
+            },
+            "runs": [],
+        }
+        # строки лога каждого запроса не нужны в выводе замера
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(
+                POINTS_SEARCH_CACHE_ENABLED=(
+                    options["search_cache"]
+                    and getattr(settings, "POINTS_SEARCH_CACHE_ENABLED", False)
+                )
+            ):
+                for size in sizes:
+                    report["runs"].append(self.run_size(size, options))
+                    self.stdout.write(json.dumps(report["runs"][-1]))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"results written to {options['output']}")
+            )
+
+    def run_size(self, size: int, options) -> dict:
+        """
+        Создаёт данные заданного размера и замеряет эндпоинты
+        """
+
+        run = {}
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                seeded = seed(
+                    users=10,
+                    points=size,
+                    messages=int(size * options["messages_per_point"]),
+                    distribution=options["distribution"],
+                    seed_value=options["seed"],
+                    prefix="bench-",
+                )
+                run = {
+                    "points": size,
+                    "messages": seeded.messages,
+                    "seed_s": round(time.perf_counter() - started, 3),
+                    "endpoints": self.measure(options),
+                }
+                raise Rollback
+        except Rollback:
+            pass
+        return run
+
+    def measure(self, options) -> list[dict]:
+        """
+        Выполняет запросы к эндпоинтам и возвращает сводки задержек
+        """
+
+        rng = random.Random(options["seed"])
+        client = Client(HTTP_HOST=options["host"])
+        username = user_names("bench-", 1)[0]
+        credentials = {"username": username, "password": "secret12"}
+        response = client.post("/auth/login/", credentials)
+        if response.status_code != 200:
+            raise CommandError(f"login failed with status {response.status_code}")
+        client.defaults["HTTP_AUTHORIZATION"] = f"Token {response.json()['token']}"
+
+        # выборка делается генератором с --seed, а не ORDER BY RANDOM() базы,
+        # чтобы прогоны с одинаковым seed запрашивали одни и те же точки
+        ids = list(Point.objects.order_by("id").values_list("id", flat=True))
+        chosen = rng.sample(ids, min(1000, len(ids)))
+        coordinates = Point.objects.in_bulk(chosen)
+        sample = [
+            (point_id, coordinates[point_id].latitude, coordinates[point_id].longitude)
+            for point_id in chosen
+        ]
+        if not sample:
+            raise CommandError("there are no points to query")
+
+        def search():
+            _, lat, lon = rng.choice(sample)
+            return client.get(
+                "/points/search/",
+                {"latitude": lat, "longitude": lon, "radius": options["radius"]},
+            )
+
+        def messages():
+            return client.get(f"/points/{rng.choice(sample)[0]}/messages/")
+
+        requests = options["requests"]
+        endpoints = [
+            ("search", search, requests),
+            ("points", lambda: client.get("/points/", {"page_size": 50}), requests),
+            ("messages", messages, requests),
+            (
+                "login",
+                lambda: Client(HTTP_HOST=options["host"]).post(
+                    "/auth/login/", credentials
+                ),
+                options["login_requests"],
+            ),
+        ]
+        return [timed(name, func, count).as_dict() for name, func, count in endpoints]
+
+
+def timed(name: str, func, count: int) -> BenchmarkResult:
+    """
+    Выполняет запрос count раз подряд и собирает задержки
+    """
+
+    result = BenchmarkResult(name, 1)
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        response = func()
+        if 200 <= response.status_code < 400:
+            result.latencies.append(time.perf_counter() - request_started)
+        else:
+            result.errors += 1
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def commit() -> str | None:
+    """
+    Возвращает текущий коммит git, если он доступен
+    """
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
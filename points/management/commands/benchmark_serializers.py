@@ -0,0 +1,94 @@
+"""
+Сравнение сериализации списка точек через DRF и через строки .values()
+"""
+
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from points import fast_serializers
+from points.models import Point
+from points.renderers import FastJSONRenderer, has_orjson
+from points.serializers import PointListSerializer
+
+
+class Rollback(Exception):
+    """
+    Откатывает транзакцию с тестовыми данными
+    """
+
+
+class Command(BaseCommand):
+    """
+    Создаёт во временной транзакции заданное количество точек, сериализует
+    их обоими способами, проверяет, что ответы совпадают байт в байт,
+    и выводит время каждого способа. Транзакция откатывается.
+    """
+
+    help = "Compare DRF and values()-based serialization of the point list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                result = self.run(options["points"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(json.dumps(result))
+
+    def run(self, count: int, repeat: int) -> dict:
+        """
+        Создаёт точки и замеряет оба способа сериализации
+        """
+
+        user, _ = get_user_model().objects.get_or_create(username="benchmark")
+        rng = random.Random(0)
+        Point.objects.bulk_create(
+            Point(
+                name=f"point {i}",
+                description="benchmark",
+                latitude=round(rng.uniform(-80, 80), 6),
+                longitude=round(rng.uniform(-180, 180), 6),
+                creator=user,
+            )
+            for i in range(count)
+        )
+        queryset = Point.objects.lean().order_by("-created_at", "-id")
+
+        def drf() -> bytes:
+            data = PointListSerializer(queryset.all(), many=True).data
+            return JSONRenderer().render(data)
+
+        def fast() -> bytes:
+            rows = fast_serializers.point_values(queryset.all())
+            return FastJSONRenderer().render(fast_serializers.points(rows))
+
+        timings = {}
+        outputs = {}
+        for name, func in (("drf", drf), ("fast", fast)):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                outputs[name] = func()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best * 1000
+
+        return {
+            "points": queryset.count(),
+            "drf_ms": round(timings["drf"], 2),
+            "fast_ms": round(timings["fast"], 2),
+            "speedup": round(timings["drf"] / timings["fast"], 2),
+            "identical": outputs["drf"] == outputs["fast"],
+            "bytes": len(outputs["fast"]),
+            "orjson": has_orjson(),
+        }
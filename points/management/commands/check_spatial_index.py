@@ -0,0 +1,59 @@
+"""
+Проверка согласованности пространственного индекса с базой данных
+"""
+
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from points.models import Point
+from points.search import radius_prefilter, filter_within_radius
+from points.spatial_index import SpatialIndex, get_index, check_consistency
+
+
+class Command(BaseCommand):
+    """
+    Строит индекс, сравнивает его содержимое с таблицей точек и результаты
+    поиска через индекс с результатами SQL-поиска для случайных запросов
+    """
+
+    help = "Check the in-memory spatial index against the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--max-radius", type=float, default=500.0)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        index: SpatialIndex = get_index()
+        diff = check_consistency(index)
+        for key, ids in diff.items():
+            if ids:
+                self.stderr.write(f"{key}: {len(ids)} points, e.g. {ids[:10]}")
+
+        rnd = random.Random(options["seed"])
+        mismatches = 0
+        for _ in range(options["queries"]):
+            lat = rnd.uniform(-90, 90)
+            lon = rnd.uniform(-180, 180)
+            radius = rnd.uniform(0, options["max_radius"])
+            from_index = set(index.query_radius(lat, lon, radius))
+            candidates = radius_prefilter(Point.objects.all(), lat, lon, radius)
+            from_sql = {
+                p.id for p in filter_within_radius(candidates, lat, lon, radius)
+            }
+            if from_index != from_sql:
+                mismatches += 1
+                self.stderr.write(
+                    f"mismatch at ({lat:.5f}, {lon:.5f}, r={radius:.3f}): "
+                    f"index-only={sorted(from_index - from_sql)[:10]} "
+                    f"sql-only={sorted(from_sql - from_index)[:10]}"
+                )
+
+        if mismatches or any(diff.values()):
+            raise CommandError("spatial index is inconsistent with the database")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"index is consistent: {len(index)} points, {options['queries']} queries"
+            )
+        )
@@ -0,0 +1,35 @@
+"""
+Потоковая выгрузка гео-точек
+"""
+
+from django.core.management.base import BaseCommand
+
+from points.export import EXPORT_FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    """
+    Выгружает все точки (и, при необходимости, их сообщения) в NDJSON или GeoJSON
+    в файл или в стандартный вывод, не загружая таблицу в память целиком
+    """
+
+    help = "Stream all points as NDJSON or GeoJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", choices=sorted(EXPORT_FORMATS), default="ndjson"
+        )
+        parser.add_argument("--messages", action="store_true")
+        parser.add_argument("--file", default=None)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        stream = export_stream(
+            options["output"], options["messages"], options["chunk_size"]
+        )
+        if options["file"] is None:
+            for chunk in stream:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["file"], "w", encoding="utf-8") as file:
+            file.writelines(stream)
@@ -0,0 +1,49 @@
+"""
+Массовый импорт гео-точек
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.utils.encoders import JSONEncoder
+
+from points.importer import IMPORT_FORMATS, import_points, parse_rows
+
+
+class Command(BaseCommand):
+    """
+    Импортирует точки из файла NDJSON или CSV пачками через bulk_create
+    и выводит ошибки по номерам строк
+    """
+
+    help = "Bulk import points from an NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="username of the creator")
+        parser.add_argument("--input", choices=IMPORT_FORMATS, default=None)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            creator = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist as exc:
+            raise CommandError(f"user {options['user']!r} does not exist") from exc
+
+        input_format = options["input"] or (
+            "csv" if options["path"].endswith(".csv") else "ndjson"
+        )
+        with open(options["path"], "rb") as file:
+            result = import_points(
+                parse_rows(file, input_format), creator, options["batch_size"]
+            )
+
+        for error in result.errors:
+            self.stderr.write(json.dumps(error, cls=JSONEncoder, ensure_ascii=False))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"created {result.created} points and {result.messages_created} "
+                f"messages, {len(result.errors)} rows failed"
+            )
+        )
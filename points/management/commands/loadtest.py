@@ -0,0 +1,65 @@
+"""
+Нагрузочный тест запущенного API
+"""
+
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from points.loadtest import HTTPError, LoadTest, parse_mix
+
+
+class Command(BaseCommand):
+    """
+    Отправляет смесь запросов к запущенному серверу (например, runserver или
+    gunicorn на localhost) из пула асинхронных соединений и выводит пропускную
+    способность, долю ошибок и задержки p50/p95/p99 по типам запросов
+    """
+
+    help = "Drive a running API with a configurable request mix"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--user", required=True, help="username to log in with")
+        parser.add_argument("--password", required=True)
+        parser.add_argument(
+            "--mix",
+            default="search=60,list=25,message=10,login=5",
+            help="request weights, e.g. search=60,list=25,message=10,login=5",
+        )
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument(
+            "--requests", type=int, help="stop after this many requests"
+        )
+        parser.add_argument("--radius", type=float, default=25.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="write results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be positive")
+        try:
+            test = LoadTest(
+                url=options["url"],
+                username=options["user"],
+                password=options["password"],
+                mix=parse_mix(options["mix"]),
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                requests=options["requests"],
+                radius=options["radius"],
+                seed=options["seed"],
+            )
+            results = asyncio.run(test.run())
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        except (HTTPError, OSError) as exc:
+            raise CommandError(f"cannot start the load test: {exc}") from exc
+
+        for result in results:
+            self.stdout.write(json.dumps(result))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,32 @@
+"""
+Удаление устаревших записей об удалениях
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from points.models import Tombstone
+
+
+class Command(BaseCommand):
+    """
+    Удаляет записи об удалениях старше срока хранения. Клиенты с курсором
+    старше этого срока получают от ленты изменений 410 и синхронизируются заново.
+    """
+
+    help = "Delete tombstones older than the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "POINTS_TOMBSTONE_RETENTION_DAYS", 30),
+        )
+
+    def handle(self, *args, **options):
+        border = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=border).delete()
+        self.stdout.write(self.style.SUCCESS(f"deleted {deleted} tombstones"))
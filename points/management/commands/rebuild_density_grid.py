@@ -0,0 +1,22 @@
+"""
+Пересчёт сетки плотности
+"""
+
+from django.core.management.base import BaseCommand
+
+from points.density import levels, rebuild
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает сетку плотности точек и сообщений с нуля
+    агрегирующими запросами, исправляя расхождения инкрементальных счётчиков
+    """
+
+    help = "Rebuild the pre-aggregated point/message density grid"
+
+    def handle(self, *args, **options):
+        cells = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"rebuilt {cells} cells on levels {list(levels())}")
+        )
@@ -0,0 +1,37 @@
+"""
+Пересчёт счётчиков сообщений у гео-точек
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from points.models import Point
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает messages_count и last_message_at всех точек по таблице сообщений,
+    исправляя расхождения денормализованных счётчиков. Точки обновляются пачками
+    по диапазонам id, чтобы не держать долгих блокировок.
+    """
+
+    help = "Recompute denormalized message counters of points"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = Point.objects.order_by("id").values_list("id", flat=True)
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += Point.objects.filter(
+                    id__gte=batch[0], id__lte=batch[-1]
+                ).recount_messages()
+            last_id = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f"recounted {updated} points"))
@@ -0,0 +1,52 @@
+"""
+Генерация тестовых пользователей, точек и сообщений
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from points.seeding import DISTRIBUTIONS, seed
+
+
+class Command(BaseCommand):
+    """
+    Создаёт пользователей, точки (равномерно или кластерами) и сообщения
+    пачками через bulk_create
+    """
+
+    help = "Generate users, points and messages for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--points", type=int, default=10000)
+        parser.add_argument("--messages", type=int, default=50000)
+        parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+        parser.add_argument("--clusters", type=int, default=20)
+        parser.add_argument("--spread-km", type=float, default=25.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="secret12")
+        parser.add_argument("--prefix", default="seed-", help="username prefix")
+
+    def handle(self, *args, **options):
+        for name in ("users", "points", "messages", "batch_size"):
+            if options[name] < 0 or (name == "batch_size" and options[name] == 0):
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+
+        result = seed(
+            users=options["users"],
+            points=options["points"],
+            messages=options["messages"],
+            distribution=options["distribution"],
+            clusters=options["clusters"],
+            spread_km=options["spread_km"],
+            seed_value=options["seed"],
+            batch_size=options["batch_size"],
+            password=options["password"],
+            prefix=options["prefix"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"created {result.users} users, {result.points} points "
+                f"and {result.messages} messages"
+            )
+        )
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:36
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+from points.geo import encode_geohash
+
+
+def fill_geohash(apps, schema_editor):
+    """Заполняет geohash у существующих точек"""
+    Point = apps.get_model("points", "Point")
+    batch = []
+    for point in Point.objects.only("id", "latitude", "longitude").iterator(
+        chunk_size=2000
+    ):
+        point.geohash = encode_geohash(point.latitude, point.longitude)
+        batch.append(point)
+        if len(batch) >= 2000:
+            Point.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    if batch:
+        Point.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="point",
+            name="geohash",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=12,
+                verbose_name="geohash",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="point",
+            name="latitude",
+            field=models.FloatField(
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+                verbose_name="широта",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="point",
+            name="longitude",
+            field=models.FloatField(
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+                verbose_name="долгота",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="point",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="point_lat_lon_idx"
+            ),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
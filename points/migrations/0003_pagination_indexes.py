@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points", "0002_point_geohash_and_bbox_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["point", "created_at", "id"],
+                name="message_point_created_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="point",
+            index=models.Index(
+                fields=["created_at", "id"], name="point_created_id_idx"
+            ),
+        ),
+    ]
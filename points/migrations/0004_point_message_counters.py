@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики сообщений у существующих точек"""
+    Point = apps.get_model("points", "Point")
+    Message = apps.get_model("points", "Message")
+    messages = Message.objects.filter(point_id=models.OuterRef("pk")).order_by()
+    Point.objects.update(
+        messages_count=Coalesce(
+            models.Subquery(
+                messages.values("point_id")
+                .annotate(count=models.Count("id"))
+                .values("count")
+            ),
+            models.Value(0),
+        ),
+        last_message_at=models.Subquery(
+            messages.order_by("-created_at").values("created_at")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points", "0003_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="point",
+            name="last_message_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="дата последнего сообщения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="point",
+            name="messages_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="количество сообщений"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="point",
+            index=models.Index(
+                fields=["messages_count", "id"], name="point_activity_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="point",
+            index=models.Index(
+                fields=["last_message_at"], name="point_last_message_idx"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:47
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField
+from django.db.models.functions import Cast, Floor
+
+
+def fill_density(apps, schema_editor):
+    """
+    Заполняет сетку плотности по существующим точкам и сообщениям.
+    Агрегация повторена здесь, а не взята из points.density, чтобы последующие
+    изменения модуля и моделей не меняли поведение миграции.
+    """
+
+    Point = apps.get_model("points", "Point")
+    Message = apps.get_model("points", "Message")
+    DensityCell = apps.get_model("points", "DensityCell")
+
+    cells = defaultdict(lambda: [0, 0])
+    for level in getattr(settings, "POINTS_DENSITY_LEVELS", (0, 1, 2)):
+        scale = 10**level
+        for prefix, model, counter in (("", Point, 0), ("point__", Message, 1)):
+            rows = (
+                model.objects.annotate(
+                    cell_y=Cast(Floor(F(f"{prefix}latitude") * scale), IntegerField()),
+                    cell_x=Cast(Floor(F(f"{prefix}longitude") * scale), IntegerField()),
+                )
+                .values("cell_y", "cell_x")
+                .annotate(total=Count("id"))
+                .order_by()
+            )
+            for row in rows:
+                cells[level, row["cell_y"], row["cell_x"]][counter] += row["total"]
+
+    DensityCell.objects.bulk_create(
+        (
+            DensityCell(
+                level=level,
+                cell_y=cell_y,
+                cell_x=cell_x,
+                points_count=points,
+                messages_count=messages,
+            )
+            for (level, cell_y, cell_x), (points, messages) in cells.items()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points", "0004_point_message_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DensityCell",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "level",
+                    models.PositiveSmallIntegerField(verbose_name="уровень сетки"),
+                ),
+                ("cell_y", models.IntegerField(verbose_name="ячейка по широте")),
+                ("cell_x", models.IntegerField(verbose_name="ячейка по долготе")),
+                (
+                    "points_count",
+                    models.IntegerField(default=0, verbose_name="количество точек"),
+                ),
+                (
+                    "messages_count",
+                    models.IntegerField(default=0, verbose_name="количество сообщений"),
+                ),
+            ],
+            options={
+                "verbose_name": "ячейка плотности",
+                "verbose_name_plural": "ячейки плотности",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("level", "cell_y", "cell_x"), name="density_cell_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_density, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:53
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points", "0005_density_cell"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("point", "гео-точка"), ("message", "сообщение")],
+                        max_length=16,
+                        verbose_name="тип объекта",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="id объекта")),
+                ("point_id", models.BigIntegerField(verbose_name="id гео-точки")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="дата удаления"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "удалённый объект",
+                "verbose_name_plural": "удалённые объекты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["updated_at", "id"], name="message_updated_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="point",
+            index=models.Index(
+                fields=["updated_at", "id"], name="point_updated_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"], name="tombstone_deleted_id_idx"
+            ),
+        ),
+    ]
@@ -3,12 +3,111 @@
 """
 
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .geo import encode_geohash, GEOHASH_PRECISION
 
 User = get_user_model()
 
 
+class PointQuerySet(models.QuerySet):
+    """
+    QuerySet гео-точек
+    """
+
+    def lean(self, messages_limit: int = 0) -> "PointQuerySet":
+        """
+        Выборка для облегчённого представления точек: создатель подгружается JOIN-ом,
+        а последние сообщения подгружаются одним ограниченным запросом на всю страницу
+
+        Args:
+            messages_limit: Количество последних сообщений на точку (0 - не загружать)
+
+        Returns:
+            QuerySet с атрибутом latest_messages
+        """
+
+        queryset = self.select_related("creator")
+        if messages_limit > 0:
+            latest = Message.objects.select_related("author").order_by(
+                "-created_at", "-id"
+            )[:messages_limit]
+            queryset = queryset.prefetch_related(
+                models.Prefetch(
+                    "message_set", queryset=latest, to_attr="latest_messages"
+                )
+            )
+        return queryset
+
+    def message_added(self, created_at) -> int:
+        """
+        Атомарно увеличивает счётчик сообщений и обновляет время последнего сообщения.
+        Дата изменения точки тоже обновляется, чтобы новые счётчики попали
+        в ленту изменений.
+
+        Args:
+            created_at: Дата создания нового сообщения
+
+        Returns:
+            Количество обновлённых точек
+        """
+
+        return self.update(
+            messages_count=models.F("messages_count") + 1,
+            last_message_at=Greatest(
+                Coalesce(models.F("last_message_at"), models.Value(created_at)),
+                models.Value(created_at),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def message_removed(self) -> int:
+        """
+        Атомарно уменьшает счётчик сообщений, пересчитывает время последнего сообщения
+        и обновляет дату изменения точки
+
+        Returns:
+            Количество обновлённых точек
+        """
+
+        return self.update(
+            messages_count=Greatest(models.F("messages_count") - 1, models.Value(0)),
+            last_message_at=self._last_message_at(),
+            updated_at=timezone.now(),
+        )
+
+    def recount_messages(self) -> int:
+        """
+        Пересчитывает счётчики сообщений с нуля по таблице сообщений
+
+        Returns:
+            Количество обновлённых точек
+        """
+
+        count = (
+            Message.objects.filter(point_id=models.OuterRef("pk"))
+            .order_by()
+            .values("point_id")
+            .annotate(count=models.Count("id"))
+            .values("count")
+        )
+        return self.update(
+            messages_count=Coalesce(models.Subquery(count), models.Value(0)),
+            last_message_at=self._last_message_at(),
+        )
+
+    @staticmethod
+    def _last_message_at() -> models.Subquery:
+        return models.Subquery(
+            Message.objects.filter(point_id=models.OuterRef("pk"))
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+
+
 class Point(models.Model):
     """
     Attributes:
@@ -16,30 +115,66 @@ class Point(models.Model):
         description(CharField): Описание точки
         latitude(FloatField): Широта
         longitude(FloatField): Долгота
+        geohash(CharField): Geohash координат, используется для поиска по индексу
         creator(ForeignKey): Создатель точки
+        messages_count(PositiveIntegerField): Количество сообщений на точке
+        last_message_at(DateTimeField): Дата последнего сообщения на точке
         created_at(DateTimeField): Дата создания точки
         updated_at(DateTimeField): Дата последнего изменения точки
 
     Meta:
         verbose_name (str): Название модели в единственном числе
         verbose_name_plural (str): Название модели во множественном числе
+        indexes (list): Индексы для поиска по ограничивающему прямоугольнику,
+            пагинации, сортировки по активности и ленты изменений
     """
 
     name = models.CharField(max_length=50, verbose_name="название точки")
     description = models.CharField(
         max_length=256, blank=True, verbose_name="описание точки"
     )
-    latitude = models.FloatField(verbose_name="широта")
-    longitude = models.FloatField(verbose_name="долгота")
+    latitude = models.FloatField(
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name="широта",
+    )
+    longitude = models.FloatField(
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name="долгота",
+    )
+    geohash = models.CharField(
+        max_length=GEOHASH_PRECISION,
+        db_index=True,
+        editable=False,
+        default="",
+        verbose_name="geohash",
+    )
     creator = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name="создатель точки"
     )
+    messages_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="количество сообщений"
+    )
+    last_message_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="дата последнего сообщения"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="дата обновления")
 
+    objects = PointQuerySet.as_manager()
+
+    COUNTER_FIELDS = ("messages_count", "last_message_at")
+
     class Meta:
         verbose_name = "гео-точка"
         verbose_name_plural = "гео-точки"
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="point_lat_lon_idx"),
+            models.Index(fields=["created_at", "id"], name="point_created_id_idx"),
+            # ключ пагинации при ordering=-messages_count (см. points.pagination)
+            models.Index(fields=["messages_count", "id"], name="point_activity_idx"),
+            models.Index(fields=["last_message_at"], name="point_last_message_idx"),
+            models.Index(fields=["updated_at", "id"], name="point_updated_id_idx"),
+        ]
 
     def __str__(self) -> str:
         """
@@ -47,6 +182,43 @@ class Point(models.Model):
         """
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженные из базы координаты, чтобы после перемещения точки
+        можно было сбросить данные, привязанные к её прежнему положению
+        """
+
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_coords = (
+            instance.__dict__.get("latitude"),
+            instance.__dict__.get("longitude"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Пересчитывает geohash по текущим координатам и сохраняет точку
+        без перезаписи счётчиков сообщений
+        """
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and not self._state.adding:
+            # счётчики обновляются только атомарно, и сохранение точки
+            # не должно перезаписывать их устаревшими значениями
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+            kwargs["update_fields"] = update_fields
+        if update_fields is not None and (
+            "latitude" in update_fields or "longitude" in update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+        self.loaded_coords = (self.latitude, self.longitude)
+
 
 class Message(models.Model):
     """
@@ -60,6 +232,7 @@ class Message(models.Model):
     Meta:
         verbose_name (str): Название модели в единственном числе
         verbose_name_plural (str): Название модели во множественном числе
+        indexes (list): Индексы для пагинации сообщений точки и ленты изменений
     """
 
     text = models.CharField(max_length=256, verbose_name="текст сообщения")
@@ -73,9 +246,94 @@ class Message(models.Model):
     class Meta:
         verbose_name = "сообщение"
         verbose_name_plural = "сообщения"
+        indexes = [
+            models.Index(
+                fields=["point", "created_at", "id"],
+                name="message_point_created_id_idx",
+            ),
+            models.Index(fields=["updated_at", "id"], name="message_updated_id_idx"),
+        ]
 
     def __str__(self) -> str:
         """
         Возвращает сообщение в строке
         """
         return self.text
+
+
+class Tombstone(models.Model):
+    """
+    Запись об удалённой точке или сообщении для ленты изменений
+
+    Attributes:
+        kind(CharField): Тип удалённого объекта: point или message
+        object_id(BigIntegerField): ID удалённого объекта
+        point_id(BigIntegerField): ID точки (для сообщения - точки, к которой оно относилось)
+        deleted_at(DateTimeField): Дата удаления
+
+    Meta:
+        verbose_name (str): Название модели в единственном числе
+        verbose_name_plural (str): Название модели во множественном числе
+        indexes (list): Индекс для ленты изменений
+    """
+
+    POINT = "point"
+    MESSAGE = "message"
+    KINDS = [(POINT, "гео-точка"), (MESSAGE, "сообщение")]
+
+    kind = models.CharField(max_length=16, choices=KINDS, verbose_name="тип объекта")
+    object_id = models.BigIntegerField(verbose_name="id объекта")
+    point_id = models.BigIntegerField(verbose_name="id гео-точки")
+    deleted_at = models.DateTimeField(
+        default=timezone.now, verbose_name="дата удаления"
+    )
+
+    class Meta:
+        verbose_name = "удалённый объект"
+        verbose_name_plural = "удалённые объекты"
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_id_idx"),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает запись в строке
+        """
+        return f"{self.kind}:{self.object_id}"
+
+
+class DensityCell(models.Model):
+    """
+    Attributes:
+        level(PositiveSmallIntegerField): Уровень сетки, размер ячейки 10^-level градусов
+        cell_y(IntegerField): Номер ячейки по широте
+        cell_x(IntegerField): Номер ячейки по долготе
+        points_count(IntegerField): Количество точек в ячейке
+        messages_count(IntegerField): Количество сообщений на точках ячейки
+
+    Meta:
+        verbose_name (str): Название модели в единственном числе
+        verbose_name_plural (str): Название модели во множественном числе
+        constraints (list): Одна запись на ячейку уровня
+    """
+
+    level = models.PositiveSmallIntegerField(verbose_name="уровень сетки")
+    cell_y = models.IntegerField(verbose_name="ячейка по широте")
+    cell_x = models.IntegerField(verbose_name="ячейка по долготе")
+    points_count = models.IntegerField(default=0, verbose_name="количество точек")
+    messages_count = models.IntegerField(default=0, verbose_name="количество сообщений")
+
+    class Meta:
+        verbose_name = "ячейка плотности"
+        verbose_name_plural = "ячейки плотности"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["level", "cell_y", "cell_x"], name="density_cell_unique"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает ячейку в строке
+        """
+        return f"{self.level}:{self.cell_y}:{self.cell_x}"
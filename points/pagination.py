@@ -0,0 +1,165 @@
+"""
+Пагинация списков
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+def keyset_condition(ordering, values, reverse: bool = False) -> Q:
+    """
+    Строит условие выбора строк, следующих за позицией в составном ключе
+
+    Args:
+        ordering: Поля сортировки ("-" в начале - по убыванию), последнее уникально
+        values: Значения полей строки, на которой остановилась страница
+        reverse: Выбирать строки, предшествующие позиции
+
+    Returns:
+        Условие (f1 > v1) or (f1 = v1 and f2 > v2) or ... с учётом направлений
+        и дополнительным f1 >= v1, по которому база ищет начало страницы в индексе
+    """
+
+    condition, equal = Q(), Q()
+    bound = None
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") != reverse else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+        if bound is None:
+            bound = Q(**{f"{name}__{lookup}e": value})
+    return bound & condition
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по составному ключу: (created_at, id) по умолчанию
+    или полям параметра ordering с id в конце (см. TieBreakingOrderingFilter).
+    Позиция курсора содержит значения всех полей ключа, поэтому страница
+    выбирается условием по индексу, а не через OFFSET, даже если много строк
+    имеют одинаковое значение первого поля (например, messages_count=0).
+    Время ответа не зависит от глубины пролистывания, а строки, у которых
+    во время пролистывания изменилось значение ключа, не сдвигают остальные.
+    """
+
+    ordering = ("created_at", "id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Отбирает страницу условием по всем полям ключа. Остальное, включая
+        ссылки next и previous, работает как в CursorPagination: позиции
+        строк уникальны, поэтому смещение в курсоре всегда равно нулю.
+        """
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            values = self._decode_position(current_position)
+            try:
+                queryset = queryset.filter(
+                    keyset_condition(self.ordering, values, reverse)
+                )
+            except (ValueError, ValidationError) as error:
+                raise NotFound(self.invalid_cursor_message) from error
+
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = results[: self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            value = (
+                instance[name]
+                if isinstance(instance, dict)
+                else getattr(instance, name)
+            )
+            values.append(str(value))
+        return json.dumps(values)
+
+    def _decode_position(self, position: str) -> list[str]:
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+
+def encode_keyset_cursor(created_at, object_id: int) -> str:
+    """
+    Кодирует позицию (created_at, id) последней строки страницы в курсор
+    для асинхронных списков
+    """
+    return base64.urlsafe_b64encode(
+        f"{created_at.isoformat()}|{object_id}".encode()
+    ).decode()
+
+
+def decode_keyset_cursor(cursor: str) -> Q:
+    """
+    Декодирует курсор асинхронного списка в условие выбора следующей страницы
+
+    Raises:
+        ValueError: Если курсор повреждён
+    """
+
+    try:
+        moment, object_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        created_at = parse_datetime(moment)
+        object_id = int(object_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as error:
+        raise ValueError("invalid cursor") from error
+    if created_at is None:
+        raise ValueError("invalid cursor")
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=object_id)
@@ -0,0 +1,176 @@
+"""
+Публикация событий о сообщениях точек для подписчиков (server-sent events).
+
+Брокер выбирается настройкой POINTS_EVENTS_BROKER. По умолчанию используется
+InProcessBroker: события доставляются только подписчикам того же процесса,
+поэтому при нескольких воркерах его нужно заменить общим брокером
+(например, поверх Redis) с тем же интерфейсом.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .serializers import MessageSerializer
+
+
+class Subscription:
+    """
+    Подписка на канал: очередь событий в цикле событий подписчика.
+    Если подписчик не успевает читать и очередь переполнена, новые события
+    отбрасываются, а флаг overflowed сообщает, что клиенту нужно перечитать данные.
+
+    Attributes:
+        channel: Имя канала
+        overflowed: Были ли потеряны события
+    """
+
+    def __init__(self, channel: str, max_size: int) -> None:
+        self.channel = channel
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(max_size)
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        """
+        Передаёт событие подписчику (из любого потока)
+        """
+
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # цикл событий подписчика уже закрыт, подписка будет снята при выходе
+            pass
+
+    def _put(self, event: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """
+        Ждёт следующее событие
+
+        Returns:
+            Событие или None, если за timeout секунд событий не было
+        """
+
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """
+    Брокер событий в памяти процесса. Подписка не занимает поток: подписчик
+    ждёт в своей корутине, поэтому воркер держит тысячи простаивающих подписок.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._channels: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        """
+        Подписывается на канал (вызывается из цикла событий подписчика)
+        """
+
+        subscription = Subscription(
+            channel, getattr(settings, "POINTS_EVENTS_QUEUE_SIZE", 100)
+        )
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Отменяет подписку
+        """
+
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel: str, event: dict[str, Any]) -> int:
+        """
+        Отправляет событие всем подписчикам канала
+
+        Returns:
+            Количество подписчиков, которым отправлено событие
+        """
+
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def subscribers_count(self) -> int:
+        """
+        Возвращает общее количество подписок в процессе
+        """
+
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Возвращает брокер процесса, создавая его по настройке POINTS_EVENTS_BROKER
+    """
+
+    global _broker  # pylint: disable=global-statement
+
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(
+                    settings, "POINTS_EVENTS_BROKER", "points.pubsub.InProcessBroker"
+                )
+                _broker = import_string(path)()
+    return _broker
+
+
+def point_channel(point_id: int) -> str:
+    """
+    Возвращает имя канала событий точки
+    """
+    return f"point:{point_id}"
+
+
+def publish_message_event(
+    kind: str, message, data: dict[str, Any] | None = None
+) -> None:
+    """
+    Публикует событие о сообщении в канал его точки после фиксации транзакции
+
+    Args:
+        kind: Тип события: created, updated или deleted
+        message: Сообщение
+        data: Представление сообщения (по умолчанию MessageSerializer, для удалённого - id)
+    """
+
+    if data is None:
+        data = (
+            {"id": message.id} if kind == "deleted" else MessageSerializer(message).data
+        )
+    event = {
+        "event": f"message.{kind}",
+        "data": json.dumps({"point": message.point_id, **data}, default=str),
+    }
+    channel = point_channel(message.point_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
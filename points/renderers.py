@@ -0,0 +1,77 @@
+"""
+JSON-рендерер на orjson с тем же результатом, что и JSONRenderer DRF
+"""
+
+from math import isfinite
+from typing import Any
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+def has_orjson() -> bool:
+    """
+    Доступен ли orjson
+    """
+    return orjson is not None
+
+
+def _same_as_stdlib(data: Any) -> bool:
+    """
+    Проверяет, что orjson запишет данные так же, как json с кодировщиком DRF:
+    в данных только типы JSON, а числа с плавающей точкой конечны и не требуют
+    экспоненты (orjson пишет 1e16 вместо 1e+16 и 0.00001 вместо 1e-05)
+    """
+
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            magnitude = abs(value)
+            if not isfinite(value) or (magnitude and not 1e-4 <= magnitude < 1e16):
+                return False
+        elif isinstance(value, dict):
+            if not all(isinstance(key, str) for key in value):
+                return False
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif value is not None and not isinstance(value, (str, int)):
+            # даты, Decimal, ленивые строки и т.п. преобразует кодировщик DRF
+            return False
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Рендерер JSON на orjson, если он установлен. Байт в байт совпадает
+    с JSONRenderer: при настройках вывода, отличных от компактного UTF-8,
+    при отступах и при данных, которые orjson записал бы иначе,
+    используется стандартный рендерер.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not _same_as_stdlib(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # целые числа больше 64 бит, строки с одиночными суррогатами
+            return super().render(data, accepted_media_type, renderer_context)
+        # как и JSONRenderer, экранирует разделители строк для JavaScript
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
@@ -0,0 +1,192 @@
+"""
+Поиск гео-точек в радиусе от координат
+"""
+
+from math import pi, sqrt
+from typing import Iterable
+
+from django.db.models import Q, QuerySet
+
+from .distance import as_array, haversine_many, within_radius
+from .geo import AVERAGE_EARTH_RADIUS, bounding_boxes, geohash_cover
+from .models import Point
+
+# половина длины большого круга: на таком радиусе круг покрывает всю Землю
+MAX_SEARCH_RADIUS_KM: float = pi * AVERAGE_EARTH_RADIUS
+
+
+def radius_prefilter(
+    queryset: QuerySet[Point], lat: float, lon: float, radius_km: float
+) -> QuerySet[Point]:
+    """
+    Сужает выборку точек до кандидатов, которые могут попасть в радиус.
+    Фильтр строится по ограничивающему прямоугольнику (индекс по широте и долготе)
+    и по покрытию прямоугольника ячейками geohash (индекс по geohash),
+    поэтому база данных отвечает на него без полного просмотра таблицы.
+
+    Args:
+        queryset: Исходная выборка точек
+        lat: Широта центра поиска
+        lon: Долгота центра поиска
+        radius_km: Радиус поиска в километрах
+
+    Returns:
+        QuerySet точек-кандидатов
+    """
+
+    boxes = bounding_boxes(lat, lon, radius_km)
+    if boxes is None:
+        return queryset
+    if not boxes:
+        return queryset.none()
+
+    box_filter = Q()
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        box_filter |= Q(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        )
+
+    cells_filter = Q()
+    for prefix in geohash_cover(boxes):
+        cells_filter |= Q(geohash__startswith=prefix)
+
+    return queryset.filter(box_filter & cells_filter)
+
+
+def filter_within_radius(
+    points: Iterable[Point | dict], lat: float, lon: float, radius_km: float
+) -> list[Point | dict]:
+    """
+    Оставляет только точки, находящиеся в пределах радиуса (точная проверка гаверсинусом)
+
+    Args:
+        points: Точки-кандидаты (модели или строки .values() с latitude и longitude)
+        lat: Широта центра поиска
+        lon: Долгота центра поиска
+        radius_km: Радиус поиска в километрах
+
+    Returns:
+        Список точек в пределах радиуса
+    """
+
+    points = list(points)
+    if points and isinstance(points[0], dict):
+        lats = [point["latitude"] for point in points]
+        lons = [point["longitude"] for point in points]
+    else:
+        lats = [point.latitude for point in points]
+        lons = [point.longitude for point in points]
+    mask = within_radius(lat, lon, lats, lons, radius_km)
+    return [point for point, inside in zip(points, mask) if inside]
+
+
+def nearest_points(
+    queryset: QuerySet[Point],
+    lat: float,
+    lon: float,
+    k: int,
+    max_distance_km: float | None = None,
+    initial_radius_km: float = 1.0,
+) -> list[tuple[Point, float]]:
+    """
+    Находит k ближайших точек, постепенно расширяя область поиска:
+    на каждом шаге выбираются кандидаты по индексу в текущем радиусе,
+    и поиск завершается, как только в радиусе найдено не меньше k точек.
+    Любая точка за пределами радиуса дальше любой точки внутри него,
+    поэтому сортировать всю таблицу не нужно.
+
+    Args:
+        queryset: Исходная выборка точек
+        lat: Широта центра поиска
+        lon: Долгота центра поиска
+        k: Количество точек
+        max_distance_km: Максимальное расстояние до точки в километрах
+        initial_radius_km: Радиус первого шага
+
+    Returns:
+        Список пар (точка, расстояние в километрах), упорядоченный по расстоянию
+    """
+
+    limit = MAX_SEARCH_RADIUS_KM
+    if max_distance_km is not None:
+        limit = min(limit, max_distance_km)
+    if k <= 0 or limit < 0:
+        return []
+
+    radius = min(initial_radius_km, limit)
+    while True:
+        candidates = list(radius_prefilter(queryset, lat, lon, radius))
+        distances = haversine_many(
+            lat,
+            lon,
+            [point.latitude for point in candidates],
+            [point.longitude for point in candidates],
+        )
+        found = sorted(
+            (
+                (point, float(distance))
+                for point, distance in zip(candidates, distances)
+                if distance <= radius
+            ),
+            key=lambda pair: (pair[1], pair[0].id),
+        )
+        if len(found) >= k or radius >= limit:
+            return found[:k]
+
+        # плотность точек примерно постоянна, поэтому их число растёт как квадрат радиуса
+        growth = sqrt(k / len(found)) * 1.5 if found else 4.0
+        radius = min(radius * max(growth, 2.0), limit)
+
+
+def batch_prefilter(
+    queryset: QuerySet[Point], queries: list[tuple[float, float, float]]
+) -> QuerySet[Point]:
+    """
+    Сужает выборку до кандидатов сразу для нескольких поисков в радиусе:
+    один запрос с объединением ограничивающих прямоугольников всех кругов
+
+    Args:
+        queryset: Исходная выборка точек
+        queries: Список (широта, долгота, радиус в километрах)
+
+    Returns:
+        QuerySet точек-кандидатов
+    """
+
+    area = Q()
+    bounded = False
+    for lat, lon, radius_km in queries:
+        boxes = bounding_boxes(lat, lon, radius_km)
+        if boxes is None:
+            return queryset
+        for min_lat, max_lat, min_lon, max_lon in boxes:
+            area |= Q(
+                latitude__range=(min_lat, max_lat),
+                longitude__range=(min_lon, max_lon),
+            )
+            bounded = True
+    return queryset.filter(area) if bounded else queryset.none()
+
+
+def batch_within_radius(
+    points: Iterable[Point], queries: list[tuple[float, float, float]]
+) -> list[list[Point]]:
+    """
+    Распределяет кандидатов по поискам: для каждого круга оставляет точки в его радиусе
+
+    Args:
+        points: Точки-кандидаты
+        queries: Список (широта, долгота, радиус в километрах)
+
+    Returns:
+        Списки точек в том же порядке, что и поиски
+    """
+
+    points = list(points)
+    lats = as_array([point.latitude for point in points])
+    lons = as_array([point.longitude for point in points])
+    results = []
+    for lat, lon, radius_km in queries:
+        mask = within_radius(lat, lon, lats, lons, radius_km)
+        results.append([point for point, inside in zip(points, mask) if inside])
+    return results
@@ -0,0 +1,256 @@
+"""
+Кэш результатов поиска гео-точек в радиусе.
+
+Близкие запросы (например, отличающиеся шумом GPS) делят одну запись: центр
+привязывается к сетке, а радиус округляется вверх и расширяется на погрешность
+привязки, поэтому такой круг содержит круг исходного запроса. В кэше хранятся
+все точки расширенного круга, а ответ получается их точной проверкой по
+координатам и радиусу запроса и совпадает с ответом поиска без кэша.
+
+Поверхность разбита на ячейки сетки инвалидации, у каждой ячейки есть версия;
+ключ результата включает версии всех ячеек, покрытых кругом. Изменение точки
+или сообщения меняет версию её ячейки, и все результаты, задевающие эту ячейку,
+перестают находиться в кэше.
+
+Версии ячеек хранятся в том же кэше, поэтому при нескольких воркерах он должен
+быть общим (CACHE_REDIS_URL): в памяти процесса инвалидация видна только воркеру,
+изменившему точку, а остальные отдают старые результаты до истечения TIMEOUT.
+"""
+
+import hashlib
+import logging
+import threading
+import uuid
+from math import ceil, floor, isfinite
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+from geo import metrics
+from geo.caching import is_process_local
+
+from .geo import bounding_boxes, haversine, normalize_longitude
+
+CACHE_ALIAS: str = "search"
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """
+    Счётчики попаданий и промахов кэша поиска в текущем процессе
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.invalidations = 0
+
+    def record(self, name: str, count: int = 1) -> None:
+        """
+        Увеличивает счётчик с заданным именем
+        """
+
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+        metrics.cache_events.inc("search", name, amount=count)
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        Возвращает значения счётчиков и долю попаданий
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+stats = CacheStats()
+
+
+def is_enabled() -> bool:
+    """
+    Включён ли кэш поиска в настройках
+    """
+    return getattr(settings, "POINTS_SEARCH_CACHE_ENABLED", False)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _cell_degrees() -> float:
+    return getattr(settings, "POINTS_SEARCH_CACHE_CELL_DEGREES", 1.0)
+
+
+def check_backend() -> None:
+    """
+    Предупреждает при запуске, если кэш поиска включён, но хранится в памяти
+    процесса: такая настройка корректна только для одного воркера
+    """
+
+    if is_enabled() and is_process_local(CACHE_ALIAS):
+        logger.warning(
+            "POINTS_SEARCH_CACHE is enabled with a process-local %r cache: "
+            "invalidations do not reach other workers, so run a single worker "
+            "or set CACHE_REDIS_URL",
+            CACHE_ALIAS,
+        )
+
+
+def query_circle(
+    lat: float, lon: float, radius_km: float
+) -> tuple[float, float, float]:
+    """
+    Возвращает круг, результаты которого кэшируются для запроса: центр привязан
+    к сетке POINTS_SEARCH_CACHE_SNAP_DEGREES, радиус округлён вверх до шага
+    POINTS_SEARCH_CACHE_RADIUS_STEP_KM и увеличен на наибольшее смещение центра,
+    поэтому круг содержит круг запроса
+
+    Args:
+        lat: Широта центра запроса
+        lon: Долгота центра запроса
+        radius_km: Радиус запроса в километрах
+
+    Returns:
+        (широта, долгота, радиус); некорректный запрос возвращается без изменений
+    """
+
+    if not (isfinite(lat) and isfinite(lon) and isfinite(radius_km)):
+        return lat, lon, radius_km
+    snap = getattr(settings, "POINTS_SEARCH_CACHE_SNAP_DEGREES", 0.001)
+    step = getattr(settings, "POINTS_SEARCH_CACHE_RADIUS_STEP_KM", 0.1)
+    # смещение центра не больше половины ячейки по каждой оси; градус долготы
+    # длиннее всего на экваторе, запас в 1 м покрывает ошибки округления
+    error_km = haversine(0.0, 0.0, snap / 2, snap / 2) + 0.001
+    return (
+        round(round(lat / snap) * snap, 9),
+        round(round(normalize_longitude(lon) / snap) * snap, 9),
+        round(ceil(radius_km / step) * step + error_km, 9),
+    )
+
+
+def cell_of(lat: float, lon: float) -> tuple[int, int]:
+    """
+    Возвращает ячейку сетки инвалидации, в которую попадает точка
+    """
+
+    size = _cell_degrees()
+    return floor(lat / size), floor(normalize_longitude(lon) / size)
+
+
+def _version_key(cell: tuple[int, int]) -> str:
+    return f"cell:{cell[0]}:{cell[1]}"
+
+
+def query_cells(
+    lat: float, lon: float, radius_km: float
+) -> list[tuple[int, int]] | None:
+    """
+    Возвращает ячейки, которые может задеть круг поиска
+
+    Returns:
+        Список ячеек или None, если ячеек слишком много и запрос не кэшируется
+    """
+
+    boxes = bounding_boxes(lat, lon, radius_km)
+    if boxes is None:
+        return None
+    size = _cell_degrees()
+    max_cells = getattr(settings, "POINTS_SEARCH_CACHE_MAX_CELLS", 64)
+    cells = []
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        lat_from, lat_to = floor(min_lat / size), floor(max_lat / size)
+        lon_from, lon_to = floor(min_lon / size), floor(max_lon / size)
+        if len(cells) + (lat_to - lat_from + 1) * (lon_to - lon_from + 1) > max_cells:
+            return None
+        cells += [
+            (i, j)
+            for i in range(lat_from, lat_to + 1)
+            for j in range(lon_from, lon_to + 1)
+        ]
+    return cells
+
+
+def _versions(cells: list[tuple[int, int]]) -> list[str]:
+    cache = _cache()
+    keys = [_version_key(cell) for cell in cells]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # версия могла быть вытеснена из кэша, поэтому вместо неё заводится новая:
+            # результаты, сохранённые со старой версией, больше не будут найдены
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def result_key(
+    lat: float, lon: float, radius_km: float, variant: str = ""
+) -> str | None:
+    """
+    Строит ключ результата поиска с учётом текущих версий ячеек
+
+    Args:
+        lat: Широта центра круга query_circle()
+        lon: Долгота центра круга query_circle()
+        radius_km: Радиус круга query_circle() в километрах
+        variant: Дополнительные параметры, влияющие на ответ
+
+    Returns:
+        Ключ кэша или None, если запрос не кэшируется
+    """
+
+    cells = query_cells(lat, lon, radius_km)
+    if cells is None:
+        return None
+    digest = hashlib.sha1(":".join(_versions(cells)).encode()).hexdigest()
+    return f"search:{lat!r}:{lon!r}:{radius_km!r}:{variant}:{digest}"
+
+
+def get(key: str | None) -> Any:
+    """
+    Возвращает сохранённый результат поиска или None
+    """
+
+    if key is None:
+        stats.record("bypasses")
+        return None
+    value = _cache().get(key)
+    stats.record("misses" if value is None else "hits")
+    return value
+
+
+def put(key: str | None, value: Any) -> None:
+    """
+    Сохраняет результат поиска
+    """
+
+    if key is not None:
+        _cache().set(key, value)
+
+
+def invalidate(coords: Iterable[tuple[float, float]]) -> None:
+    """
+    Меняет версии ячеек, в которые попадают координаты
+
+    Args:
+        coords: Пары (широта, долгота) изменённых точек
+    """
+
+    cells = {cell_of(lat, lon) for lat, lon in coords}
+    if not cells:
+        return
+    _cache().set_many(
+        {_version_key(cell): uuid.uuid4().hex for cell in cells}, timeout=None
+    )
+    stats.record("invalidations", len(cells))
@@ -0,0 +1,192 @@
+"""
+Генерация тестовых данных: пользователи, точки и сообщения.
+
+Данные вставляются пачками через bulk_create, а счётчики сообщений, сетка
+плотности, кэш поиска и пространственный индекс обновляются так же, как
+при массовом импорте. Генератор детерминирован при одинаковом seed.
+"""
+
+import random
+from dataclasses import dataclass
+from math import asin, cos, degrees, radians, sin
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .geo import encode_geohash, normalize_longitude
+from .models import Message, Point
+from .signals import points_bulk_created
+
+DISTRIBUTIONS: tuple[str, ...] = ("uniform", "clustered")
+
+# широта ограничена, чтобы точки не скапливались у полюсов
+MAX_LATITUDE = 85.0
+KM_PER_DEGREE = 111.32
+
+
+@dataclass
+class SeedResult:
+    """
+    Количество созданных объектов
+    """
+
+    users: int = 0
+    points: int = 0
+    messages: int = 0
+
+
+def user_names(prefix: str, count: int) -> list[str]:
+    """
+    Возвращает имена пользователей генератора
+    """
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def coordinates(
+    rng: random.Random,
+    count: int,
+    distribution: str = "uniform",
+    clusters: int = 20,
+    spread_km: float = 25.0,
+) -> list[tuple[float, float]]:
+    """
+    Генерирует координаты точек
+
+    Args:
+        rng: Генератор случайных чисел
+        count: Количество точек
+        distribution: "uniform" - равномерно по площади, "clustered" - нормальное
+            распределение вокруг clusters случайных центров (города)
+        clusters: Количество центров для "clustered"
+        spread_km: Стандартное отклонение от центра в километрах
+
+    Returns:
+        Список (широта, долгота)
+    """
+
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution {distribution!r}")
+
+    if distribution == "uniform":
+        return [_uniform(rng) for _ in range(count)]
+
+    centers = [_uniform(rng) for _ in range(max(1, clusters))]
+    result = []
+    for _ in range(count):
+        lat, lon = rng.choice(centers)
+        lat = lat + rng.gauss(0, spread_km) / KM_PER_DEGREE
+        lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+        lon_km = KM_PER_DEGREE * max(cos(radians(lat)), 0.01)
+        lon = normalize_longitude(lon + rng.gauss(0, spread_km) / lon_km)
+        result.append((round(lat, 6), round(lon, 6)))
+    return result
+
+
+def _uniform(rng: random.Random) -> tuple[float, float]:
+    # равномерно по площади сферы в поясе |lat| <= MAX_LATITUDE
+    limit = sin(radians(MAX_LATITUDE))
+    lat = degrees(asin(rng.uniform(-limit, limit)))
+    return round(lat, 6), round(rng.uniform(-180, 180), 6)
+
+
+def seed(
+    users: int,
+    points: int,
+    messages: int,
+    distribution: str = "uniform",
+    clusters: int = 20,
+    spread_km: float = 25.0,
+    seed_value: int = 0,
+    batch_size: int = 5000,
+    password: str = "secret12",
+    prefix: str = "seed-",
+) -> SeedResult:
+    """
+    Создаёт пользователей, точки и сообщения
+
+    Args:
+        users: Количество пользователей (существующие с теми же именами переиспользуются)
+        points: Количество точек
+        messages: Количество сообщений (распределяются по точкам случайно)
+        distribution: Распределение точек (см. coordinates)
+        clusters: Количество центров для "clustered"
+        spread_km: Разброс вокруг центра в километрах
+        seed_value: Начальное значение генератора
+        batch_size: Количество точек в одной вставке
+        password: Пароль пользователей (хэшируется один раз)
+        prefix: Префикс имён пользователей
+
+    Returns:
+        Количество созданных объектов
+    """
+
+    rng = random.Random(seed_value)
+    result = SeedResult()
+    authors = _users(max(1, users), password, prefix, result)
+
+    locations = coordinates(rng, points, distribution, clusters, spread_km)
+    # сообщения на точку считаются заранее, чтобы вставлять их вместе с пачкой точек
+    per_point = [0] * points
+    if points:
+        for _ in range(messages):
+            per_point[rng.randrange(points)] += 1
+
+    for start in range(0, points, batch_size):
+        batch = range(start, min(points, start + batch_size))
+        with transaction.atomic():
+            created = Point.objects.bulk_create(
+                [
+                    _point(i, *locations[i], rng.choice(authors), per_point[i])
+                    for i in batch
+                ]
+            )
+            texts = [
+                Message(
+                    text=f"message {j} at point {i}",
+                    author=rng.choice(authors),
+                    point=point,
+                )
+                for i, point in zip(batch, created)
+                for j in range(per_point[i])
+            ]
+            Message.objects.bulk_create(texts, batch_size=batch_size)
+            Point.objects.filter(
+                id__in=[point.id for point in created if point.messages_count]
+            ).recount_messages()
+            points_bulk_created(created)
+        result.points += len(created)
+        result.messages += len(texts)
+    return result
+
+
+def _users(count: int, password: str, prefix: str, result: SeedResult) -> list:
+    model = get_user_model()
+    names = user_names(prefix, count)
+    existing = set(
+        model.objects.filter(username__in=names).values_list("username", flat=True)
+    )
+    hashed = make_password(password)
+    model.objects.bulk_create(
+        [
+            model(username=name, password=hashed)
+            for name in names
+            if name not in existing
+        ]
+    )
+    result.users = count - len(existing)
+    # порядок важен для rng.choice: без него авторы зависят от базы
+    return list(model.objects.filter(username__in=names).order_by("username"))
+
+
+def _point(index: int, lat: float, lon: float, creator, messages_count: int) -> Point:
+    point = Point(
+        name=f"point {index}",
+        description="generated",
+        latitude=lat,
+        longitude=lon,
+        creator=creator,
+        messages_count=messages_count,
+    )
+    point.geohash = encode_geohash(lat, lon)
+    return point
@@ -3,7 +3,7 @@
 """
 
 from rest_framework import serializers
-from .models import Point, Message
+from .models import Point, Message, Tombstone
 
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -37,6 +37,8 @@ class PointSerializer(serializers.ModelSerializer):
         latitude: Широта
         longitude: Долгота
         creator: Создатель точки
+        messages_count: Количество сообщений на точке
+        last_message_at: Дата последнего сообщения на точке
         created_at: Дата создания точки
         updated_at: Дата последнего изменения точки
     """
@@ -47,4 +49,120 @@ class PointSerializer(serializers.ModelSerializer):
     class Meta:
         model = Point
         fields = "__all__"
-        read_only_fields = ["created_at", "updated_at", "creator", "messages_count"]
+        read_only_fields = [
+            "created_at",
+            "updated_at",
+            "creator",
+            "messages_count",
+            "last_message_at",
+        ]
+
+
+class PointListSerializer(serializers.ModelSerializer):
+    """
+    Облегчённый сериализатор гео-точки для списков и поиска.
+    Ожидает выборку Point.objects.lean(): вместо всех сообщений отдаёт их количество
+    и, если в контексте передан messages_limit, последние сообщения.
+
+    Fields:
+        id: ID точки
+        name: Название точки
+        description: Описание точки
+        latitude: Широта
+        longitude: Долгота
+        creator: Создатель точки
+        created_at: Дата создания точки
+        updated_at: Дата последнего изменения точки
+        messages_count: Количество сообщений на точке
+        last_message_at: Дата последнего сообщения на точке
+        latest_messages: Последние сообщения на точке
+    """
+
+    creator = serializers.ReadOnlyField(source="creator.username")
+    latest_messages = MessageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Point
+        fields = (
+            "id",
+            "name",
+            "description",
+            "latitude",
+            "longitude",
+            "creator",
+            "created_at",
+            "updated_at",
+            "messages_count",
+            "last_message_at",
+            "latest_messages",
+        )
+        read_only_fields = fields
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get("messages_limit"):
+            fields.pop("latest_messages")
+        return fields
+
+
+class NearestPointSerializer(PointListSerializer):
+    """
+    Сериализатор гео-точки с расстоянием до центра поиска
+
+    Fields:
+        distance_km: Расстояние до центра поиска в километрах
+    """
+
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(PointListSerializer.Meta):
+        fields = PointListSerializer.Meta.fields + ("distance_km",)
+        read_only_fields = fields
+
+
+class CorridorPointSerializer(NearestPointSerializer):
+    """
+    Сериализатор гео-точки, найденной вдоль маршрута
+
+    Fields:
+        segment: Индекс ближайшего отрезка маршрута
+    """
+
+    segment = serializers.IntegerField(read_only=True)
+
+    class Meta(NearestPointSerializer.Meta):
+        fields = NearestPointSerializer.Meta.fields + ("segment",)
+        read_only_fields = fields
+
+
+class SyncMessageSerializer(MessageSerializer):
+    """
+    Сериализатор сообщения для ленты изменений
+
+    Fields:
+        point: ID точки сообщения
+    """
+
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ("point",)
+        read_only_fields = fields
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор записи об удалении
+
+    Fields:
+        kind: Тип удалённого объекта: point или message
+        id: ID удалённого объекта
+        point: ID точки удалённого объекта
+        deleted_at: Дата удаления
+    """
+
+    id = serializers.IntegerField(source="object_id")
+    point = serializers.IntegerField(source="point_id")
+
+    class Meta:
+        model = Tombstone
+        fields = ("kind", "id", "point", "deleted_at")
+        read_only_fields = fields
@@ -0,0 +1,187 @@
+"""
+Обработчики сигналов моделей гео-точек
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Point, Message, Tombstone
+from .spatial_index import get_built_index
+from . import density, search_cache, sync
+
+
+def point_coords(point: Point) -> list[tuple[float, float]]:
+    """
+    Возвращает текущие и, если точка перемещалась, прежние координаты точки
+    """
+
+    coords = [(point.latitude, point.longitude)]
+    loaded = getattr(point, "loaded_coords", None)
+    if loaded and None not in loaded and loaded != coords[0]:
+        coords.append(loaded)
+    return coords
+
+
+def message_coords(message: Message) -> list[tuple[float, float]]:
+    """
+    Возвращает координаты точки сообщения (пустой список, если точки уже нет)
+    """
+
+    if Message.point.is_cached(message):
+        return [(message.point.latitude, message.point.longitude)]
+    return list(
+        Point.objects.filter(id=message.point_id).values_list("latitude", "longitude")
+    )
+
+
+def invalidate_search_cache(coords: list[tuple[float, float]]) -> None:
+    """Сбрасывает результаты поиска, затрагивающие координаты, после фиксации транзакции"""
+
+    if search_cache.is_enabled() and coords:
+        transaction.on_commit(lambda: search_cache.invalidate(coords))
+
+
+@receiver(post_save, sender=Point)
+def index_saved_point(sender, instance: Point, **kwargs) -> None:
+    """Добавляет созданную или изменённую точку в пространственный индекс"""
+
+    def update() -> None:
+        index = get_built_index()
+        if index is not None:
+            index.add(instance.id, instance.latitude, instance.longitude)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Point)
+def unindex_deleted_point(sender, instance: Point, **kwargs) -> None:
+    """Удаляет точку из пространственного индекса"""
+
+    point_id = instance.id
+
+    def update() -> None:
+        index = get_built_index()
+        if index is not None:
+            index.remove(point_id)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Point)
+@receiver(post_delete, sender=Point)
+def invalidate_point_search(sender, instance: Point, **kwargs) -> None:
+    """Сбрасывает кэш поиска вокруг изменённой точки"""
+
+    invalidate_search_cache(point_coords(instance))
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_message_search(sender, instance: Message, **kwargs) -> None:
+    """Сбрасывает кэш поиска вокруг точки изменённого сообщения"""
+
+    if search_cache.is_enabled():
+        invalidate_search_cache(message_coords(instance))
+
+
+@receiver(post_save, sender=Point)
+def count_saved_point(sender, instance: Point, created: bool, **kwargs) -> None:
+    """Учитывает созданную или перемещённую точку в сетке плотности"""
+
+    coords = point_coords(instance)
+    if created:
+        density.apply_deltas(
+            density.point_deltas(*coords[0], 1, instance.messages_count)
+        )
+    elif len(coords) > 1:
+        messages = (
+            Point.objects.filter(id=instance.id)
+            .values_list("messages_count", flat=True)
+            .first()
+            or 0
+        )
+        density.apply_deltas(
+            density.merge_deltas(
+                density.point_deltas(*coords[1], -1, -messages),
+                density.point_deltas(*coords[0], 1, messages),
+            )
+        )
+
+
+@receiver(post_delete, sender=Point)
+def count_deleted_point(sender, instance: Point, **kwargs) -> None:
+    """Убирает удалённую точку из сетки плотности (её сообщения вычитаются отдельно)"""
+
+    density.apply_deltas(
+        density.point_deltas(instance.latitude, instance.longitude, -1, 0)
+    )
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def count_message(sender, instance: Message, **kwargs) -> None:
+    """Учитывает созданное или удалённое сообщение в сетке плотности"""
+
+    if kwargs.get("created") is False:
+        return
+    change = -1 if kwargs["signal"] is post_delete else 1
+    for lat, lon in message_coords(instance):
+        density.apply_deltas(density.point_deltas(lat, lon, 0, change))
+
+
+@receiver(post_delete, sender=Point)
+def record_deleted_point(sender, instance: Point, **kwargs) -> None:
+    """Оставляет запись об удалении точки для ленты изменений"""
+
+    Tombstone.objects.create(
+        kind=Tombstone.POINT, object_id=instance.id, point_id=instance.id
+    )
+
+
+@receiver(post_delete, sender=Message)
+def record_deleted_message(sender, instance: Message, **kwargs) -> None:
+    """Оставляет запись об удалении сообщения для ленты изменений"""
+
+    Tombstone.objects.create(
+        kind=Tombstone.MESSAGE, object_id=instance.id, point_id=instance.point_id
+    )
+
+
+@receiver(post_save, sender=Point)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=Tombstone)
+def watch_sync_horizon(sender, instance, **kwargs) -> None:
+    """Проверяет после фиксации, что строка стала видна до горизонта ленты изменений"""
+
+    stamp = instance.deleted_at if sender is Tombstone else instance.updated_at
+    transaction.on_commit(lambda: sync.check_commit_delay(stamp))
+
+
+def points_bulk_created(points: list[Point]) -> None:
+    """
+    Выполняет для точек, созданных через bulk_create (сигналы post_save при этом
+    не отправляются), те же действия, что и обработчики post_save
+
+    Args:
+        points: Созданные точки вместе с их сообщениями
+    """
+
+    def update_index() -> None:
+        index = get_built_index()
+        if index is not None:
+            for point in points:
+                index.add(point.id, point.latitude, point.longitude)
+
+    transaction.on_commit(update_index)
+    invalidate_search_cache([(point.latitude, point.longitude) for point in points])
+    density.apply_deltas(
+        density.merge_deltas(
+            *(
+                density.point_deltas(
+                    point.latitude, point.longitude, 1, point.messages_count
+                )
+                for point in points
+            )
+        )
+    )
@@ -0,0 +1,256 @@
+"""
+Локальный для процесса пространственный индекс гео-точек
+"""
+
+import threading
+import time
+from math import floor
+
+from django.conf import settings
+
+from .distance import within_radius
+from .geo import bounding_boxes
+from .models import Point
+
+Cell = tuple[int, int]
+
+
+class SpatialIndex:
+    """
+    Сеточный индекс координат точек: каждая ячейка размером cell_degrees x cell_degrees
+    хранит точки, попавшие в неё. Поиск в радиусе просматривает только ячейки,
+    пересекающие ограничивающий прямоугольник круга.
+
+    Attributes:
+        cell_degrees: Размер ячейки сетки в градусах
+        built_at: Время последнего полного построения (time.monotonic)
+    """
+
+    # если прямоугольник покрывает больше ячеек, дешевле просмотреть все точки
+    max_scan_cells: int = 10_000
+
+    def __init__(self, cell_degrees: float = 0.1) -> None:
+        self.cell_degrees = cell_degrees
+        self.built_at: float | None = None
+        self._lock = threading.RLock()
+        self._cells: dict[Cell, dict[int, tuple[float, float]]] = {}
+        self._positions: dict[int, tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return floor(lat / self.cell_degrees), floor(lon / self.cell_degrees)
+
+    def build(self, rows) -> None:
+        """
+        Полностью перестраивает индекс
+
+        Args:
+            rows: Итерируемое из кортежей (id, широта, долгота)
+        """
+
+        cells: dict[Cell, dict[int, tuple[float, float]]] = {}
+        positions: dict[int, tuple[float, float]] = {}
+        for point_id, lat, lon in rows:
+            positions[point_id] = (lat, lon)
+            cells.setdefault(self._cell(lat, lon), {})[point_id] = (lat, lon)
+        with self._lock:
+            self._cells = cells
+            self._positions = positions
+            self.built_at = time.monotonic()
+
+    def add(self, point_id: int, lat: float, lon: float) -> None:
+        """
+        Добавляет точку в индекс или переносит уже существующую
+        """
+
+        with self._lock:
+            self.remove(point_id)
+            self._positions[point_id] = (lat, lon)
+            self._cells.setdefault(self._cell(lat, lon), {})[point_id] = (lat, lon)
+
+    def remove(self, point_id: int) -> None:
+        """
+        Удаляет точку из индекса, если она там есть
+        """
+
+        with self._lock:
+            position = self._positions.pop(point_id, None)
+            if position is None:
+                return
+            cell = self._cell(*position)
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(point_id, None)
+                if not bucket:
+                    del self._cells[cell]
+
+    def snapshot(self) -> dict[int, tuple[float, float]]:
+        """
+        Возвращает копию содержимого индекса: id точки -> (широта, долгота)
+        """
+
+        with self._lock:
+            return dict(self._positions)
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> list[int]:
+        """
+        Возвращает id точек, находящихся в пределах радиуса
+
+        Args:
+            lat: Широта центра поиска
+            lon: Долгота центра поиска
+            radius_km: Радиус поиска в километрах
+
+        Returns:
+            Список id точек
+        """
+
+        boxes = bounding_boxes(lat, lon, radius_km)
+        with self._lock:
+            if boxes is None:
+                candidates = list(self._positions.items())
+            elif not boxes:
+                return []
+            else:
+                candidates = self._candidates(boxes)
+        mask = within_radius(
+            lat,
+            lon,
+            [p_lat for _, (p_lat, _) in candidates],
+            [p_lon for _, (_, p_lon) in candidates],
+            radius_km,
+        )
+        return [point_id for (point_id, _), inside in zip(candidates, mask) if inside]
+
+    def _candidates(self, boxes):
+        cells = []
+        for min_lat, max_lat, min_lon, max_lon in boxes:
+            lat_from, lon_from = self._cell(min_lat, min_lon)
+            lat_to, lon_to = self._cell(max_lat, max_lon)
+            cells.append((lat_from, lat_to, lon_from, lon_to))
+        total = sum((b - a + 1) * (d - c + 1) for a, b, c, d in cells)
+        if total > min(self.max_scan_cells, len(self._cells)):
+            return list(self._positions.items())
+
+        result = []
+        for lat_from, lat_to, lon_from, lon_to in cells:
+            for i in range(lat_from, lat_to + 1):
+                for j in range(lon_from, lon_to + 1):
+                    bucket = self._cells.get((i, j))
+                    if bucket:
+                        result.extend(bucket.items())
+        return result
+
+
+_index: SpatialIndex | None = None
+_index_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """
+    Включён ли пространственный индекс в настройках
+    """
+    return getattr(settings, "POINTS_SPATIAL_INDEX_ENABLED", False)
+
+
+def get_index() -> SpatialIndex:
+    """
+    Возвращает индекс процесса. Индекс строится при первом обращении и полностью
+    пересинхронизируется с базой данных раз в POINTS_SPATIAL_INDEX_RESYNC_SECONDS,
+    чтобы индексы разных воркеров не расходились.
+
+    Returns:
+        Актуальный пространственный индекс
+    """
+
+    global _index  # pylint: disable=global-statement
+
+    resync = getattr(settings, "POINTS_SPATIAL_INDEX_RESYNC_SECONDS", 300)
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < resync:
+        return index
+
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.built_at >= resync:
+            index = _index or SpatialIndex(
+                getattr(settings, "POINTS_SPATIAL_INDEX_CELL_DEGREES", 0.1)
+            )
+            index.build(
+                Point.objects.values_list("id", "latitude", "longitude").iterator(
+                    chunk_size=5000
+                )
+            )
+            _index = index
+        return _index
+
+
+def candidate_ids(queries: list[tuple[float, float, float]]) -> set[int] | None:
+    """
+    Возвращает id точек индекса процесса, попавших хотя бы в один из кругов.
+    Точка, перемещённая в другом воркере, остаётся в индексе на старом месте
+    до пересинхронизации, поэтому в круг нового положения она может не попасть
+    (ложные срабатывания по старому положению отсекает точная проверка).
+
+    Args:
+        queries: Список (широта, долгота, радиус в километрах)
+
+    Returns:
+        Множество id или None, если индекс выключен или id больше, чем
+        POINTS_SPATIAL_INDEX_MAX_IDS: длинный список IN дороже отбора
+        кандидатов по прямоугольнику в базе
+    """
+
+    if not is_enabled():
+        return None
+    limit = getattr(settings, "POINTS_SPATIAL_INDEX_MAX_IDS", 1000)
+    index = get_index()
+    point_ids: set[int] = set()
+    for lat, lon, radius_km in queries:
+        point_ids.update(index.query_radius(lat, lon, radius_km))
+        if len(point_ids) > limit:
+            return None
+    return point_ids
+
+
+def get_built_index() -> SpatialIndex | None:
+    """
+    Возвращает индекс, только если он уже построен (для инкрементальных обновлений)
+    """
+    return _index
+
+
+def reset_index() -> None:
+    """
+    Сбрасывает индекс процесса, он будет построен заново при следующем обращении
+    """
+
+    global _index  # pylint: disable=global-statement
+    with _index_lock:
+        _index = None
+
+
+def check_consistency(index: SpatialIndex) -> dict[str, list[int]]:
+    """
+    Сравнивает содержимое индекса с таблицей точек
+
+    Args:
+        index: Проверяемый индекс
+
+    Returns:
+        Словарь с id отсутствующих в индексе (missing), лишних (extra)
+        и точек с устаревшими координатами (moved)
+    """
+
+    indexed = index.snapshot()
+    missing, moved = [], []
+    for point_id, lat, lon in Point.objects.values_list(
+        "id", "latitude", "longitude"
+    ).iterator(chunk_size=5000):
+        position = indexed.pop(point_id, None)
+        if position is None:
+            missing.append(point_id)
+        elif position != (lat, lon):
+            moved.append(point_id)
+    return {"missing": missing, "extra": sorted(indexed), "moved": moved}
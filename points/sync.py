@@ -0,0 +1,193 @@
+"""
+Лента изменений для синхронизации клиентов: созданные и изменённые точки
+и сообщения, а также записи об удалениях после курсора клиента.
+
+Каждый поток (points, messages, deleted) читается по ключу (дата изменения, id)
+с индексом, курсор хранит последнюю отданную позицию каждого потока.
+
+Дата изменения ставится при записи строки, а видна строка становится только после
+фиксации транзакции, поэтому лента отдаёт изменения не новее горизонта
+(POINTS_SYNC_SETTLE_SECONDS назад). Лента полна, пока каждая транзакция, меняющая
+точки, сообщения или записи об удалениях, фиксируется не позже чем через
+POINTS_SYNC_SETTLE_SECONDS после своей записи: строку, зафиксированную позже,
+курсор уже прошёл, и клиенты её не получат. Такие транзакции отмечаются в логе
+(check_commit_delay); горизонт должен быть больше самой долгой из них.
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Message, Point, Tombstone
+
+Position = tuple[datetime, int]
+
+logger = logging.getLogger(__name__)
+
+# поток -> поле даты, по которому он упорядочен
+STREAMS: dict[str, str] = {
+    "points": "updated_at",
+    "messages": "updated_at",
+    "deleted": "deleted_at",
+}
+
+
+def encode_cursor(positions: dict[str, Position | None]) -> str:
+    """
+    Кодирует позиции потоков в непрозрачную строку курсора
+    """
+
+    data = {
+        name: [position[0].isoformat(), position[1]]
+        for name, position in positions.items()
+        if position is not None
+    }
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict[str, Position | None]:
+    """
+    Декодирует курсор, полученный от клиента
+
+    Raises:
+        ValueError: Если курсор повреждён
+    """
+
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        positions: dict[str, Position | None] = dict.fromkeys(STREAMS)
+        for name, (moment, object_id) in data.items():
+            if name not in STREAMS:
+                raise ValueError
+            parsed = parse_datetime(moment)
+            if parsed is None:
+                raise ValueError
+            positions[name] = (parsed, int(object_id))
+    except (TypeError, ValueError, AttributeError) as error:
+        raise ValueError("invalid cursor") from error
+    return positions
+
+
+def initial_positions() -> dict[str, Position | None]:
+    """
+    Позиции для первой синхронизации: все точки и сообщения с начала,
+    а удаления - только начиная с текущего момента
+    """
+    return {"points": None, "messages": None, "deleted": (horizon(), 0)}
+
+
+def is_expired(positions: dict[str, Position | None]) -> bool:
+    """
+    Устарел ли курсор: записи об удалениях после него могли быть уже удалены,
+    и клиенту нужна полная синхронизация
+    """
+
+    position = positions.get("deleted")
+    if position is None:
+        return False
+    days = getattr(settings, "POINTS_TOMBSTONE_RETENTION_DAYS", 30)
+    return position[0] < timezone.now() - timedelta(days=days)
+
+
+def settle_seconds() -> int:
+    """
+    Сколько секунд после записи транзакция может оставаться незафиксированной
+    """
+    return getattr(settings, "POINTS_SYNC_SETTLE_SECONDS", 30)
+
+
+def horizon() -> datetime:
+    """
+    Верхняя граница ленты: изменения новее неё отдаются в следующий раз,
+    когда транзакции, начатые раньше них, гарантированно зафиксированы
+    """
+    return timezone.now() - timedelta(seconds=settle_seconds())
+
+
+def check_commit_delay(stamp: datetime) -> None:
+    """
+    Предупреждает, если транзакция зафиксирована позже горизонта ленты:
+    курсоры клиентов могли уже пройти дату изменения, и строку они не получат
+
+    Args:
+        stamp: Дата изменения, записанная транзакцией
+    """
+
+    delay = (timezone.now() - stamp).total_seconds()
+    if delay > settle_seconds():
+        logger.warning(
+            "a transaction committed %.1f s after stamping a row changed at %s, "
+            "later than POINTS_SYNC_SETTLE_SECONDS=%s: sync clients may have "
+            "missed it, raise the setting above the longest write transaction",
+            delay,
+            stamp.isoformat(),
+            settle_seconds(),
+        )
+
+
+def after(
+    queryset: QuerySet, field: str, position: Position | None, until: datetime
+) -> QuerySet:
+    """
+    Возвращает строки после позиции курсора в порядке (дата, id)
+
+    Args:
+        queryset: Исходная выборка
+        field: Поле даты
+        position: Последняя отданная позиция или None
+        until: Верхняя граница по дате (не включительно)
+    """
+
+    queryset = queryset.filter(**{f"{field}__lt": until})
+    if position is not None:
+        moment, object_id = position
+        queryset = queryset.filter(
+            Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "id__gt": object_id})
+        )
+    return queryset.order_by(field, "id")
+
+
+def changes(
+    positions: dict[str, Position | None], limit: int, messages_limit: int = 0
+) -> tuple[dict[str, list], dict[str, Position | None], bool]:
+    """
+    Выбирает изменения всех потоков после курсора
+
+    Args:
+        positions: Позиции потоков из курсора
+        limit: Максимальное количество строк каждого потока
+        messages_limit: Количество последних сообщений на точку
+
+    Returns:
+        Строки по потокам, новые позиции и признак того, что изменений больше limit
+    """
+
+    until = horizon()
+    querysets = {
+        "points": Point.objects.lean(messages_limit),
+        "messages": Message.objects.select_related("author"),
+        "deleted": Tombstone.objects.all(),
+    }
+    rows: dict[str, list] = {}
+    new_positions = dict(positions)
+    has_more = False
+    for name, field in STREAMS.items():
+        page = list(
+            after(querysets[name], field, positions.get(name), until)[: limit + 1]
+        )
+        if len(page) > limit:
+            page = page[:limit]
+            has_more = True
+            new_positions[name] = (getattr(page[-1], field), page[-1].id)
+        else:
+            # поток прочитан до границы: курсор сдвигается к ней, даже если
+            # изменений не было, чтобы курсор активного клиента не устаревал
+            new_positions[name] = (until, 0)
+        rows[name] = page
+    return rows, new_positions, has_more
@@ -0,0 +1,3 @@
+"""
+Тесты приложения гео-точек
+"""
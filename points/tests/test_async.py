@@ -0,0 +1,147 @@
+"""
+Тесты асинхронных представлений и событий о сообщениях
+"""
+
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..models import Point
+from ..pubsub import get_broker, point_channel
+from ..async_views import PointEventsView
+
+User = get_user_model()
+
+
+class MessageEventsTests(TestCase):
+    """Изменения сообщений публикуются подписчикам канала точки"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pusher", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.point = Point.objects.create(
+            name="p", latitude=1, longitude=2, creator=self.user
+        )
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    async def subscribe(self):
+        return get_broker().subscribe(point_channel(self.point.id))
+
+    def test_message_changes_are_published(self):
+        subscription = self.loop.run_until_complete(self.subscribe())
+        self.addCleanup(get_broker().unsubscribe, subscription)
+        with self.captureOnCommitCallbacks(execute=True):
+            message = self.client.post(
+                f"/points/{self.point.id}/messages/", {"text": "hi"}
+            ).data
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/points/messages/{message['id']}/", {"text": "edited"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/points/messages/{message['id']}/")
+
+        events = [
+            self.loop.run_until_complete(subscription.get(timeout=1)) for _ in range(3)
+        ]
+        self.assertEqual(
+            [event["event"] for event in events],
+            ["message.created", "message.updated", "message.deleted"],
+        )
+        self.assertEqual(json.loads(events[1]["data"])["text"], "edited")
+        self.assertEqual(
+            json.loads(events[2]["data"]),
+            {"point": self.point.id, "id": message["id"]},
+        )
+
+    def test_event_stream(self):
+        async def scenario():
+            stream = PointEventsView.stream(point_channel(self.point.id))
+            first = await anext(stream)
+            await asyncio.to_thread(
+                get_broker().publish,
+                point_channel(self.point.id),
+                {"event": "message.created", "data": "{}"},
+            )
+            second = await anext(stream)
+            await stream.aclose()
+            return first, second
+
+        first, second = self.loop.run_until_complete(scenario())
+        self.assertEqual(first, ": connected\n\n")
+        self.assertEqual(second, "event: message.created\ndata: {}\n\n")
+        self.assertEqual(get_broker().subscribers_count(), 0)
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(f"/points/{self.point.id}/events/")
+        self.assertEqual(response.status_code, 401)
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(
+            "/points/0/events/", headers={"authorization": f"Token {token.key}"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_wsgi_request_is_refused(self):
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = client.get(f"/points/{self.point.id}/events/")
+        self.assertEqual(response.status_code, 501)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+
+
+class AsyncViewsTests(TestCase):
+    """Асинхронные представления чтения отдают то же, что и синхронные"""
+
+    def setUp(self):
+        caches["search"].clear()
+        self.user = User.objects.create_user(username="async", password="secret12")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.points = [
+            Point.objects.create(
+                name=f"p{i}", latitude=i / 10, longitude=i / 10, creator=self.user
+            )
+            for i in range(5)
+        ]
+        for text in "abc":
+            self.api.post(f"/points/{self.points[0].id}/messages/", {"text": text})
+
+    def get_async(self, url, **params):
+        return self.client.get(
+            url, params, headers={"authorization": f"Token {self.token.key}"}
+        )
+
+    def test_same_payload(self):
+        point_id = self.points[0].id
+        search = {"latitude": 0, "longitude": 0, "radius": 30, "messages": 2}
+        for path, params in [
+            (f"{point_id}/", {}),
+            ("search/", search),
+        ]:
+            with self.subTest(path=path):
+                expected = self.api.get(f"/points/{path}", params)
+                response = self.get_async(f"/points/async/{path}", **params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+        for path in ["", f"{point_id}/messages/"]:
+            with self.subTest(path=path):
+                expected = self.api.get(f"/points/{path}", {"page_size": 100})
+                data = self.get_async(f"/points/async/{path}", page_size=2).json()
+                pages = data["results"]
+                while data["next"]:
+                    data = self.get_async(data["next"]).json()
+                    pages += data["results"]
+                self.assertEqual(pages, json.loads(expected.content)["results"])
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get("/points/async/").status_code, 401)
+        self.assertEqual(self.get_async("/points/async/0/").status_code, 404)
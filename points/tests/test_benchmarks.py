@@ -0,0 +1,86 @@
+"""
+Тесты генератора данных и нагрузочного тестирования
+"""
+
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import LiveServerTestCase, TestCase
+from rest_framework.authtoken.models import Token
+
+from ..models import DensityCell, Point, Message
+from ..loadtest import LoadTest, parse_mix
+from .. import seeding
+
+User = get_user_model()
+
+
+class SeedingTests(TestCase):
+    """Генератор данных воспроизводим и обновляет производные данные"""
+
+    def test_seed(self):
+        result = seeding.seed(
+            users=3, points=50, messages=120, distribution="clustered", batch_size=20
+        )
+        self.assertEqual((result.users, result.points, result.messages), (3, 50, 120))
+        self.assertEqual(Message.objects.count(), 120)
+        self.assertEqual(
+            sum(Point.objects.values_list("messages_count", flat=True)), 120
+        )
+        cells = DensityCell.objects.filter(level=0)
+        self.assertEqual(sum(cells.values_list("points_count", flat=True)), 50)
+        self.assertTrue(self.client.login(username="seed-0", password="secret12"))
+
+        def generated():
+            return sorted(
+                Point.objects.values_list(
+                    "name", "latitude", "longitude", "creator__username"
+                )
+            ), sorted(Message.objects.values_list("text", "author__username"))
+
+        first = generated()
+        Point.objects.all().delete()
+        seeding.seed(
+            users=3, points=50, messages=120, distribution="clustered", batch_size=20
+        )
+        self.assertEqual(generated(), first)
+
+
+class LoadTestTests(LiveServerTestCase):
+    """Нагрузочный тест работает с запущенным сервером и переиспользует токен"""
+
+    # представления точек могут читать с реплик (DB_REPLICA_HOSTS)
+    databases = "__all__"
+
+    @staticmethod
+    def concurrency() -> int:
+        """
+        Несколько виртуальных пользователей. Тестовая база SQLite в памяти
+        отдаётся потокам сервера одним общим соединением, и ошибка транзакции
+        одного запроса ломает параллельные, поэтому с ней пользователь один.
+        """
+
+        connection = connections["default"]
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            return 1
+        return 4
+
+    def test_run(self):
+        user = User.objects.create_user(username="load", password="secret12")
+        point = Point.objects.create(name="p", latitude=1, longitude=2, creator=user)
+        test = LoadTest(
+            url=self.live_server_url,
+            username="load",
+            password="secret12",
+            mix=parse_mix("search=3,list=1,message=1,login=1"),
+            concurrency=self.concurrency(),
+            requests=24,
+        )
+        results = {result["name"]: result for result in asyncio.run(test.run())}
+        self.assertEqual(results["total"]["requests"], 24)
+        self.assertEqual(results["total"]["errors"], 0)
+        self.assertEqual(
+            Message.objects.filter(point=point).count(), results["message"]["requests"]
+        )
+        self.assertEqual(Token.objects.filter(user=user).count(), 1)
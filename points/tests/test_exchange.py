@@ -0,0 +1,162 @@
+"""
+Тесты синхронизации изменений, выгрузки и импорта точек
+"""
+
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Point, Message
+from .. import sync
+
+User = get_user_model()
+
+
+@override_settings(POINTS_SYNC_SETTLE_SECONDS=0)
+class SyncFeedTests(TestCase):
+    """Лента изменений отдаёт созданные, изменённые и удалённые объекты после курсора"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="syncer", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.points = [
+            Point.objects.create(
+                name=f"p{i}", latitude=i, longitude=i, creator=self.user
+            )
+            for i in range(3)
+        ]
+
+    def sync(self, cursor=None, limit=500):
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get("/points/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_late_commit_is_logged(self):
+        with override_settings(POINTS_SYNC_SETTLE_SECONDS=30):
+            with self.assertNoLogs("points.sync", "WARNING"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.points[0].save()
+            with self.assertLogs("points.sync", "WARNING"):
+                sync.check_commit_delay(timezone.now() - timedelta(seconds=31))
+
+    def test_incremental_sync(self):
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            data = self.sync(cursor, limit=2)
+            seen += [point["id"] for point in data["points"]]
+            cursor, has_more = data["cursor"], data["has_more"]
+        self.assertEqual(seen, [point.id for point in self.points])
+        self.assertEqual(self.sync(cursor)["points"], [])
+
+        message = self.client.post(
+            f"/points/{self.points[0].id}/messages/", {"text": "hi"}
+        ).data
+        self.client.patch(f"/points/{self.points[1].id}/", {"name": "renamed"})
+        data = self.sync(cursor)
+        self.assertEqual(
+            [(point["id"], point["messages_count"]) for point in data["points"]],
+            [(self.points[0].id, 1), (self.points[1].id, 0)],
+        )
+        self.assertEqual(
+            [(m["id"], m["point"]) for m in data["messages"]],
+            [(message["id"], self.points[0].id)],
+        )
+        cursor = data["cursor"]
+
+        self.client.delete(f"/points/{self.points[0].id}/")
+        data = self.sync(cursor)
+        self.assertEqual(
+            {(row["kind"], row["id"]) for row in data["deleted"]},
+            {("point", self.points[0].id), ("message", message["id"])},
+        )
+        self.assertEqual(self.sync(data["cursor"])["deleted"], [])
+
+    def test_invalid_and_expired_cursor(self):
+        response = self.client.get("/points/changes/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+        stale = {
+            name: (timezone.now() - timedelta(days=365), 0) for name in sync.STREAMS
+        }
+        response = self.client.get(
+            "/points/changes/", {"cursor": sync.encode_cursor(stale)}
+        )
+        self.assertEqual(response.status_code, 410)
+
+
+class ExportTests(TestCase):
+    """Потоковая выгрузка отдаёт все точки с сообщениями"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="analyst", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            point = Point.objects.create(
+                name=f"p{i}", latitude=i, longitude=-i, creator=self.user
+            )
+            Message.objects.create(text=f"m{i}", author=self.user, point=point)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        lines = self.read("/points/export/?messages=1").splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["name"] for row in rows], [f"p{i}" for i in range(5)])
+        self.assertEqual(rows[3]["messages"][0]["text"], "m3")
+
+    def test_geojson(self):
+        collection = json.loads(self.read("/points/export/?output=geojson"))
+        self.assertEqual(collection["type"], "FeatureCollection")
+        self.assertEqual(len(collection["features"]), 5)
+        self.assertEqual(collection["features"][2]["geometry"]["coordinates"], [-2, 2])
+
+
+class ImportTests(TestCase):
+    """Массовый импорт вставляет корректные строки и сообщает об ошибочных"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="partner", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_with_errors(self):
+        body = "\n".join(
+            [
+                json.dumps({"name": "a", "latitude": 1, "longitude": 2}),
+                json.dumps({"name": "b", "latitude": 100, "longitude": 2}),
+                "not json",
+                json.dumps(
+                    {"name": "c", "latitude": 3, "longitude": 4, "messages": ["x", "y"]}
+                ),
+            ]
+        )
+        response = self.client.post(
+            "/points/import/?batch_size=1",
+            body,
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["messages_created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        point = Point.objects.get(name="c")
+        self.assertEqual(point.messages_count, 2)
+        self.assertIsNotNone(point.last_message_at)
+        self.assertTrue(point.geohash)
+
+    def test_csv(self):
+        body = "name,description,latitude,longitude\na,,1,2\nb,desc,x,2\n"
+        response = self.client.post("/points/import/", body, content_type="text/csv")
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        self.assertEqual(Point.objects.get().creator, self.user)
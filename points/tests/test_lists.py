@@ -0,0 +1,295 @@
+"""
+Тесты списков точек и сообщений
+"""
+
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from ..models import Point, Message
+from ..renderers import FastJSONRenderer
+
+User = get_user_model()
+
+
+class PaginationTests(TestCase):
+    """Курсорная пагинация должна отдавать все записи по одному разу и по порядку"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.point = Point.objects.create(
+            name="p", latitude=1, longitude=2, creator=self.user
+        )
+        Message.objects.bulk_create(
+            Message(text=f"m{i}", author=self.user, point=self.point)
+            for i in range(120)
+        )
+
+    def test_messages_cursor_walk(self):
+        url = f"/points/{self.point.id}/messages/?page_size=50"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [message["id"] for message in response.data["results"]]
+            url = response.data["next"]
+        expected = list(
+            Message.objects.filter(point=self.point)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_points_keyset_walk_with_ties(self):
+        points = Point.objects.bulk_create(
+            Point(name=f"t{i}", latitude=0, longitude=0, creator=self.user)
+            for i in range(30)
+        )
+        for point in points[::4]:
+            Point.objects.filter(id=point.id).update(messages_count=point.id % 3 + 1)
+        expected = list(
+            Point.objects.order_by("-messages_count", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        url = "/points/?ordering=-messages_count&page_size=7"
+        seen, pages = [], []
+        with CaptureQueriesContext(connections["default"]) as queries:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                seen += [point["id"] for point in response.data["results"]]
+                pages.append(response.data)
+                url = response.data["next"]
+        self.assertEqual(seen, expected)
+        self.assertFalse(
+            [query for query in queries if "OFFSET" in query["sql"].upper()]
+        )
+
+        url, backwards = pages[-1]["previous"], []
+        while url:
+            response = self.client.get(url)
+            backwards = [point["id"] for point in response.data["results"]] + backwards
+            url = response.data["previous"]
+        self.assertEqual(backwards, expected[: len(backwards)])
+        self.assertEqual(len(backwards) + len(pages[-1]["results"]), len(expected))
+
+    def test_invalid_cursor_position(self):
+        cursor = base64.b64encode(b"p=%5B%22x%22%2C%20%221%22%5D").decode()
+        response = self.client.get(f"/points/?cursor={cursor}")
+        self.assertEqual(response.status_code, 404)
+
+
+class LeanListTests(TestCase):
+    """Список и поиск точек выполняются за постоянное количество запросов"""
+
+    def setUp(self):
+        caches["search"].clear()
+        self.user = User.objects.create_user(username="reader", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(10):
+            point = Point.objects.create(
+                name=f"p{i}", latitude=i / 100, longitude=0, creator=self.user
+            )
+            Message.objects.bulk_create(
+                Message(text=f"m{j}", author=self.user, point=point) for j in range(i)
+            )
+        Point.objects.recount_messages()
+
+    def test_list_query_count(self):
+        # валидаторы ответа, страница точек с создателями и счётчиками,
+        # последние сообщения
+        with self.assertNumQueries(3):
+            response = self.client.get("/points/?messages=2")
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([p["messages_count"] for p in results], list(range(10)))
+        self.assertEqual(
+            [len(p["latest_messages"]) for p in results], [min(i, 2) for i in range(10)]
+        )
+
+    def test_search_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/points/search/?latitude=0&longitude=0&radius=5&messages=1"
+            )
+        self.assertEqual(len(response.data), 5)
+        self.assertNotIn("messages", response.data[0])
+
+    def test_fast_serialization_matches_drf(self):
+        point = Point.objects.get(name="p9")
+        Message.objects.create(text="ünïcode\u2028", author=self.user, point=point)
+        urls = [
+            "/points/?page_size=4",
+            "/points/?ordering=-messages_count",
+            "/points/search/?latitude=0&longitude=0&radius=5",
+            f"/points/{point.id}/messages/",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                responses = []
+                for fast in (False, True):
+                    caches["search"].clear()
+                    with override_settings(POINTS_FAST_SERIALIZATION=fast):
+                        responses.append(self.client.get(url))
+                self.assertEqual(responses[0].status_code, 200)
+                self.assertEqual(responses[0].content, responses[1].content)
+
+
+class MessageCountersTests(TestCase):
+    """Денормализованные счётчики сообщений обновляются при создании и удалении"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="writer", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.point = Point.objects.create(
+            name="p", latitude=1, longitude=2, creator=self.user
+        )
+
+    def test_create_and_delete(self):
+        first = self.client.post(f"/points/{self.point.id}/messages/", {"text": "a"})
+        second = self.client.post(f"/points/{self.point.id}/messages/", {"text": "b"})
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.messages_count, 2)
+        self.assertEqual(
+            self.point.last_message_at,
+            Message.objects.get(id=second.data["id"]).created_at,
+        )
+
+        self.client.delete(f"/points/messages/{second.data['id']}/")
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.messages_count, 1)
+        self.assertEqual(
+            self.point.last_message_at,
+            Message.objects.get(id=first.data["id"]).created_at,
+        )
+
+        self.client.delete(f"/points/messages/{first.data['id']}/")
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.messages_count, 0)
+        self.assertIsNone(self.point.last_message_at)
+
+    def test_most_active_ordering(self):
+        busy = Point.objects.create(
+            name="busy", latitude=0, longitude=0, creator=self.user
+        )
+        for text in "abc":
+            self.client.post(f"/points/{busy.id}/messages/", {"text": text})
+        response = self.client.get("/points/?ordering=-messages_count")
+        self.assertEqual(response.data["results"][0]["id"], busy.id)
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменившиеся точки, сообщения и результаты поиска отдаются как 304"""
+
+    def setUp(self):
+        caches["search"].clear()
+        self.user = User.objects.create_user(username="etag", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.point = Point.objects.create(
+            name="p", latitude=1, longitude=2, creator=self.user
+        )
+        self.client.post(f"/points/{self.point.id}/messages/", {"text": "a"})
+
+    def test_point_and_messages(self):
+        for url in [f"/points/{self.point.id}/", f"/points/{self.point.id}/messages/"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response["ETag"]
+                self.assertTrue(response.has_header("Last-Modified"))
+                with self.assertNumQueries(1):
+                    cached = self.client.get(url, headers={"if-none-match": etag})
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached["ETag"], etag)
+
+                message = self.client.post(
+                    f"/points/{self.point.id}/messages/", {"text": "b"}
+                ).data
+                changed = self.client.get(url, headers={"if-none-match": etag})
+                self.assertEqual(changed.status_code, 200)
+                self.client.patch(f"/points/messages/{message['id']}/", {"text": "c"})
+                edited = self.client.get(
+                    url, headers={"if-none-match": changed["ETag"]}
+                )
+                self.assertEqual(edited.status_code, 200)
+
+    def test_list_and_search(self):
+        for url in ["/points/", "/points/search/?latitude=1&longitude=2&radius=5"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response["ETag"]
+                self.assertIn("Accept", response["Vary"])
+                self.assertIn("Authorization", response["Vary"])
+                # 304 по одному агрегирующему запросу (поиску - по записи кэша)
+                # без выборки страницы
+                with CaptureQueriesContext(connections["default"]) as queries:
+                    cached = self.client.get(url, headers={"if-none-match": etag})
+                self.assertEqual(cached.status_code, 304)
+                self.assertLessEqual(len(queries), 1)
+
+                other = self.client.get(
+                    url, headers={"if-none-match": etag, "accept": "text/html"}
+                )
+                self.assertNotEqual(other.status_code, 304)
+                other_user = APIClient()
+                other_user.force_authenticate(
+                    User.objects.create_user(username=f"other{len(url)}")
+                )
+                response = other_user.get(url, headers={"if-none-match": etag})
+                self.assertEqual(response.status_code, 200)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    Point.objects.create(
+                        name="q", latitude=1.01, longitude=2, creator=self.user
+                    )
+                changed = self.client.get(url, headers={"if-none-match": etag})
+                self.assertEqual(changed.status_code, 200)
+                with self.captureOnCommitCallbacks(execute=True):
+                    Point.objects.get(name="q").delete()
+                deleted = self.client.get(
+                    url, headers={"if-none-match": changed["ETag"]}
+                )
+                self.assertEqual(deleted.status_code, 200)
+
+    def test_latest_messages_edit_changes_etag(self):
+        url = "/points/?messages=1"
+        etag = self.client.get(url)["ETag"]
+        message = Message.objects.get(point=self.point)
+        message.text = "edited"
+        message.save()
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"][0]["latest_messages"][0]["text"], "edited"
+        )
+
+
+class RendererTests(SimpleTestCase):
+    """FastJSONRenderer отдаёт те же байты, что и JSONRenderer"""
+
+    def test_same_output(self):
+        samples = [
+            {"a": 1.5, "b": [1, None, True, "тест \u2028 \u2029 </script>"]},
+            [0.0, -0.0, 1e-4, 1e-5, 123456.789, 1e15, 1e16, 2**70],
+            {"date": timezone.now(), "nested": {"x": 55.755826}},
+            {1: "int key"},
+            [],
+        ]
+        for data in samples:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data), JSONRenderer().render(data)
+                )
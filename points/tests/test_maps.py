@@ -0,0 +1,104 @@
+"""
+Тесты кластеризации видимой области и сетки плотности
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..density import rebuild
+from ..models import DensityCell, Point
+
+User = get_user_model()
+
+
+class ViewportTests(TestCase):
+    """Плотные ячейки видимой области возвращаются кластерами, редкие - точками"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="mapper", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Point.objects.bulk_create(
+            Point(
+                name=f"c{i}",
+                latitude=10.01,
+                longitude=20.01 + i / 1000,
+                creator=self.user,
+            )
+            for i in range(8)
+        )
+        Point.objects.bulk_create(
+            Point(name=f"s{i}", latitude=-10 - i, longitude=-20, creator=self.user)
+            for i in range(3)
+        )
+        Point.objects.create(name="far", latitude=60, longitude=100, creator=self.user)
+
+    def test_clusters_and_points(self):
+        response = self.client.get("/points/viewport/?bbox=-30,-30,30,30&zoom=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["clusters"]), 1)
+        cluster = response.data["clusters"][0]
+        self.assertEqual(cluster["count"], 8)
+        self.assertEqual(len(cluster["sample_ids"]), 3)
+        self.assertAlmostEqual(cluster["latitude"], 10.01)
+        self.assertEqual(
+            sorted(point["name"] for point in response.data["points"]),
+            ["s0", "s1", "s2"],
+        )
+
+    def test_too_many_cells(self):
+        response = self.client.get("/points/viewport/?bbox=-180,-90,180,90&zoom=15")
+        self.assertEqual(response.status_code, 400)
+
+
+class DensityGridTests(TestCase):
+    """Сетка плотности обновляется инкрементально и совпадает с полным пересчётом"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="analyst", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def snapshot(self):
+        return set(
+            DensityCell.objects.filter(points_count__gt=0).values_list(
+                "level", "cell_y", "cell_x", "points_count", "messages_count"
+            )
+        )
+
+    def test_incremental_matches_rebuild(self):
+        first = self.client.post(
+            "/points/", {"name": "a", "latitude": 55.75, "longitude": 37.61}
+        ).data
+        second = self.client.post(
+            "/points/", {"name": "b", "latitude": -33.9, "longitude": 151.2}
+        ).data
+        for text in "xyz":
+            self.client.post(f"/points/{first['id']}/messages/", {"text": text})
+        self.client.post(f"/points/{second['id']}/messages/", {"text": "w"})
+        self.client.patch(f"/points/{first['id']}/", {"latitude": 40.1})
+        self.client.post(
+            "/points/import/",
+            json.dumps({"name": "c", "latitude": 1, "longitude": 1, "messages": ["m"]}),
+            content_type="application/x-ndjson",
+        )
+        self.client.delete(f"/points/{second['id']}/")
+
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+        response = self.client.get("/points/heatmap/?level=0&bbox=30,30,50,50")
+        self.assertEqual(
+            response.data["cells"],
+            [{"latitude": 40.5, "longitude": 37.5, "points": 1, "messages": 3}],
+        )
+
+    def test_invalid_bbox(self):
+        for bbox in ["nan,0,10,10", "-inf,-90,inf,90", "0,-100,10,10", "0,20,10,10"]:
+            with self.subTest(bbox=bbox):
+                response = self.client.get(f"/points/heatmap/?level=0&bbox={bbox}")
+                self.assertEqual(response.status_code, 400)
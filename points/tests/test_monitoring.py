@@ -0,0 +1,131 @@
+"""
+Тесты измерения запросов и метрик
+"""
+
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from geo import metrics
+
+from ..models import Point
+
+User = get_user_model()
+
+
+class RequestTimingTests(TestCase):
+    """Показатели запросов отдаются в Server-Timing и проверяются бюджетом"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="timing", password="secret12")
+        self.token = Token.objects.create(user=self.user)
+        Point.objects.create(name="p", latitude=1, longitude=2, creator=self.user)
+
+    def test_server_timing(self):
+        with self.assertLogs("geo.requests", "INFO") as logs:
+            response = self.client.get(
+                "/points/", headers={"authorization": f"Token {self.token.key}"}
+            )
+        timing = response["Server-Timing"]
+        self.assertIn('desc="3 queries"', timing)
+        for metric in ("db;dur=", "view;dur=", "serialize;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "points.views.PointListCreateView")
+        self.assertEqual(record["queries"], 3)
+
+    def test_query_budget(self):
+        budgets = {"points.views.PointListCreateView": 1}
+        with override_settings(GEO_QUERY_BUDGETS=budgets), self.assertLogs(
+            "geo.requests", "WARNING"
+        ) as logs:
+            self.client.get(
+                "/points/", headers={"authorization": f"Token {self.token.key}"}
+            )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "query_budget_exceeded")
+        self.assertEqual(record["budget"], 1)
+
+    async def test_async_view(self):
+        response = await self.async_client.get(
+            "/points/async/", headers={"authorization": f"Token {self.token.key}"}
+        )
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+
+class MetricsTests(TestCase):
+    """Метрики запросов, поиска и аутентификации отдаются в формате Prometheus"""
+
+    def setUp(self):
+        caches["search"].clear()
+        self.user = User.objects.create_user(username="metrics", password="secret12")
+        self.token = Token.objects.create(user=self.user)
+        Point.objects.create(name="p", latitude=1, longitude=2, creator=self.user)
+
+    def value(self, line_prefix: str) -> float:
+        text = self.client.get("/metrics").content.decode()
+        for line in text.splitlines():
+            if line.startswith(line_prefix + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def test_exposition(self):
+        requests = (
+            'geo_http_requests_total{route="points/search/",method="GET",status="200"}'
+        )
+        candidates = 'geo_search_candidates_count{search="radius"}'
+        failures = 'geo_auth_total{method="token",outcome="failure"}'
+        before = [self.value(name) for name in (requests, candidates, failures)]
+
+        auth = {"authorization": f"Token {self.token.key}"}
+        self.client.get("/points/search/?latitude=1&longitude=2&radius=5", headers=auth)
+        self.client.get("/points/", headers={"authorization": "Token wrong"})
+
+        after = [self.value(name) for name in (requests, candidates, failures)]
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1, 1])
+        response = self.client.get("/metrics")
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'geo_http_request_duration_seconds_bucket{route="points/search/",'
+            'method="GET",le="+Inf"}',
+            response.content.decode(),
+        )
+
+    def test_async_search(self):
+        results = 'geo_search_results_sum{search="radius"}'
+        before = self.value(results)
+        response = self.client.get(
+            "/points/async/search/?latitude=1&longitude=2&radius=5",
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.value(results) - before, 1)
+
+    def test_shared_mode_sums_workers(self):
+        self.client.get("/points/")
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            GEO_METRICS_MODE="shared", GEO_METRICS_DIR=directory
+        ):
+            counter = metrics.registry.snapshot()["geo_http_requests_total"]
+            # файл другого воркера с теми же значениями
+            with open(os.path.join(directory, "other.json"), "w") as file:
+                json.dump({"geo_http_requests_total": counter}, file)
+            collected = metrics.registry.collect()["geo_http_requests_total"]
+        own = {tuple(labels): value for labels, value in counter["values"]}
+        for labels, value in collected["values"]:
+            # /metrics сам увеличивает счётчик после снимка
+            if labels[0] != "metrics":
+                self.assertEqual(value, 2 * own[tuple(labels)])
+
+    @override_settings(GEO_METRICS_TOKEN="scrape")
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer scrape"}
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,142 @@
+"""
+Тесты маршрутизации чтений на реплики
+"""
+
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from geo.db_router import ReplicaRouter, pin_key
+from geo.middleware import ReadYourWritesMiddleware
+
+from ..models import Point
+
+User = get_user_model()
+
+
+# файловый кэш общий для процессов одной машины, как Redis для воркеров
+SHARED_PIN_CACHES = {
+    **settings.CACHES,
+    "replica-pins": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "geo-tests-replica-pins"),
+    },
+}
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], CACHES=SHARED_PIN_CACHES)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Чтения идут на реплику, кроме записей и запросов сразу после записи"""
+
+    def setUp(self):
+        caches["replica-pins"].clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(
+        self,
+        method: str,
+        path: str,
+        token: str = "a",
+        write: bool = False,
+        model=Point,
+    ):
+        routed = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Point)
+            routed.append(self.router.db_for_read(model))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)(
+            path, headers={"authorization": f"Token {token}"}
+        )
+        ReadYourWritesMiddleware(view)(request)
+        return routed[0]
+
+    def test_routing(self):
+        self.assertEqual(self.route("get", "/points/"), "replica")
+        self.assertEqual(self.route("get", "/auth/login/"), "default")
+        self.assertEqual(self.route("post", "/points/"), "default")
+        # после записи клиент читает с основной базы, другие клиенты - с реплики
+        self.assertEqual(self.route("get", "/points/search/"), "default")
+        self.assertEqual(self.route("get", "/points/", token="b"), "replica")
+        self.assertEqual(self.router.db_for_read(Point), "default")
+
+    def test_auth_models_read_from_primary(self):
+        # вход не закрепляет клиента, но токен и пользователь читаются с основной базы
+        for model in (Token, User, Session):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    self.route("get", "/points/", token="new", model=model), "default"
+                )
+        self.assertEqual(self.route("get", "/points/", token="new"), "replica")
+
+    def test_write_in_safe_request_pins(self):
+        self.assertEqual(self.route("get", "/points/", write=True), "default")
+        self.assertEqual(self.route("get", "/points/"), "default")
+
+    def test_pin_is_shared_between_workers(self):
+        self.assertEqual(self.route("post", "/points/"), "default")
+        # кэш другого воркера: отдельный экземпляр бэкенда с тем же хранилищем
+        other_worker = FileBasedCache(SHARED_PIN_CACHES["replica-pins"]["LOCATION"], {})
+        request = self.factory.get("/points/", headers={"authorization": "Token a"})
+        self.assertIsNotNone(other_worker.get(pin_key(request)))
+
+    def test_process_local_pin_cache_is_refused(self):
+        local = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(CACHES={**SHARED_PIN_CACHES, "replica-pins": local}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReadYourWritesMiddleware(HttpResponse)
+            with override_settings(DATABASE_REPLICAS=[]):
+                ReadYourWritesMiddleware(HttpResponse)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "no replica databases are configured")
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Со второй базой (DB_REPLICA_HOSTS) чтения представлений точек идут на реплику"""
+
+    databases = "__all__"
+
+    def test_reads_use_replica(self):
+        caches["replica-pins"].clear()
+        user = User.objects.create_user(username="replica", password="secret12")
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+        )
+        Point.objects.create(name="p", latitude=1, longitude=2, creator=user)
+        with CaptureQueriesContext(
+            connections[settings.DATABASE_REPLICAS[0]]
+        ) as on_replica:
+            response = client.get("/points/")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertGreater(len(on_replica), 0)
+        # токен проверяется по основной базе, отставание реплики не даёт 401
+        self.assertFalse(any("authtoken_token" in query["sql"] for query in on_replica))
+
+        client.post("/points/", {"name": "q", "latitude": 3, "longitude": 4})
+        with CaptureQueriesContext(
+            connections[settings.DATABASE_REPLICAS[0]]
+        ) as on_replica:
+            client.get("/points/")
+        self.assertEqual(len(on_replica), 0)
@@ -0,0 +1,406 @@
+"""
+Тесты поиска точек и кэша поиска
+"""
+
+import random
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..distance import haversine_many, has_numpy
+from ..geo import haversine
+from ..corridor import (
+    corridor_prefilter,
+    decode_polyline,
+    points_along,
+    segment_distance,
+)
+from ..models import Point
+from ..search import radius_prefilter, filter_within_radius, nearest_points
+from ..spatial_index import SpatialIndex, check_consistency
+from .. import search_cache, spatial_index
+
+User = get_user_model()
+
+
+class RadiusSearchTests(TestCase):
+    """Поиск с префильтром должен совпадать с полным перебором"""
+
+    centers = [
+        (0, 0, 500),
+        (0, 179.9, 150),
+        (0, -179.9, 150),
+        (89.5, 10, 300),
+        (-45, 60, 2500),
+        (30, -100, 0),
+        (10, 10, 25000),
+        (10, 10, -1),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(42)
+        cls.user = User.objects.create_user(username="tester", password="secret12")
+        coords = [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(300)]
+        coords += [(rnd.uniform(-1, 1), rnd.uniform(179, 180)) for _ in range(30)]
+        coords += [(rnd.uniform(-1, 1), rnd.uniform(-180, -179)) for _ in range(30)]
+        coords += [(rnd.uniform(88, 90), rnd.uniform(-180, 180)) for _ in range(30)]
+        for i, (lat, lon) in enumerate(coords):
+            Point.objects.create(
+                name=f"p{i}", latitude=lat, longitude=lon, creator=cls.user
+            )
+
+    def test_prefilter_matches_full_scan(self):
+        for lat, lon, radius in self.centers:
+            with self.subTest(lat=lat, lon=lon, radius=radius):
+                expected = {
+                    p.id
+                    for p in Point.objects.all()
+                    if haversine(lat, lon, p.latitude, p.longitude) <= radius
+                }
+                candidates = radius_prefilter(Point.objects.all(), lat, lon, radius)
+                found = {
+                    p.id for p in filter_within_radius(candidates, lat, lon, radius)
+                }
+                self.assertEqual(found, expected)
+
+    def test_spatial_index_matches_sql(self):
+        index = SpatialIndex(cell_degrees=1.0)
+        index.build(Point.objects.values_list("id", "latitude", "longitude"))
+        self.assertEqual(
+            check_consistency(index), {"missing": [], "extra": [], "moved": []}
+        )
+        for lat, lon, radius in self.centers:
+            with self.subTest(lat=lat, lon=lon, radius=radius):
+                candidates = radius_prefilter(Point.objects.all(), lat, lon, radius)
+                expected = {
+                    p.id for p in filter_within_radius(candidates, lat, lon, radius)
+                }
+                self.assertEqual(set(index.query_radius(lat, lon, radius)), expected)
+
+        point = Point.objects.first()
+        index.add(point.id, 0.0, 0.0)
+        self.assertEqual(check_consistency(index)["moved"], [point.id])
+        index.remove(point.id)
+        self.assertEqual(check_consistency(index)["missing"], [point.id])
+
+    @override_settings(
+        POINTS_SPATIAL_INDEX_ENABLED=True,
+        POINTS_SPATIAL_INDEX_MAX_IDS=20,
+        POINTS_SEARCH_CACHE_ENABLED=False,
+    )
+    def test_spatial_index_falls_back_to_prefilter(self):
+        spatial_index.reset_index()
+        self.addCleanup(spatial_index.reset_index)
+        self.assertIsNone(spatial_index.candidate_ids([(10, 10, 25000)]))
+        self.assertLessEqual(len(spatial_index.candidate_ids([(0, 0, 500)])), 20)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for lat, lon, radius in [(0, 0, 500), (10, 10, 25000)]:
+            with self.subTest(radius=radius):
+                expected = {
+                    p.id
+                    for p in Point.objects.all()
+                    if haversine(lat, lon, p.latitude, p.longitude) <= radius
+                }
+                response = client.get(
+                    "/points/search/",
+                    {"latitude": lat, "longitude": lon, "radius": radius},
+                )
+                self.assertEqual({p["id"] for p in response.json()}, expected)
+
+    def test_batch_search_matches_single_searches(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        queries = [
+            {"latitude": lat, "longitude": lon, "radius": radius}
+            for lat, lon, radius in self.centers
+            if radius < 20000
+        ]
+        expected = [
+            [
+                p.id
+                for p in filter_within_radius(
+                    radius_prefilter(Point.objects.all(), *params.values()),
+                    *params.values(),
+                )
+            ]
+            for params in queries
+        ]
+        with self.assertNumQueries(1):
+            response = client.post(
+                "/points/search/batch/", {"queries": queries}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        found = [[p["id"] for p in points] for points in response.data["results"]]
+        self.assertEqual([set(ids) for ids in found], [set(ids) for ids in expected])
+
+        response = client.post(
+            "/points/search/batch/",
+            {"queries": queries, "deduplicate": True},
+            format="json",
+        )
+        self.assertEqual(
+            [set(ids) for ids in response.data["results"]],
+            [set(ids) for ids in expected],
+        )
+        self.assertEqual(
+            len(response.data["points"]), len(set().union(*map(set, expected)))
+        )
+
+    def test_nearest_matches_full_sort(self):
+        for lat, lon, k, max_distance in [
+            (0, 0, 20, None),
+            (0, 180, 5, None),
+            (89.9, 0, 40, None),
+            (10, 10, 10, 1000),
+        ]:
+            with self.subTest(lat=lat, lon=lon, k=k, max_distance=max_distance):
+                ranked = sorted(
+                    (haversine(lat, lon, p.latitude, p.longitude), p.id)
+                    for p in Point.objects.all()
+                )
+                if max_distance is not None:
+                    ranked = [pair for pair in ranked if pair[0] <= max_distance]
+                nearest = nearest_points(Point.objects.all(), lat, lon, k, max_distance)
+                self.assertEqual(
+                    [point.id for point, _ in nearest], [pid for _, pid in ranked[:k]]
+                )
+
+    def test_nearest_rejects_invalid_coordinates(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for params in [
+            {"latitude": "nan", "longitude": 0},
+            {"latitude": 1000, "longitude": 0},
+            {"latitude": 0, "longitude": "-inf"},
+            {"latitude": 0, "longitude": 0, "max_distance": "nan"},
+            {"latitude": 0, "longitude": 0, "max_distance": "inf"},
+            {"latitude": 0, "longitude": 0, "max_distance": -1},
+        ]:
+            with self.subTest(params=params), self.assertNumQueries(0):
+                response = client.get("/points/nearest/", params)
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(POINTS_SEARCH_CACHE_ENABLED=True)
+class SearchCacheTests(TestCase):
+    """Кэш поиска отдаёт точные результаты и сбрасывается при изменениях"""
+
+    url = "/points/search/?latitude={}&longitude=37.6&radius=5"
+
+    def setUp(self):
+        caches["search"].clear()
+        self.user = User.objects.create_user(username="cacher", password="secret12")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.point = Point.objects.create(
+                name="p", latitude=55.75, longitude=37.6, creator=self.user
+            )
+
+    def test_hit_and_invalidation(self):
+        before = search_cache.stats.as_dict()
+        self.client.get(self.url.format("55.75002"))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url.format("55.75002"))
+        self.assertEqual(response.data[0]["messages_count"], 0)
+        after = search_cache.stats.as_dict()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/points/{self.point.id}/messages/", {"text": "hi"})
+        response = self.client.get(self.url.format("55.75002"))
+        self.assertEqual(response.data[0]["messages_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.point.latitude = 10
+            self.point.save()
+        self.assertEqual(self.client.get(self.url.format("55.75002")).data, [])
+
+    def test_nearby_searches_share_entry(self):
+        url = "/points/search/?latitude={}&longitude={}&radius={}"
+        first = self.client.get(url.format("55.75002", "37.6", "5")).data
+        for params in [("55.75011", "37.59996", "5"), ("55.7499", "37.6", "4.97")]:
+            with self.subTest(params=params), self.assertNumQueries(0):
+                response = self.client.get(url.format(*params))
+            self.assertEqual(response.data, first)
+
+    def test_results_match_uncached_search(self):
+        # 5.002 км к северу от 55.75: внутри радиуса 5 км от 55.75004,
+        # но снаружи радиуса от 55.75, к которому привязывается центр запроса
+        edge = Point.objects.create(
+            name="edge",
+            latitude=55.75 + 5.002 / 111.195,
+            longitude=37.6,
+            creator=self.user,
+        )
+        for latitude, inside in [("55.75004", True), ("55.75", False)] * 2:
+            with self.subTest(latitude=latitude):
+                found = {
+                    p["id"] for p in self.client.get(self.url.format(latitude)).data
+                }
+                with override_settings(POINTS_SEARCH_CACHE_ENABLED=False):
+                    expected = {
+                        p["id"] for p in self.client.get(self.url.format(latitude)).data
+                    }
+                self.assertEqual(found, expected)
+                self.assertEqual(edge.id in found, inside)
+
+    def test_snapped_entries_match_uncached_search(self):
+        rng = random.Random(8)
+        Point.objects.bulk_create(
+            Point(
+                name=f"r{i}",
+                latitude=55.75 + rng.uniform(-0.05, 0.05),
+                longitude=37.6 + rng.uniform(-0.05, 0.05),
+                creator=self.user,
+            )
+            for i in range(300)
+        )
+        url = "/points/search/?latitude={}&longitude={}&radius={}"
+        for _ in range(30):
+            params = (
+                55.75 + rng.uniform(-0.01, 0.01),
+                37.6 + rng.uniform(-0.01, 0.01),
+                rng.uniform(0.05, 3),
+            )
+            found = {p["id"] for p in self.client.get(url.format(*params)).data}
+            with override_settings(POINTS_SEARCH_CACHE_ENABLED=False):
+                expected = {p["id"] for p in self.client.get(url.format(*params)).data}
+            self.assertEqual(found, expected, params)
+
+    def test_process_local_backend_warning(self):
+        with self.assertLogs("points.search_cache", "WARNING"):
+            search_cache.check_backend()
+
+
+class CorridorTests(TestCase):
+    """Поиск вдоль маршрута должен совпадать с перебором расстояний до всех отрезков"""
+
+    routes = [
+        # пересекает антимеридиан
+        [(10.0, 170.0), (12.0, -175.0), (15.0, -160.0)],
+        # дуга большого круга выгибается к полюсу сильнее концов
+        [(60.0, -60.0), (60.0, 60.0)],
+        # отрезок нулевой длины
+        [(-20.0, 30.0)],
+    ]
+
+    def setUp(self):
+        rnd = random.Random(15)
+        self.user = User.objects.create_user(username="tester", password="secret12")
+        Point.objects.bulk_create(
+            Point(
+                name=f"p{i}",
+                latitude=rnd.uniform(-30, 90),
+                longitude=rnd.uniform(-180, 180),
+                creator=self.user,
+            )
+            for i in range(1500)
+        )
+
+    def test_matches_brute_force(self):
+        for path in self.routes:
+            with self.subTest(path=path):
+                segments = list(zip(path, path[1:])) or [(path[0], path[0])]
+                expected = set()
+                for point in Point.objects.all():
+                    distances = [
+                        segment_distance(point.latitude, point.longitude, a, b)
+                        for a, b in segments
+                    ]
+                    if min(distances) <= 300:
+                        expected.add((point.id, distances.index(min(distances))))
+                candidates = corridor_prefilter(Point.objects.all(), path, 300)
+                found = points_along(candidates, path, 300)
+                self.assertEqual(
+                    {(point.id, segment) for point, _, segment in found}, expected
+                )
+
+    def test_long_route_matches_brute_force(self):
+        rnd = random.Random(16)
+        path = [(40.0, -30.0)]
+        for _ in range(299):
+            lat, lon = path[-1]
+            path.append((lat + rnd.uniform(-0.1, 0.2), lon + rnd.uniform(-0.1, 0.2)))
+        segments = list(zip(path, path[1:]))
+        points = list(Point.objects.all())
+        expected = set()
+        for point in points:
+            distances = [
+                segment_distance(point.latitude, point.longitude, a, b)
+                for a, b in segments
+            ]
+            if min(distances) <= 200:
+                expected.add((point.id, distances.index(min(distances))))
+        found = points_along(points, path, 200)
+        self.assertEqual({(point.id, segment) for point, _, segment in found}, expected)
+
+        candidates = corridor_prefilter(Point.objects.all(), path, 200)
+        self.assertLessEqual(str(candidates.query).count("BETWEEN"), 2 * 64)
+        self.assertTrue(
+            {point_id for point_id, _ in expected} <= {p.id for p in candidates}
+        )
+
+    def test_segment_distance(self):
+        self.assertAlmostEqual(
+            segment_distance(1, 5, (0, 0), (0, 10)), haversine(1, 5, 0, 5), places=6
+        )
+        self.assertAlmostEqual(
+            segment_distance(0, 12, (0, 0), (0, 10)), haversine(0, 12, 0, 10), places=6
+        )
+
+    def test_endpoint(self):
+        self.assertEqual(
+            decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@"),
+            [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)],
+        )
+        point = Point.objects.create(
+            name="route", latitude=40.7, longitude=-121.0, creator=self.user
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(
+            "/points/corridor/",
+            {"polyline": "_p~iF~ps|U_ulLnnqC_mqNvxq`@", "buffer": 10},
+        )
+        self.assertEqual(response.status_code, 200)
+        route = [p for p in response.data if p["id"] == point.id]
+        self.assertEqual(len(route), 1)
+        self.assertLess(route[0]["distance_km"], 10)
+        self.assertIn(route[0]["segment"], (0, 1))
+
+        for params in [
+            {"polyline": "_p~iF~ps|U_", "buffer": 10},
+            {"polyline": "_p~iF~ps|U_ulLnnqC_mqNvxq`@", "buffer": 51},
+        ]:
+            response = client.get("/points/corridor/", params)
+            self.assertEqual(response.status_code, 400)
+
+
+class DistanceTests(SimpleTestCase):
+    """Пакетный расчёт расстояний должен совпадать со скалярной формулой"""
+
+    def setUp(self):
+        rnd = random.Random(7)
+        self.lats = [rnd.uniform(-90, 90) for _ in range(1000)]
+        self.lons = [rnd.uniform(-180, 180) for _ in range(1000)]
+        self.expected = [
+            haversine(12.5, -33.1, lat, lon) for lat, lon in zip(self.lats, self.lons)
+        ]
+
+    def test_scalar_fallback(self):
+        distances = haversine_many(12.5, -33.1, self.lats, self.lons, vectorize=False)
+        self.assertEqual(list(distances), self.expected)
+
+    @skipUnless(has_numpy(), "NumPy is not installed")
+    def test_vectorized_matches_scalar(self):
+        distances = haversine_many(12.5, -33.1, self.lats, self.lons, vectorize=True)
+        for got, expected in zip(distances, self.expected):
+            self.assertAlmostEqual(got, expected, delta=1e-9)
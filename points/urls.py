@@ -3,12 +3,28 @@ URL-шаблоны
 """
 
 from django.urls import path
+from .async_views import (
+    AsyncMessageListView,
+    AsyncPointDetailView,
+    AsyncPointListView,
+    AsyncPointSearchView,
+    PointEventsView,
+)
 from .views import (
     PointListCreateView,
     MessageListCreateView,
     PointRetrieveUpdateDestroyView,
     MessageRetrieveUpdateDestroyView,
     PointSearchView,
+    PointBatchSearchView,
+    PointNearestView,
+    PointCorridorView,
+    PointChangesView,
+    SearchCacheStatsView,
+    PointExportView,
+    PointImportView,
+    PointViewportView,
+    PointHeatmapView,
 )
 
 urlpatterns = [
@@ -16,5 +32,19 @@ urlpatterns = [
     path("<int:point_id>/messages/", MessageListCreateView.as_view()),
     path("<int:id>/", PointRetrieveUpdateDestroyView.as_view()),
     path("messages/<int:id>/", MessageRetrieveUpdateDestroyView.as_view()),
+    path("<int:point_id>/events/", PointEventsView.as_view()),
     path("search/", PointSearchView.as_view()),
+    path("search/batch/", PointBatchSearchView.as_view()),
+    path("search/cache/", SearchCacheStatsView.as_view()),
+    path("export/", PointExportView.as_view()),
+    path("import/", PointImportView.as_view()),
+    path("viewport/", PointViewportView.as_view()),
+    path("heatmap/", PointHeatmapView.as_view()),
+    path("nearest/", PointNearestView.as_view()),
+    path("async/", AsyncPointListView.as_view()),
+    path("async/<int:id>/", AsyncPointDetailView.as_view()),
+    path("async/<int:point_id>/messages/", AsyncMessageListView.as_view()),
+    path("async/search/", AsyncPointSearchView.as_view()),
+    path("corridor/", PointCorridorView.as_view()),
+    path("changes/", PointChangesView.as_view()),
 ]
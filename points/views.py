@@ -2,10 +2,14 @@
 Представления
 """
 
-from math import radians, cos, sin, asin, sqrt
+from datetime import datetime
+from math import isfinite
 from typing import Any
 
-from django.db.models import QuerySet
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Prefetch, QuerySet
+from django.utils.dateparse import parse_datetime
 from rest_framework.generics import (
     GenericAPIView,
     ListCreateAPIView,
@@ -14,23 +18,150 @@ from rest_framework.generics import (
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-
-from .serializers import PointSerializer, MessageSerializer
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+
+from geo import metrics
+
+from .serializers import (
+    PointSerializer,
+    PointListSerializer,
+    MessageSerializer,
+    NearestPointSerializer,
+    CorridorPointSerializer,
+    SyncMessageSerializer,
+    TombstoneSerializer,
+)
 from .models import Point, Message
+from .corridor import corridor_prefilter, decode_polyline, points_along
+from .conditional import (
+    content_validators,
+    not_modified,
+    point_validators,
+    queryset_state,
+    request_variant,
+    set_validators,
+)
+from .clustering import MAX_ZOOM, cluster_viewport, viewport_boxes, viewport_cells
+from .density import count_cells, heatmap, levels
+from .export import EXPORT_FORMATS, export_stream
+from .filters import TieBreakingOrderingFilter
+from .importer import IMPORT_FORMATS, import_points, parse_rows
+from .pagination import CreatedAtCursorPagination
 from .permissions import IsOwnerOrReadOnly
+from .search import (
+    batch_prefilter,
+    batch_within_radius,
+    filter_within_radius,
+    nearest_points,
+    radius_prefilter,
+)
+from .pubsub import publish_message_event
+from . import fast_serializers, search_cache, spatial_index, sync
+
+
+class LeanPointMixin:
+    """
+    Облегчённое представление точек для списков и поиска: количество сообщений
+    вместо их полного списка и, по query-параметру messages, последние сообщения
+    """
+
+    max_messages_limit: int = 20
+
+    def get_messages_limit(self) -> int:
+        """
+        Возвращает количество последних сообщений на точку из query-параметра messages
+        """
+
+        try:
+            limit = int(self.request.query_params.get("messages", 0))
+        except ValueError:
+            return 0
+        return max(0, min(limit, self.max_messages_limit))
+
+    def get_lean_queryset(self) -> QuerySet[Point]:
+        """
+        Возвращает выборку точек для облегчённого представления
+        """
+        return Point.objects.lean(self.get_messages_limit())
 
+    def get_serializer_context(self) -> dict[str, Any]:
+        """
+        Добавляет в контекст сериализатора количество последних сообщений
+        """
 
-AVERAGE_EARTH_RADIUS: int = 6371  # средний радиус Земли в километрах
+        context = super().get_serializer_context()
+        context["messages_limit"] = self.get_messages_limit()
+        return context
 
 
-class PointListCreateView(ListCreateAPIView):
+class PointListCreateView(LeanPointMixin, ListCreateAPIView):
     """
     Представление для создания точки и просмотра существующих
     """
 
     serializer_class = PointSerializer
     queryset = Point.objects.all()
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [TieBreakingOrderingFilter]
+    ordering_fields = ["created_at", "messages_count"]
+
+    def get_queryset(self) -> QuerySet[Point]:
+        """
+        Возвращает облегчённую выборку для списка и полную для создания точки.
+        Query-параметр active_since оставляет точки с сообщениями не раньше заданной даты.
+        """
+
+        if self.request.method != "GET":
+            return super().get_queryset()
+
+        queryset = self.get_lean_queryset()
+        active_since = self.request.query_params.get("active_since")
+        if active_since:
+            try:
+                since = parse_datetime(active_since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({"active_since": "Invalid datetime"})
+            queryset = queryset.filter(last_message_at__gte=since)
+        return queryset
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает страницу точек. Если отфильтрованная выборка не менялась
+        с версии клиента (If-None-Match / If-Modified-Since), отвечает 304
+        без выборки и сериализации страницы. Без последних сообщений
+        представления строятся из строк .values() в обход ModelSerializer.
+        """
+
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = content_validators(
+            queryset_state(queryset, with_messages=bool(self.get_messages_limit())),
+            request,
+        )
+        cached = not_modified(request, *validators)
+        if cached is not None:
+            return cached
+        if fast_serializers.is_enabled() and not self.get_messages_limit():
+            page = self.paginate_queryset(fast_serializers.point_values(queryset))
+            response = self.get_paginated_response(fast_serializers.points(page))
+        else:
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        set_validators(response, *validators)
+        return response
+
+    def get_serializer_class(self):
+        """
+        Возвращает облегчённый сериализатор для списка точек
+        """
+
+        if self.request.method == "GET":
+            return PointListSerializer
+        return super().get_serializer_class()
 
     def perform_create(self, serializer: PointSerializer) -> None:
         """
@@ -46,16 +177,42 @@ class MessageListCreateView(ListCreateAPIView):
     """Создание сообщений и получение сообщений для конкретной точки"""
 
     serializer_class = MessageSerializer
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self) -> QuerySet[Message]:
         """
         Возвращает список сообщений, относящихся к заданной точке
+        (авторы подгружаются JOIN-ом)
 
         Returns:
             QuerySet сообщений
         """
 
-        return Message.objects.filter(point_id=self.kwargs["point_id"])
+        return Message.objects.filter(point_id=self.kwargs["point_id"]).select_related(
+            "author"
+        )
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает страницу сообщений. Если сообщения точки не менялись
+        с версии клиента (If-None-Match / If-Modified-Since), отвечает 304
+        без выборки и сериализации сообщений.
+        """
+
+        validators = point_validators(self.kwargs["point_id"], request_variant(request))
+        if validators is not None:
+            cached = not_modified(request, *validators)
+            if cached is not None:
+                return cached
+        if fast_serializers.is_enabled():
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(fast_serializers.message_values(queryset))
+            response = self.get_paginated_response(fast_serializers.messages(page))
+        else:
+            response = super().list(request, *args, **kwargs)
+        if validators is not None:
+            set_validators(response, *validators)
+        return response
 
     def perform_create(self, serializer: MessageSerializer) -> None:
         """
@@ -65,7 +222,10 @@ class MessageListCreateView(ListCreateAPIView):
             serializer: Сериализатор сообщения
         """
         point = Point.objects.get(id=self.kwargs["point_id"])
-        serializer.save(author=self.request.user, point=point)
+        with transaction.atomic():
+            message = serializer.save(author=self.request.user, point=point)
+            Point.objects.filter(id=point.id).message_added(message.created_at)
+            publish_message_event("created", message, serializer.data)
 
 
 class PointRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
@@ -75,9 +235,28 @@ class PointRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
 
     serializer_class = PointSerializer
     permission_classes = [IsOwnerOrReadOnly, IsAuthenticated]
-    queryset = Point.objects.all()
+    queryset = Point.objects.select_related("creator").prefetch_related(
+        Prefetch("message_set", queryset=Message.objects.select_related("author"))
+    )
     lookup_field = "id"
 
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает точку с сообщениями. Если точка и её сообщения не менялись
+        с версии клиента (If-None-Match / If-Modified-Since), отвечает 304
+        без загрузки и сериализации сообщений.
+        """
+
+        validators = point_validators(self.kwargs["id"], request_variant(request))
+        if validators is not None:
+            cached = not_modified(request, *validators)
+            if cached is not None:
+                return cached
+        response = super().retrieve(request, *args, **kwargs)
+        if validators is not None:
+            set_validators(response, *validators)
+        return response
+
 
 class MessageRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
     """
@@ -89,13 +268,38 @@ class MessageRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
     queryset = Message.objects.all()
     lookup_field = "id"
 
+    def perform_update(self, serializer: MessageSerializer) -> None:
+        """
+        Сохраняет сообщение и оповещает подписчиков его точки
+
+        Args:
+            serializer: Сериализатор сообщения
+        """
+
+        message = serializer.save()
+        publish_message_event("updated", message, serializer.data)
+
+    def perform_destroy(self, instance: Message) -> None:
+        """
+        Удаляет сообщение, обновляет счётчики его точки и оповещает подписчиков
+
+        Args:
+            instance: Удаляемое сообщение
+        """
+
+        with transaction.atomic():
+            point_id = instance.point_id
+            publish_message_event("deleted", instance)
+            instance.delete()
+            Point.objects.filter(id=point_id).message_removed()
+
 
-class PointSearchView(GenericAPIView):
+class PointSearchView(LeanPointMixin, GenericAPIView):
     """
     Поиск гео-точек и сообщений в заданном радиусе от координат
     """
 
-    serializer_class = PointSerializer
+    serializer_class = PointListSerializer
     queryset = Point.objects.all()
 
     def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
@@ -106,6 +310,7 @@ class PointSearchView(GenericAPIView):
             latitude: Широта точки поиска
             longitude: Долгота точки поиска
             radius: Радиус поиска в километрах
+            messages: Количество последних сообщений на точку (по умолчанию 0)
         """
 
         try:
@@ -118,30 +323,587 @@ class PointSearchView(GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            """
-            Вычисляет расстояние между двумя гео-точками по формуле гаверсинусов
+        circle = (lat, lon, radius_km)
+        cache_key = entry = None
+        if search_cache.is_enabled():
+            # кэшируются точки расширенного круга, общего для близких запросов,
+            # вместе с состоянием выборки, по которому строится ETag
+            circle = search_cache.query_circle(lat, lon, radius_km)
+            cache_key = search_cache.result_key(
+                *circle, variant=f"m{self.get_messages_limit()}"
+            )
+            entry = search_cache.get(cache_key)
+
+        if entry is not None:
+            state, data = entry
+        else:
+            state = self.search_state(*circle)
+        validators = content_validators(state, request)
+        cached = not_modified(request, *validators)
+        if cached is not None:
+            return cached
+
+        if entry is None:
+            if fast_serializers.is_enabled() and not self.get_messages_limit():
+                data = fast_serializers.points(
+                    self.search(*circle, fast_serializers.point_values)
+                )
+            else:
+                data = self.get_serializer(self.search(*circle), many=True).data
+            search_cache.put(cache_key, (state, data))
+        if circle != (lat, lon, radius_km):
+            data = filter_within_radius(data, lat, lon, radius_km)
+        response = Response(data, status=status.HTTP_200_OK)
+        set_validators(response, *validators)
+        return response
+
+    def search_state(
+        self, lat: float, lon: float, radius_km: float
+    ) -> tuple[str, datetime | None]:
+        """
+        Состояние точек в ограничивающем прямоугольнике круга (queryset_state):
+        все точки результата входят в прямоугольник, поэтому любое изменение
+        результата меняет состояние
+        """
+
+        return queryset_state(
+            radius_prefilter(Point.objects.all(), lat, lon, radius_km),
+            with_messages=bool(self.get_messages_limit()),
+        )
+
+    def search(
+        self, lat: float, lon: float, radius_km: float, rows=None
+    ) -> list[Point] | list[dict]:
+        """
+        Находит гео-точки в пределах радиуса
+
+        Args:
+            lat: Широта точки поиска
+            lon: Долгота точки поиска
+            radius_km: Радиус поиска в километрах
+            rows: Функция, превращающая выборку кандидатов в выборку строк .values()
+                (по умолчанию возвращаются модели)
+
+        Returns:
+            Список точек
+        """
 
-            Args:
-                lat1: Широта первой точки
-                lon1: Долгота первой точки
-                lat2: Широта второй точки
-                lon2: Долгота второй точки
+        queryset = self.get_lean_queryset()
+        point_ids = spatial_index.candidate_ids([(lat, lon, radius_km)])
+        if point_ids is not None:
+            # индекс может отставать от других воркеров до пересинхронизации,
+            # поэтому точная проверка повторяется по актуальным координатам
+            candidates = queryset.filter(id__in=point_ids)
+        else:
+            candidates = radius_prefilter(queryset, lat, lon, radius_km)
+        if rows is not None:
+            candidates = rows(candidates)
+        candidates = list(candidates)
+        found = filter_within_radius(candidates, lat, lon, radius_km)
+        metrics.observe_search("radius", len(candidates), len(found))
+        return found
+
+
+class PointBatchSearchView(LeanPointMixin, GenericAPIView):
+    """
+    Поиск гео-точек сразу для нескольких центров (например, точек маршрута)
+    """
 
-            Returns:
-                Расстояние между точками в километрах
-            """
+    serializer_class = PointListSerializer
+    queryset = Point.objects.all()
+    max_queries: int = 500
 
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            return AVERAGE_EARTH_RADIUS * (2 * asin(sqrt(a)))
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Отвечает на все поиски в радиусе одним запросом к базе: кандидаты
+        выбираются по объединению ограничивающих прямоугольников всех кругов
+        и затем распределяются по поискам точной проверкой.
 
-        points_in_radius = []
-        for point in Point.objects.prefetch_related("message_set"):
-            if haversine(lat, lon, point.latitude, point.longitude) <= radius_km:
-                points_in_radius.append(point)
+        Тело запроса:
+            queries: Список объектов с полями latitude, longitude и radius
+            deduplicate: true, чтобы вернуть каждую точку один раз в поле points,
+                а в results - только id точек (по умолчанию false)
 
-        serializer = self.get_serializer(points_in_radius, many=True)
+        Query-параметры:
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+
+        raw_queries = request.data.get("queries")
+        if not isinstance(raw_queries, list) or not (
+            1 <= len(raw_queries) <= self.max_queries
+        ):
+            return Response(
+                {"detail": f"queries must be a list of 1 to {self.max_queries} items"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            queries = [
+                (
+                    float(query["latitude"]),
+                    float(query["longitude"]),
+                    float(query["radius"]),
+                )
+                for query in raw_queries
+            ]
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"detail": "each query requires latitude, longitude and radius"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        candidates = self.candidates(queries)
+        found = batch_within_radius(candidates, queries)
+        metrics.observe_search(
+            "batch", len(candidates), sum(len(points) for points in found)
+        )
+        unique = {point.id: point for points in found for point in points}
+        serialized = dict(
+            zip(unique, self.get_serializer(list(unique.values()), many=True).data)
+        )
+
+        if request.data.get("deduplicate") is True:
+            data = {
+                "points": list(serialized.values()),
+                "results": [[point.id for point in points] for points in found],
+            }
+        else:
+            data = {
+                "results": [
+                    [serialized[point.id] for point in points] for points in found
+                ]
+            }
+        return Response(data, status=status.HTTP_200_OK)
+
+    def candidates(self, queries: list[tuple[float, float, float]]) -> list[Point]:
+        """
+        Выбирает точки, которые могут попасть хотя бы в один из кругов
+
+        Args:
+            queries: Список (широта, долгота, радиус в километрах)
+
+        Returns:
+            Список точек-кандидатов
+        """
+
+        queryset = self.get_lean_queryset()
+        point_ids = spatial_index.candidate_ids(queries)
+        if point_ids is not None:
+            return list(queryset.filter(id__in=point_ids))
+        return list(batch_prefilter(queryset, queries))
+
+
+class SearchCacheStatsView(APIView):
+    """
+    Счётчики кэша поиска в текущем процессе (только для администраторов)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает количество попаданий, промахов и инвалидаций кэша поиска
+        """
+
+        return Response(
+            {"enabled": search_cache.is_enabled(), **search_cache.stats.as_dict()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PointNearestView(LeanPointMixin, GenericAPIView):
+    """
+    Поиск k ближайших гео-точек к заданным координатам
+    """
+
+    serializer_class = NearestPointSerializer
+    queryset = Point.objects.all()
+    max_k: int = 100
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает ближайшие гео-точки, упорядоченные по расстоянию
+
+        Query-параметры:
+            latitude: Широта точки поиска
+            longitude: Долгота точки поиска
+            k: Количество точек (по умолчанию 20, не больше 100)
+            max_distance: Максимальное расстояние в километрах (необязательный)
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+
+        try:
+            lat = float(request.query_params["latitude"])
+            lon = float(request.query_params["longitude"])
+            k = int(request.query_params.get("k", 20))
+            max_distance = request.query_params.get("max_distance")
+            max_distance_km = float(max_distance) if max_distance is not None else None
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "latitude and longitude are required, k must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 1 <= k <= self.max_k:
+            return Response(
+                {"detail": f"k must be between 1 and {self.max_k}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (
+            not -90 <= lat <= 90
+            or not -180 <= lon <= 180
+            or (
+                max_distance_km is not None
+                and not (isfinite(max_distance_km) and max_distance_km >= 0)
+            )
+        ):
+            return Response(
+                {
+                    "detail": "latitude must be between -90 and 90, longitude between "
+                    "-180 and 180, max_distance must be a finite non-negative number"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        nearest = nearest_points(
+            Point.objects.only("id", "latitude", "longitude"),
+            lat,
+            lon,
+            k,
+            max_distance_km,
+        )
+        points = self.get_lean_queryset().in_bulk([point.id for point, _ in nearest])
+        results = []
+        for point, distance in nearest:
+            if point.id in points:
+                points[point.id].distance_km = distance
+                results.append(points[point.id])
+
+        serializer = self.get_serializer(results, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PointCorridorView(LeanPointMixin, GenericAPIView):
+    """
+    Поиск гео-точек вдоль маршрута
+    """
+
+    serializer_class = CorridorPointSerializer
+    queryset = Point.objects.all()
+    max_buffer_km: float = 50.0
+    max_vertices: int = 1000
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает точки, находящиеся не дальше buffer километров от маршрута,
+        с расстоянием до маршрута и индексом ближайшего отрезка
+
+        Query-параметры:
+            polyline: Маршрут в формате Encoded Polyline
+            buffer: Ширина коридора в километрах
+            precision: Точность кодирования ломаной: 5 (по умолчанию) или 6
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+        return self.corridor(request.query_params)
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        То же, что GET, но параметры передаются в теле запроса (для длинных маршрутов)
+        """
+        return self.corridor(request.data)
+
+    def corridor(self, params) -> Response:
+        """
+        Проверяет параметры и выполняет поиск вдоль маршрута
+        """
+
+        try:
+            precision = int(params.get("precision", 5))
+            if precision not in (5, 6):
+                raise ValueError
+            path = decode_polyline(str(params["polyline"]), precision)
+            buffer_km = float(params["buffer"])
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {
+                    "detail": "polyline (encoded, precision 5 or 6) and buffer are required"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not path or len(path) > self.max_vertices:
+            return Response(
+                {"detail": f"polyline must have 1 to {self.max_vertices} vertices"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 <= buffer_km <= self.max_buffer_km:
+            return Response(
+                {"detail": f"buffer must be between 0 and {self.max_buffer_km}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        candidates = list(corridor_prefilter(self.get_lean_queryset(), path, buffer_km))
+        results = []
+        for point, distance, segment in points_along(candidates, path, buffer_km):
+            point.distance_km = distance
+            point.segment = segment
+            results.append(point)
+        metrics.observe_search("corridor", len(candidates), len(results))
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PointChangesView(LeanPointMixin, GenericAPIView):
+    """
+    Лента изменений для синхронизации офлайн-клиентов
+    """
+
+    serializer_class = PointListSerializer
+    queryset = Point.objects.all()
+    max_limit: int = 1000
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает точки и сообщения, созданные или изменённые после курсора,
+        и записи об удалениях. Клиент повторяет запрос с полученным cursor,
+        пока has_more не станет false.
+
+        Query-параметры:
+            cursor: Курсор из предыдущего ответа (без него - первая синхронизация)
+            limit: Максимальное количество строк каждого типа (по умолчанию 500)
+            messages: Количество последних сообщений на точку (по умолчанию 0)
+        """
+
+        try:
+            limit = int(request.query_params.get("limit", 500))
+            cursor = request.query_params.get("cursor")
+            positions = (
+                sync.decode_cursor(cursor) if cursor else sync.initial_positions()
+            )
+        except ValueError:
+            return Response(
+                {"detail": "cursor must be a value returned by this endpoint"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {"detail": f"limit must be between 1 and {self.max_limit}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if sync.is_expired(positions):
+            return Response(
+                {"detail": "cursor has expired, full resync is required"},
+                status=status.HTTP_410_GONE,
+            )
+
+        rows, positions, has_more = sync.changes(
+            positions, limit, self.get_messages_limit()
+        )
+        context = self.get_serializer_context()
+        return Response(
+            {
+                "points": self.get_serializer(rows["points"], many=True).data,
+                "messages": SyncMessageSerializer(
+                    rows["messages"], many=True, context=context
+                ).data,
+                "deleted": TombstoneSerializer(
+                    rows["deleted"], many=True, context=context
+                ).data,
+                "cursor": sync.encode_cursor(positions),
+                "has_more": has_more,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PointExportView(APIView):
+    """
+    Потоковая выгрузка всех гео-точек
+    """
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+        """
+        Отдаёт все точки потоком, не загружая таблицу в память
+
+        Query-параметры:
+            output: Формат выгрузки: ndjson (по умолчанию) или geojson
+            messages: 1, чтобы добавить сообщения точек
+        """
+
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with_messages = request.query_params.get("messages") == "1"
+
+        response = StreamingHttpResponse(
+            export_stream(output, with_messages),
+            content_type=EXPORT_FORMATS[output],
+        )
+        response["Content-Disposition"] = f'attachment; filename="points.{output}"'
+        return response
+
+
+class PointImportView(APIView):
+    """
+    Массовый импорт гео-точек (и их сообщений) из NDJSON или CSV
+    """
+
+    max_batch_size: int = 5000
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Импортирует точки из тела запроса или из файла в поле file (multipart).
+        Каждая строка проверяется сериализатором точки, корректные строки
+        вставляются пачками, ошибки возвращаются по номерам строк.
+
+        Query-параметры:
+            input: Формат данных: ndjson или csv (по умолчанию по Content-Type)
+            batch_size: Количество точек в одной вставке (по умолчанию 1000)
+        """
+
+        content_type = request.content_type or ""
+        input_format = request.query_params.get(
+            "input", "csv" if content_type.startswith("text/csv") else "ndjson"
+        )
+        try:
+            batch_size = int(request.query_params.get("batch_size", 1000))
+        except ValueError:
+            batch_size = 0
+        if (
+            input_format not in IMPORT_FORMATS
+            or not 1 <= batch_size <= self.max_batch_size
+        ):
+            return Response(
+                {
+                    "detail": f"input must be one of: {', '.join(IMPORT_FORMATS)}, "
+                    f"batch_size must be between 1 and {self.max_batch_size}"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if content_type.startswith("multipart/"):
+            source = request.FILES.get("file")
+        else:
+            source = request.stream
+        if source is None:
+            return Response(
+                {"detail": "request body or file is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = import_points(
+            parse_rows(source, input_format), request.user, batch_size
+        )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class PointViewportView(APIView):
+    """
+    Точки видимой области карты, сгруппированные в кластеры по уровню масштаба
+    """
+
+    max_cells: int = 10_000
+    max_threshold: int = 100
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает кластеры (центр, количество, несколько id) для плотных ячеек
+        сетки и отдельные точки для остальных
+
+        Query-параметры:
+            bbox: Видимая область: min_lon,min_lat,max_lon,max_lat
+            zoom: Уровень масштаба карты (0-22)
+            threshold: Минимальное количество точек в кластере (по умолчанию 5)
+        """
+
+        try:
+            min_lon, min_lat, max_lon, max_lat = map(
+                float, request.query_params["bbox"].split(",")
+            )
+            zoom = int(request.query_params["zoom"])
+            threshold = int(request.query_params.get("threshold", 5))
+        except (KeyError, ValueError):
+            return Response(
+                {
+                    "detail": "bbox (min_lon,min_lat,max_lon,max_lat) and zoom are required"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (
+            not 0 <= zoom <= MAX_ZOOM
+            or not 2 <= threshold <= self.max_threshold
+            or not -90 <= min_lat <= max_lat <= 90
+            or not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180)
+        ):
+            return Response(
+                {
+                    "detail": f"zoom must be between 0 and {MAX_ZOOM}, threshold between 2 "
+                    f"and {self.max_threshold}, bbox must contain valid coordinates"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        boxes = viewport_boxes(min_lon, min_lat, max_lon, max_lat)
+        if viewport_cells(boxes, zoom) > self.max_cells:
+            return Response(
+                {"detail": "bbox is too large for this zoom level"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            cluster_viewport(boxes, zoom, threshold), status=status.HTTP_200_OK
+        )
+
+
+class PointHeatmapView(APIView):
+    """
+    Плотность точек и сообщений по ячейкам сетки
+    """
+
+    max_cells: int = 20_000
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Возвращает непустые ячейки сетки заданного уровня с количеством точек
+        и сообщений. Ответ строится по заранее агрегированной таблице,
+        таблица точек не просматривается.
+
+        Query-параметры:
+            level: Уровень сетки, размер ячейки 10^-level градусов
+            bbox: Область: min_lon,min_lat,max_lon,max_lat (по умолчанию вся Земля)
+        """
+
+        try:
+            level = int(request.query_params["level"])
+            min_lon, min_lat, max_lon, max_lat = map(
+                float, request.query_params.get("bbox", "-180,-90,180,90").split(",")
+            )
+        except (KeyError, ValueError):
+            return Response(
+                {
+                    "detail": "level is required, bbox must be min_lon,min_lat,max_lon,max_lat"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if level not in levels():
+            return Response(
+                {"detail": f"level must be one of: {', '.join(map(str, levels()))}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not -90 <= min_lat <= max_lat <= 90 or not (
+            -180 <= min_lon <= 180 and -180 <= max_lon <= 180
+        ):
+            return Response(
+                {"detail": "bbox must contain valid coordinates"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        boxes = viewport_boxes(min_lon, min_lat, max_lon, max_lat)
+        if count_cells(level, boxes) > self.max_cells:
+            return Response(
+                {"detail": "bbox is too large for this level"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {"level": level, "cell_size": 10.0**-level, "cells": heatmap(level, boxes)},
+            status=status.HTTP_200_OK,
+        )